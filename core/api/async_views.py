@@ -0,0 +1,57 @@
+from django.http import HttpResponse
+from django.views import View
+
+from .renderers import FastJSONRenderer
+from .serializers import get_fast_serializer
+
+
+class AsyncReadView(View):
+    """
+    Async read-only list and detail endpoint for one model, meant for ASGI
+    deployments. Rows are read with Django's async ORM API and rendered by
+    the FastReadSerializer of ``serializer_class``, so a slow query only
+    suspends this request instead of blocking a worker.
+
+    Lists are keyset paginated with ``?after=<id>&page_size=<n>``.
+    """
+
+    serializer_class = None
+    page_size = 100
+    max_page_size = 1000
+
+    async def get(self, request, pk=None):
+        serializer = get_fast_serializer(self.serializer_class)
+        queryset = serializer.values(self.serializer_class.Meta.model.objects.all())
+        if pk is not None:
+            try:
+                row = await queryset.aget(pk=pk)
+            except self.serializer_class.Meta.model.DoesNotExist:
+                return self.render({"detail": "Not found."}, status=404)
+            return self.render(serializer.to_representation(row))
+
+        try:
+            page_size = min(
+                int(request.GET.get("page_size", self.page_size)), self.max_page_size
+            )
+            after = int(request.GET.get("after", 0))
+        except ValueError:
+            return self.render({"detail": "Invalid page_size or after."}, status=400)
+        if page_size < 1:
+            return self.render({"detail": "Invalid page_size or after."}, status=400)
+
+        queryset = queryset.filter(pk__gt=after).order_by("pk")
+        rows = [row async for row in queryset[: page_size + 1]]
+        next_url = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            query = request.GET.copy()
+            query["after"] = rows[-1]["id"]
+            next_url = request.build_absolute_uri(f"{request.path}?{query.urlencode()}")
+        return self.render({"next": next_url, "results": serializer.many(rows)})
+
+    def render(self, data, status=200):
+        return HttpResponse(
+            FastJSONRenderer().render(data),
+            status=status,
+            content_type="application/json",
+        )
@@ -0,0 +1,93 @@
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.changes import FEED_MODELS, CursorExpired, get_changed_model, get_changes
+from core.models import Cliente, Projeto, Atividade
+from .serializers import (
+    ClienteModelSerializer,
+    ProjetoModelSerializer,
+    AtividadeModelSerializer,
+    get_fast_serializer,
+)
+
+SERIALIZERS = {
+    Cliente: ClienteModelSerializer,
+    Projeto: ProjetoModelSerializer,
+    Atividade: AtividadeModelSerializer,
+}
+
+
+def get_int_param(params, name, default=None):
+    value = params.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: "A valid integer is required."})
+
+
+class ChangeFeedView(APIView):
+    """
+    The changes to clientes, projetos and atividades after ``?cursor=``,
+    oldest first, each with the current row or null once deleted. The
+    response's ``cursor`` is passed on the next request; without one the
+    feed starts at its current end. ``?model=atividade&parent=<projeto>``
+    follows the atividades of one projeto, ``?limit=`` sets the page size.
+    A cursor older than the pruned entries answers 410, the rows must be
+    loaded again.
+    """
+
+    def get(self, request):
+        params = request.query_params
+        model = params.get("model") or None
+        if model is not None and model not in FEED_MODELS:
+            raise ValidationError(
+                {"model": f"Must be one of: {', '.join(FEED_MODELS)}."}
+            )
+        try:
+            feed = get_changes(
+                params.get("cursor") or None,
+                model,
+                get_int_param(params, "parent"),
+                get_int_param(params, "limit", 100),
+            )
+        except ValueError as e:
+            raise ValidationError({"cursor": str(e)})
+        except CursorExpired as e:
+            return Response({"detail": str(e)}, status=status.HTTP_410_GONE)
+        return Response(
+            {
+                "cursor": feed.cursor,
+                "has_more": feed.has_more,
+                "results": self.render_changes(feed.changes),
+            }
+        )
+
+    def render_changes(self, changes):
+        """Render the changes with their current rows, one query per model"""
+        ids = {}
+        for change in changes:
+            ids.setdefault(get_changed_model(change), set()).add(change.object_id)
+        rows = {}
+        for model, pks in ids.items():
+            serializer = get_fast_serializer(SERIALIZERS[model])
+            render = serializer.bind()
+            rows[model] = {
+                row["id"]: render(row)
+                for row in serializer.values(model.objects.filter(pk__in=pks))
+            }
+        return [
+            {
+                "id": change.pk,
+                "model": change.model,
+                "object_id": change.object_id,
+                "parent_id": change.parent_id,
+                "action": change.action,
+                "changed_at": change.changed_at,
+                "data": rows[get_changed_model(change)].get(change.object_id),
+            }
+            for change in changes
+        ]
@@ -0,0 +1,36 @@
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views import View
+
+from core.exports import FORMATS, export
+from .renderers import FastJSONRenderer
+
+
+class ExportView(View):
+    """
+    Streams every Cliente with its Projetos and Atividades, for bulk
+    consumers such as a data warehouse. ``?format=ndjson`` (default) sends
+    one cliente per line with the rest nested, ``?format=csv`` one row per
+    atividade. With ``?gzip=1`` the stream is sent as a gzip file.
+    """
+
+    def get(self, request):
+        format = request.GET.get("format", "ndjson")
+        if format not in FORMATS:
+            return HttpResponse(
+                FastJSONRenderer().render(
+                    {"detail": f"Format must be one of: {', '.join(FORMATS)}."}
+                ),
+                content_type="application/json",
+                status=400,
+            )
+        compress = request.GET.get("gzip") in ("1", "true")
+        filename = f"export.{format}"
+        content_type = FORMATS[format]
+        if compress:
+            filename += ".gz"
+            content_type = "application/gzip"
+        response = StreamingHttpResponse(
+            export(format, compress=compress), content_type=content_type
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
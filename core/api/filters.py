@@ -0,0 +1,92 @@
+from datetime import datetime
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from core.search import filter_search
+
+
+class FieldFilterBackend(BaseFilterBackend):
+    """
+    Filters the queryset by the ``filter_fields`` of the view, a mapping
+    of model field names to the lookups clients may use, e.g.
+    ``{"status": ["exact", "in"], "prazo": ["gte", "lte"]}``.
+
+    The exact lookup is sent as ``?status=...``, the others as
+    ``?prazo__gte=...`` and ``in`` takes comma separated values. Values
+    are cleaned by the model field, so invalid ones are a 400 instead of
+    a query that can never match.
+    """
+
+    def get_filters(self, view, model):
+        """Yield the query parameter, field and lookup of every filter"""
+        for name, lookups in getattr(view, "filter_fields", {}).items():
+            field = model._meta.get_field(name)
+            for lookup in lookups:
+                param = name if lookup == "exact" else f"{name}__{lookup}"
+                yield param, field, lookup
+
+    def clean(self, field, value):
+        if field.is_relation:
+            field = field.target_field
+        value = field.clean(value, None)
+        if isinstance(value, datetime) and timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        return value
+
+    def filter_queryset(self, request, queryset, view):
+        filters = {}
+        for param, field, lookup in self.get_filters(view, queryset.model):
+            if param not in request.query_params:
+                continue
+            value = request.query_params[param]
+            try:
+                if lookup == "in":
+                    value = [self.clean(field, item) for item in value.split(",")]
+                else:
+                    value = self.clean(field, value)
+            except DjangoValidationError as e:
+                raise ValidationError({param: e.messages})
+            filters[f"{field.attname}__{lookup}"] = value
+        return queryset.filter(**filters)
+
+    def get_schema_operation_parameters(self, view):
+        model = view.get_queryset().model
+        return [
+            {
+                "name": param,
+                "required": False,
+                "in": "query",
+                "description": f"{field.verbose_name} ({lookup})",
+                "schema": {"type": "string"},
+            }
+            for param, field, lookup in self.get_filters(view, model)
+        ]
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Filters the queryset by the words of ``?q=``, matched through the text
+    index of the database, see ``core.search``.
+    """
+
+    search_param = "q"
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param)
+        if not text:
+            return queryset
+        return filter_search(queryset, text)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.search_param,
+                "required": False,
+                "in": "query",
+                "description": "Full-text search",
+                "schema": {"type": "string"},
+            }
+        ]
@@ -0,0 +1,331 @@
+from datetime import datetime, timedelta, timezone
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+from rest_framework.response import Response
+
+from core.cache import (
+    cascade_tag,
+    instance_tag,
+    invalidate_instances,
+    model_tag,
+    response_cache,
+)
+from core.deletion import delete_rows
+from core.stats import get_stats_keys, refresh_stats
+from .renderers import FastJSONRenderer
+from .serializers import get_fast_serializer
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "The resource was changed since it was read."
+    default_code = "precondition_failed"
+
+
+def get_validators(version, updated_at):
+    """
+    Return the strong ETag and the Last-Modified timestamp of a row from
+    its ``version`` and ``updated_at``. The time is part of the ETag as
+    SQLite may give the id of a deleted row to the next one.
+    """
+    if isinstance(updated_at, str):
+        updated_at = parse_datetime(updated_at)
+    micros = (updated_at - EPOCH) // timedelta(microseconds=1)
+    return f'"{version}-{micros}"', micros // 1_000_000
+
+
+class FastListMixin:
+    """
+    Serves the list action through the FastReadSerializer compiled from
+    the viewset's serializer, reading ``.values()`` rows instead of model
+    instances.
+
+    With ``?stream=ndjson`` the whole filtered queryset is sent as
+    newline-delimited JSON, one row per line, reading the rows with
+    ``.iterator()`` so memory stays constant for any table size.
+    """
+
+    stream_chunk_size = 2000
+
+    def list(self, request, *args, **kwargs):
+        serializer = get_fast_serializer(self.get_serializer_class())
+        queryset = serializer.values(self.filter_queryset(self.get_queryset()))
+        if request.query_params.get("stream") == "ndjson":
+            return StreamingHttpResponse(
+                self.stream_rows(queryset, serializer),
+                content_type="application/x-ndjson",
+            )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.many(page))
+        return Response(serializer.many(queryset))
+
+    def stream_rows(self, queryset, serializer):
+        """Yield each row of the queryset as a line of JSON"""
+        renderer = FastJSONRenderer()
+        render = serializer.bind()
+        for row in queryset.order_by("pk").iterator(chunk_size=self.stream_chunk_size):
+            yield renderer.render(render(row)) + b"\n"
+
+
+class FastDestroyMixin:
+    """
+    Deletes the row of a DELETE request, and the rows cascading from it,
+    with one DELETE per table instead of loading it first, and responds
+    with the number of rows deleted per model.
+    """
+
+    def destroy(self, request, *args, **kwargs):
+        model = self.queryset.model
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        try:
+            pk = model._meta.pk.to_python(lookup)
+        except DjangoValidationError:
+            raise NotFound
+        total, deleted = delete_rows(model, [pk])
+        if not deleted[model._meta.label]:
+            raise NotFound
+        return Response({"total": total, "deleted": deleted})
+
+
+class BulkMixin:
+    """
+    Adds a ``bulk/`` route to the viewset that takes a list of rows:
+    POST creates them, PATCH updates them (each row carries its ``id``)
+    and DELETE removes ``{"ids": [...]}``. Related objects are loaded
+    with one query per foreign key and every write runs in one
+    transaction.
+    """
+
+    def get_related_objects(self, rows):
+        """Load the objects referenced by the rows, one query per FK"""
+        related = {}
+        for field in self.queryset.model._meta.concrete_fields:
+            if not field.is_relation:
+                continue
+            model = field.related_model
+            pks = set()
+            for row in rows:
+                try:
+                    pks.add(model._meta.pk.to_python(row.get(field.name)))
+                except DjangoValidationError:
+                    continue
+            pks.discard(None)
+            related[model] = model.objects.in_bulk(pks)
+        return related
+
+    def get_bulk_rows(self, request, require_id=False):
+        rows = request.data
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValidationError("Expected a list of objects.")
+        if require_id and not all("id" in row for row in rows):
+            raise ValidationError("Every object must have an id.")
+        return rows
+
+    def get_bulk_pks(self, ids):
+        try:
+            return [self.queryset.model._meta.pk.to_python(pk) for pk in ids]
+        except DjangoValidationError:
+            raise ValidationError({"ids": "Invalid id."})
+
+    def get_bulk_serializer(self, rows, instance=None):
+        context = self.get_serializer_context()
+        context["related_objects"] = self.get_related_objects(rows)
+        return self.get_serializer(
+            instance,
+            data=rows,
+            many=True,
+            partial=instance is not None,
+            context=context,
+        )
+
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk_create(self, request):
+        rows = self.get_bulk_rows(request)
+        serializer = self.get_bulk_serializer(rows)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            instances = serializer.save()
+            refresh_stats(get_stats_keys(instances))
+        invalidate_instances(instances)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @bulk_create.mapping.patch
+    def bulk_update(self, request):
+        rows = self.get_bulk_rows(request, require_id=True)
+        pks = self.get_bulk_pks([row["id"] for row in rows])
+        instances = self.get_queryset().in_bulk(pks)
+        if len(instances) != len(set(pks)):
+            raise NotFound("One or more objects do not exist.")
+        instances = [instances[pk] for pk in pks]
+        serializer = self.get_bulk_serializer(rows, instances)
+        serializer.is_valid(raise_exception=True)
+        stats_keys = get_stats_keys(instances)
+        with transaction.atomic():
+            serializer.save()
+            refresh_stats(stats_keys | get_stats_keys(instances))
+        invalidate_instances(instances)
+        return Response(serializer.data)
+
+    @bulk_create.mapping.delete
+    def bulk_destroy(self, request):
+        ids = request.data.get("ids") if isinstance(request.data, dict) else None
+        if not isinstance(ids, list):
+            raise ValidationError({"ids": "Expected a list of ids."})
+        pks = self.get_bulk_pks(ids)
+        total, deleted = delete_rows(self.queryset.model, pks)
+        return Response({"total": total, "deleted": deleted})
+
+
+class CachedResponseMixin:
+    """
+    Serves the list and retrieve actions from the response cache, keyed
+    by the request URL and its sorted query string. Lists are tagged with
+    their model and details with their row, so the model signals evict
+    exactly the entries a write affects, and with the cascade tag of
+    their model for the deletions of a parent, see core.deletion.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get("stream"):
+            return super().list(request, *args, **kwargs)
+        tags = [model_tag(self.queryset.model)]
+        return self.cached_response(request, tags, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        model = self.queryset.model
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        try:
+            tags = [
+                instance_tag(model, model._meta.pk.to_python(lookup)),
+                cascade_tag(model),
+            ]
+        except DjangoValidationError:
+            return super().retrieve(request, *args, **kwargs)
+        return self.cached_response(request, tags, super().retrieve, *args, **kwargs)
+
+    def cached_response(self, request, tags, handler, *args, **kwargs):
+        key = response_cache.make_key(
+            "rest",
+            request.build_absolute_uri(request.path),
+            sorted(request.query_params.lists()),
+        )
+        started_at = response_cache.now()
+        data = response_cache.get(key)
+        if data is not None:
+            return Response(data, headers={"X-Cache": "HIT"})
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response_cache.set(key, response.data, tags, started_at)
+            response["X-Cache"] = "MISS"
+        return response
+
+
+class ConditionalMixin:
+    """
+    Conditional requests on the detail route of a VersionedModel. Its
+    responses carry a strong ETag and Last-Modified from the row's
+    ``version`` and ``updated_at``.
+
+    A GET with If-None-Match or If-Modified-Since reads only those two
+    columns and answers 304 when the client's copy is current, without
+    loading or serializing the row. A PUT, PATCH or DELETE with If-Match
+    or If-Unmodified-Since checks them on the locked row in the write's
+    transaction, answering 412 when the row changed since it was read.
+    """
+
+    cache_headers = ("HTTP_IF_NONE_MATCH", "HTTP_IF_MODIFIED_SINCE")
+    precondition_headers = ("HTTP_IF_MATCH", "HTTP_IF_UNMODIFIED_SINCE")
+
+    def has_preconditions(self):
+        return any(header in self.request.META for header in self.precondition_headers)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method not in ("GET", "HEAD") and self.has_preconditions():
+            queryset = queryset.select_for_update()
+        return queryset
+
+    def get_object(self):
+        instance = super().get_object()
+        self.check_preconditions(instance.version, instance.updated_at)
+        return instance
+
+    def get_row_state(self):
+        """Return the ``version`` and ``updated_at`` of the requested row"""
+        model = self.queryset.model
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        try:
+            pk = model._meta.pk.to_python(lookup)
+        except DjangoValidationError:
+            raise NotFound
+        queryset = self.filter_queryset(self.get_queryset()).filter(pk=pk)
+        state = queryset.values_list("version", "updated_at").first()
+        if state is None:
+            raise NotFound
+        return state
+
+    def check_preconditions(self, version, updated_at):
+        """
+        Return the 304 response a GET is answered with, if any. Raises
+        PreconditionFailed when the request's preconditions fail.
+        """
+        etag, last_modified = get_validators(version, updated_at)
+        validators = self.set_validators(HttpResponse(), etag, last_modified)
+        response = get_conditional_response(
+            self.request, etag, last_modified, validators
+        )
+        if response.status_code == status.HTTP_412_PRECONDITION_FAILED:
+            raise PreconditionFailed()
+        if response is not validators:
+            return response
+        return None
+
+    def set_validators(self, response, etag, last_modified):
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def add_validators(self, response):
+        data = response.data
+        if response.status_code == status.HTTP_200_OK and isinstance(data, dict):
+            self.set_validators(
+                response, *get_validators(data["version"], data["updated_at"])
+            )
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        if any(header in request.META for header in self.cache_headers):
+            response = self.check_preconditions(*self.get_row_state())
+            if response is not None:
+                return response
+        return self.add_validators(super().retrieve(request, *args, **kwargs))
+
+    def update(self, request, *args, **kwargs):
+        if not self.has_preconditions():
+            return self.add_validators(super().update(request, *args, **kwargs))
+        with transaction.atomic():
+            return self.add_validators(super().update(request, *args, **kwargs))
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        # the UPDATE incremented the version in the database only
+        serializer.instance.refresh_from_db(fields=["version"])
+
+    def destroy(self, request, *args, **kwargs):
+        if not self.has_preconditions():
+            return super().destroy(request, *args, **kwargs)
+        with transaction.atomic():
+            self.check_preconditions(*self.get_row_state())
+            return super().destroy(request, *args, **kwargs)
@@ -0,0 +1,35 @@
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination ordered by primary key, or by the ``ordering``
+    fields of the view and then the primary key.
+
+    The cursor stores the last id seen, so every page is fetched with
+    ``WHERE id > cursor LIMIT n`` and costs the same however deep it is.
+    """
+
+    ordering = "id"
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Return the requested ordering followed by the primary key, so rows
+        equal on the ordering fields, e.g. of one ``status``, keep the same
+        order on every page and none is skipped or repeated.
+        """
+        ordering = super().get_ordering(request, queryset, view)
+        fields = {field.lstrip("-") for field in ordering}
+        if fields.isdisjoint({"pk", queryset.model._meta.pk.name}):
+            direction = "-" if ordering[-1].startswith("-") else ""
+            ordering = (*ordering, f"{direction}pk")
+        return ordering
+
+
+class StatsPagination(KeysetPagination):
+    """Keyset pagination of the stats tables, keyed by their parent row."""
+
+    ordering = "pk"
@@ -1,5 +1,89 @@
-from rest_framework import serializers
-from core.models import Cliente, Atividade, Projeto
+from functools import lru_cache
+from operator import methodcaller
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.functional import cached_property
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from core.models import (
+    Cliente,
+    Atividade,
+    Projeto,
+    ClienteStats,
+    ProjetoStats,
+    Job,
+    VersionedModel,
+)
+
+
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField that looks the related object up in the
+    ``related_objects`` serializer context, a ``{model: {pk: object}}``
+    map loaded once for a whole batch, before falling back to a query.
+    """
+
+    def to_internal_value(self, data):
+        related = self.context.get("related_objects", {})
+        model = self.get_queryset().model
+        if model not in related:
+            return super().to_internal_value(data)
+        try:
+            pk = model._meta.pk.to_python(data)
+        except Exception:
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if pk not in related[model]:
+            self.fail("does_not_exist", pk_value=data)
+        return related[model][pk]
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    ListSerializer that writes a whole batch with ``bulk_create`` and
+    ``bulk_update``. For updates, ``instance`` is the list of objects in
+    the same order as the payload.
+    """
+
+    batch_size = 1000
+
+    @cached_property
+    def instance_map(self):
+        return {obj.pk: obj for obj in self.instance}
+
+    def run_child_validation(self, data):
+        if self.instance is not None:
+            pk = self.child.Meta.model._meta.pk.to_python(data["id"])
+            self.child.instance = self.instance_map[pk]
+            self.child.initial_data = data
+        return super().run_child_validation(data)
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        return model.objects.bulk_create(
+            [model(**attrs) for attrs in validated_data], batch_size=self.batch_size
+        )
+
+    def update(self, instances, validated_data):
+        fields = set()
+        for instance, attrs in zip(instances, validated_data):
+            for attr, value in attrs.items():
+                setattr(instance, attr, value)
+                fields.add(attr)
+        if fields:
+            model = self.child.Meta.model
+            model.objects.bulk_update(instances, fields, batch_size=self.batch_size)
+            if issubclass(model, VersionedModel):
+                # the UPDATE incremented the versions in the database only
+                stored = {
+                    pk: (version, updated_at)
+                    for pk, version, updated_at in model._base_manager.filter(
+                        pk__in=[instance.pk for instance in instances]
+                    ).values_list("pk", "version", "updated_at")
+                }
+                for instance in instances:
+                    instance.version, instance.updated_at = stored[instance.pk]
+        return instances
 
 
 class ClienteModelSerializer(serializers.ModelSerializer):
@@ -23,9 +107,12 @@ class ProjetoModelSerializer(serializers.ModelSerializer):
     be converted to and from JSON format.
     """
 
+    serializer_related_field = CachedPrimaryKeyRelatedField
+
     class Meta:
         model = Projeto
         fields = "__all__"
+        list_serializer_class = BulkListSerializer
 
 
 class AtividadeModelSerializer(serializers.ModelSerializer):
@@ -36,6 +123,204 @@ class AtividadeModelSerializer(serializers.ModelSerializer):
     be converted to and from JSON format.
     """
 
+    serializer_related_field = CachedPrimaryKeyRelatedField
+
     class Meta:
         model = Atividade
         fields = "__all__"
+        list_serializer_class = BulkListSerializer
+
+
+class ClienteStatsSerializer(serializers.ModelSerializer):
+    """
+    Django REST Framework ModelSerializer for the ClienteStats summary.
+    """
+
+    class Meta:
+        model = ClienteStats
+        fields = "__all__"
+
+
+class ProjetoStatsSerializer(serializers.ModelSerializer):
+    """
+    Django REST Framework ModelSerializer for the ProjetoStats summary.
+    """
+
+    class Meta:
+        model = ProjetoStats
+        fields = "__all__"
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """
+    Django REST Framework ModelSerializer for the status of a Job.
+    """
+
+    class Meta:
+        model = Job
+        fields = "__all__"
+
+
+class JobCreateSerializer(serializers.Serializer):
+    """
+    Input of a new Job. Imports take an uploaded ``file`` of ``model``
+    rows, exports a ``format`` and ``gzip``, and deletes the ``ids`` of
+    ``model`` rows.
+    """
+
+    REQUIRED = {
+        "import": ["model", "file"],
+        "export": [],
+        "delete": ["model", "ids"],
+    }
+
+    kind = serializers.ChoiceField(choices=Job.KIND_CHOICES)
+    model = serializers.ChoiceField(
+        choices=["clientes", "projetos", "atividades"], required=False
+    )
+    format = serializers.ChoiceField(choices=["ndjson", "csv"], required=False)
+    gzip = serializers.BooleanField(default=False)
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False
+    )
+    file = serializers.FileField(required=False)
+
+    def validate(self, attrs):
+        missing = [name for name in self.REQUIRED[attrs["kind"]] if name not in attrs]
+        if missing:
+            raise serializers.ValidationError(
+                {name: "This field is required." for name in missing}
+            )
+        if attrs["kind"] == "import" and "format" not in attrs:
+            extension = attrs["file"].name.rsplit(".", 1)[-1].lower()
+            if extension not in ("csv", "ndjson", "jsonl"):
+                raise serializers.ValidationError(
+                    {"format": "Cannot infer the format, set it."}
+                )
+            attrs["format"] = "csv" if extension == "csv" else "ndjson"
+        return attrs
+
+
+class IsoDateTimeConverter:
+    """
+    Converter matching DateTimeField.to_representation for the ISO 8601
+    output of aware datetimes, the common case under USE_TZ. It is bound
+    to the current timezone once per batch of rows.
+    """
+
+    def __init__(self, field):
+        self.field = field
+
+    @classmethod
+    def compile(cls, field):
+        output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+        if (
+            not settings.USE_TZ
+            or hasattr(field, "timezone")
+            or output_format is None
+            or output_format.lower() != ISO_8601
+        ):
+            return field.to_representation
+        return cls(field)
+
+    def bind(self, tz):
+        fallback = self.field.to_representation
+
+        def convert(value):
+            if not timezone.is_aware(value):
+                return fallback(value)
+            value = value.astimezone(tz).isoformat()
+            if value.endswith("+00:00"):
+                value = value[:-6] + "Z"
+            return value
+
+        return convert
+
+
+class FastReadSerializer:
+    """
+    Read-only counterpart of a ModelSerializer for list endpoints.
+
+    The output of every field is precompiled once into a ``.values()``
+    column and a converter, so a row is rendered from a plain dict
+    without going through the per-field dispatch of ``to_representation``.
+    Fields without a cheap converter fall back to the DRF field itself,
+    so the output is the same as the ModelSerializer's.
+    """
+
+    def __init__(self, serializer_class):
+        model = serializer_class.Meta.model
+        self.columns = []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                column, convert = model._meta.get_field(field.source).attname, None
+            elif isinstance(field, serializers.DateTimeField):
+                column, convert = field.source, IsoDateTimeConverter.compile(field)
+            elif isinstance(field, serializers.DateField):
+                column, convert = field.source, methodcaller("isoformat")
+            elif isinstance(
+                field,
+                (
+                    serializers.CharField,
+                    serializers.ChoiceField,
+                    serializers.IntegerField,
+                    serializers.BooleanField,
+                    serializers.ReadOnlyField,
+                ),
+            ):
+                column, convert = field.source, None
+            else:
+                column, convert = field.source, field.to_representation
+            self.columns.append((name, column, convert))
+
+    def values(self, queryset):
+        """Return the queryset as dicts holding only the needed columns"""
+        return queryset.values(*dict.fromkeys(column for _, column, _ in self.columns))
+
+    def bind_columns(self, tz):
+        """Return the ``(name, column, converter)`` of every field for a timezone"""
+        return [
+            (
+                name,
+                column,
+                (
+                    convert.bind(tz)
+                    if isinstance(convert, IsoDateTimeConverter)
+                    else convert
+                ),
+            )
+            for name, column, convert in self.columns
+        ]
+
+    def bind(self):
+        """
+        Return a function rendering one row, with the converters bound to
+        the current timezone so it is looked up once per batch.
+        """
+        columns = self.bind_columns(timezone.get_current_timezone())
+
+        def render(row):
+            ret = {}
+            for name, column, convert in columns:
+                value = row[column]
+                ret[name] = (
+                    value if convert is None or value is None else convert(value)
+                )
+            return ret
+
+        return render
+
+    def to_representation(self, row):
+        return self.bind()(row)
+
+    def many(self, rows):
+        render = self.bind()
+        return [render(row) for row in rows]
+
+
+@lru_cache(maxsize=None)
+def get_fast_serializer(serializer_class):
+    """Return the FastReadSerializer compiled for a ModelSerializer class"""
+    return FastReadSerializer(serializer_class)
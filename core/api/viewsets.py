@@ -1,13 +1,42 @@
-from rest_framework import viewsets
-from core.models import Cliente, Projeto, Atividade
+import os
+
+from django.core.exceptions import ValidationError
+from django.http import FileResponse
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from core.jobs import enqueue_request, get_path
+from core.models import Cliente, Projeto, Atividade, ClienteStats, ProjetoStats, Job
+from core.stats import get_cliente_stats, get_projeto_stats
 from .serializers import (
     ClienteModelSerializer,
     ProjetoModelSerializer,
     AtividadeModelSerializer,
+    ClienteStatsSerializer,
+    ProjetoStatsSerializer,
+    JobSerializer,
+    JobCreateSerializer,
+)
+from .filters import FieldFilterBackend, FullTextSearchFilter
+from .mixins import (
+    BulkMixin,
+    CachedResponseMixin,
+    ConditionalMixin,
+    FastDestroyMixin,
+    FastListMixin,
 )
+from .pagination import KeysetPagination, StatsPagination
 
 
-class ClienteModelViewSet(viewsets.ModelViewSet):
+class ClienteModelViewSet(
+    ConditionalMixin,
+    CachedResponseMixin,
+    FastDestroyMixin,
+    FastListMixin,
+    viewsets.ModelViewSet,
+):
     """
     ModelViewSet for the Cliente model.
     Provides CRUD operations for Cliente using Django Rest Framework.
@@ -15,9 +44,17 @@ class ClienteModelViewSet(viewsets.ModelViewSet):
 
     serializer_class = ClienteModelSerializer
     queryset = Cliente.objects.all()
+    pagination_class = KeysetPagination
 
 
-class ProjetoModelViewSet(viewsets.ModelViewSet):
+class ProjetoModelViewSet(
+    BulkMixin,
+    ConditionalMixin,
+    CachedResponseMixin,
+    FastDestroyMixin,
+    FastListMixin,
+    viewsets.ModelViewSet,
+):
     """
     ModelViewSet for the Projeto model.
     Provides CRUD operations for Cliente using Django Rest Framework.
@@ -25,9 +62,26 @@ class ProjetoModelViewSet(viewsets.ModelViewSet):
 
     serializer_class = ProjetoModelSerializer
     queryset = Projeto.objects.all()
+    pagination_class = KeysetPagination
+    filter_backends = [
+        FieldFilterBackend,
+        FullTextSearchFilter,
+        SearchFilter,
+        OrderingFilter,
+    ]
+    filter_fields = {"status": ["exact", "in"], "cliente": ["exact", "in"]}
+    search_fields = ["nome", "descricao"]
+    ordering_fields = ["id", "nome", "status"]
 
 
-class AtividadeModelViewSet(viewsets.ModelViewSet):
+class AtividadeModelViewSet(
+    BulkMixin,
+    ConditionalMixin,
+    CachedResponseMixin,
+    FastDestroyMixin,
+    FastListMixin,
+    viewsets.ModelViewSet,
+):
     """
     ModelViewSet for the Atividade model.
     Provides CRUD operations for Cliente using Django Rest Framework.
@@ -35,3 +89,93 @@ class AtividadeModelViewSet(viewsets.ModelViewSet):
 
     serializer_class = AtividadeModelSerializer
     queryset = Atividade.objects.all()
+    pagination_class = KeysetPagination
+    filter_backends = [
+        FieldFilterBackend,
+        FullTextSearchFilter,
+        SearchFilter,
+        OrderingFilter,
+    ]
+    filter_fields = {
+        "projeto": ["exact", "in"],
+        "prazo": ["gte", "lte"],
+        "data_criacao": ["gte", "lte"],
+    }
+    search_fields = ["descricao"]
+    ordering_fields = ["id", "prazo", "data_criacao"]
+
+
+class StatsViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only access to a stats table. Rows are read through
+    ``get_stats``, which counts the missing or outdated ones.
+    """
+
+    pagination_class = StatsPagination
+    get_stats = None
+
+    def get_object(self):
+        try:
+            pk = self.queryset.model._meta.pk.to_python(self.kwargs["pk"])
+        except ValidationError:
+            raise NotFound()
+        stats = self.get_stats([pk]).get(pk)
+        if stats is None:
+            raise NotFound()
+        self.check_object_permissions(self.request, stats)
+        return stats
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is None:
+            return page
+        stats = self.get_stats([row.pk for row in page])
+        return [stats[row.pk] for row in page]
+
+
+class ClienteStatsViewSet(StatsViewSet):
+    """
+    ReadOnlyModelViewSet for the projeto counts of each Cliente.
+    """
+
+    serializer_class = ClienteStatsSerializer
+    queryset = ClienteStats.objects.all()
+    get_stats = staticmethod(get_cliente_stats)
+
+
+class ProjetoStatsViewSet(StatsViewSet):
+    """
+    ReadOnlyModelViewSet for the atividade counts of each Projeto.
+    """
+
+    serializer_class = ProjetoStatsSerializer
+    queryset = ProjetoStats.objects.all()
+    get_stats = staticmethod(get_projeto_stats)
+
+
+class JobViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Queue of background jobs. POST queues an import, export or delete and
+    answers 202 with the job, whose status and progress are then read
+    from its detail. ``download/`` sends the file an export wrote, or the
+    rejected rows of an import.
+    """
+
+    serializer_class = JobSerializer
+    queryset = Job.objects.all()
+    pagination_class = KeysetPagination
+
+    def create(self, request, *args, **kwargs):
+        serializer = JobCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = enqueue_request(serializer.validated_data)
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True)
+    def download(self, request, pk=None):
+        job = self.get_object()
+        result = job.result or {}
+        name = result.get("file") or result.get("rejects")
+        if job.status != "concluido" or not name or not os.path.exists(get_path(name)):
+            raise NotFound("The job has no file to download.")
+        return FileResponse(open(get_path(name), "rb"), as_attachment=True)
@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        from core import signals  # noqa: F401
+        from core.changes import install_change_triggers
+        from core.search import install_search_triggers
+
+        post_migrate.connect(install_search_triggers, sender=self)
+        post_migrate.connect(install_change_triggers, sender=self)
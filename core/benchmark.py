@@ -0,0 +1,279 @@
+import json
+import random
+from contextlib import ExitStack
+from datetime import timedelta
+from statistics import quantiles
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Cliente, Projeto, Atividade
+from core.profiling import RequestProfile
+from core.stats import get_stats_keys, refresh_stats
+
+WORDS = (
+    "revisar enviar criar configurar testar publicar orçamento contrato "
+    "relatório reunião cliente fornecedor página loja servidor banco dados "
+    "backup layout campanha pagamento fatura cadastro integração api "
+    "migração documentação treinamento suporte homologação entrega"
+).split()
+
+
+def seed(clientes, projetos, atividades, batch_size=5000, seed=0):
+    """
+    Add ``clientes`` clientes with ``projetos`` projetos each and
+    ``atividades`` atividades per projeto, with random names, statuses and
+    prazos around today. Rows are written with ``bulk_create``, a few
+    clientes per transaction so memory stays bounded, and their stats are
+    recounted. Returns the number of rows added per model.
+    """
+    rng = random.Random(seed)
+    statuses = [status for status, _ in Projeto.STATUS_CHOICES]
+    today = timezone.localdate()
+    per_cliente = 1 + projetos + projetos * atividades
+    chunk = max(1, batch_size // per_cliente)
+    start = (
+        Cliente.objects.order_by("-pk").values_list("pk", flat=True).first() or 0
+    ) + 1
+    counts = {Cliente: 0, Projeto: 0, Atividade: 0}
+
+    for offset in range(0, clientes, chunk):
+        numbers = range(start + offset, start + min(offset + chunk, clientes))
+        with transaction.atomic():
+            new_clientes = Cliente.objects.bulk_create(
+                Cliente(
+                    nome=f"cliente {n}",
+                    email=f"bench{n}@example.com",
+                    telefone=f"+55119{rng.randrange(10**8):08d}",
+                )
+                for n in numbers
+            )
+            new_projetos = Projeto.objects.bulk_create(
+                (
+                    Projeto(
+                        nome=" ".join(rng.sample(WORDS, 3)),
+                        descricao=" ".join(rng.sample(WORDS, 8)),
+                        cliente=cliente,
+                        status=rng.choice(statuses),
+                    )
+                    for cliente in new_clientes
+                    for _ in range(projetos)
+                ),
+                batch_size=batch_size,
+            )
+            Atividade.objects.bulk_create(
+                (
+                    Atividade(
+                        projeto=projeto,
+                        descricao=" ".join(rng.sample(WORDS, 6)),
+                        prazo=today + timedelta(days=rng.randint(-180, 180)),
+                    )
+                    for projeto in new_projetos
+                    for _ in range(atividades)
+                ),
+                batch_size=batch_size,
+            )
+            refresh_stats(get_stats_keys([*new_clientes, *new_projetos]))
+        counts[Cliente] += len(new_clientes)
+        counts[Projeto] += len(new_projetos)
+        counts[Atividade] += len(new_projetos) * atividades
+    return counts
+
+
+GRAPHQL_NESTED_QUERY = """
+query {
+    allProjetos(first: 50) {
+        edges { node { nome status cliente { nome } atividades { descricao prazo } } }
+    }
+}
+"""
+
+GRAPHQL_CREATE_MUTATION = """
+mutation ($projetoId: ID!, $prazo: Date!) {
+    createAtividade(
+        input: {projetoId: $projetoId, descricao: "benchmark", prazo: $prazo}
+    ) {
+        atividade { id }
+    }
+}
+"""
+
+
+class BenchmarkError(Exception):
+    """A benchmark request failed or there is no data to run it on."""
+
+
+class Scenario:
+    """
+    One request of the benchmark suite. ``request(sample)`` returns the
+    method, path and keyword arguments of a request for a sample row, and
+    ``max_queries`` is the most SQL queries it may run. Requests adding an
+    atividade have ``created(response)`` return its primary key.
+    """
+
+    def __init__(self, name, request, max_queries, status=200, created=None):
+        self.name = name
+        self.request = request
+        self.max_queries = max_queries
+        self.status = status
+        self.created = created
+
+
+def graphql(query, variables=None):
+    return {
+        "data": json.dumps({"query": query, "variables": variables or {}}),
+        "content_type": "application/json",
+    }
+
+
+SCENARIOS = [
+    Scenario(
+        "rest list",
+        lambda sample: ("get", reverse("core:projetos-list"), {}),
+        max_queries=1,
+    ),
+    Scenario(
+        "rest retrieve",
+        lambda sample: (
+            "get",
+            reverse("core:clientes-detail", args=[sample.projeto.cliente_id]),
+            {},
+        ),
+        max_queries=1,
+    ),
+    Scenario(
+        "rest create",
+        lambda sample: (
+            "post",
+            reverse("core:atividades-list"),
+            {
+                "data": {
+                    "projeto": sample.projeto.pk,
+                    "descricao": "benchmark",
+                    "prazo": str(sample.prazo),
+                },
+                "content_type": "application/json",
+            },
+        ),
+        max_queries=3,
+        status=201,
+        created=lambda response: response.json()["id"],
+    ),
+    Scenario(
+        "graphql nested query",
+        lambda sample: ("post", "/api/graphql/", graphql(GRAPHQL_NESTED_QUERY)),
+        max_queries=2,
+    ),
+    Scenario(
+        "graphql mutation",
+        lambda sample: (
+            "post",
+            "/api/graphql/",
+            graphql(
+                GRAPHQL_CREATE_MUTATION,
+                {"projetoId": sample.projeto.pk, "prazo": str(sample.prazo)},
+            ),
+        ),
+        max_queries=2,
+        created=lambda response: response.json()["data"]["createAtividade"][
+            "atividade"
+        ]["id"],
+    ),
+]
+
+
+class ScenarioResult:
+    """Latencies and query counts of the requests of one scenario."""
+
+    def __init__(self, scenario, latencies, queries):
+        self.scenario = scenario
+        self.latencies = latencies
+        self.queries = queries
+
+    @property
+    def max_queries(self):
+        return max(self.queries)
+
+    @property
+    def regressed(self):
+        return self.max_queries > self.scenario.max_queries
+
+    def percentile(self, n):
+        if len(self.latencies) < 2:
+            return self.latencies[0]
+        return quantiles(self.latencies, n=100, method="inclusive")[n - 1]
+
+    @property
+    def throughput(self):
+        return len(self.latencies) / sum(self.latencies)
+
+
+def run_request(client, scenario, sample):
+    """
+    Send one request of a scenario and return its latency, queries and
+    the primary key of the atividade it created, if any.
+    """
+    method, path, kwargs = scenario.request(sample)
+    profile = RequestProfile()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(profile))
+        started = perf_counter()
+        response = getattr(client, method)(path, **kwargs)
+        latency = perf_counter() - started
+    if response.status_code != scenario.status or (
+        path == "/api/graphql/" and "errors" in response.json()
+    ):
+        raise BenchmarkError(
+            f"{scenario.name}: {response.status_code} {response.content[:500]!r}"
+        )
+    created = scenario.created(response) if scenario.created else None
+    return latency, profile.query_count, created
+
+
+def run_suite(requests=200, warmup=10, scenarios=None, seed=0):
+    """
+    Run every scenario ``requests`` times, after ``warmup`` untimed
+    requests, against the rows in the database, and return their
+    ScenarioResults. The response cache is disabled so every request
+    reaches the database, and the atividades the scenarios create, and
+    only those, are deleted at the end.
+    """
+    rng = random.Random(seed)
+    # sampled from the stored keys, which may have gaps
+    pks = list(Atividade.objects.order_by("pk").values_list("pk", flat=True))
+    samples = list(
+        Atividade.objects.select_related("projeto").filter(
+            pk__in=rng.sample(pks, min(len(pks), 100))
+        )
+    )
+    if not samples:
+        raise BenchmarkError("No atividades to benchmark, run seed_benchmark first.")
+    client = Client()
+    results, created = [], []
+    overrides = {
+        "ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, "testserver"],
+        "RESPONSE_CACHE_TIMEOUT": 0,
+    }
+    try:
+        with override_settings(**overrides):
+            for scenario in scenarios or SCENARIOS:
+                for _ in range(warmup):
+                    *_, pk = run_request(client, scenario, rng.choice(samples))
+                    created.append(pk)
+                latencies, queries = [], []
+                for _ in range(requests):
+                    latency, count, pk = run_request(
+                        client, scenario, rng.choice(samples)
+                    )
+                    latencies.append(latency)
+                    queries.append(count)
+                    created.append(pk)
+                results.append(ScenarioResult(scenario, latencies, queries))
+    finally:
+        Atividade.objects.filter(pk__in=[pk for pk in created if pk]).delete()
+    return results
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core.routers import reads_from_replicas
+
+
+def model_tag(model):
+    """Tag of every list of a model, e.g. ``core.projeto``"""
+    return model._meta.label_lower
+
+
+def instance_tag(model, pk):
+    """Tag of a single row, e.g. ``core.projeto:1``"""
+    return f"{model._meta.label_lower}:{pk}"
+
+
+def cascade_tag(model):
+    """
+    Tag of every response with single rows of a model, e.g.
+    ``core.projeto:cascade``, evicted when a deletion cascades to rows of
+    the model without reading them back one by one.
+    """
+    return f"{model._meta.label_lower}:cascade"
+
+
+def relation_tag(model, pk, name):
+    """Tag of the children of a row, e.g. ``core.cliente:1:projetos``"""
+    return f"{model._meta.label_lower}:{pk}:{name}"
+
+
+def get_invalidation_tags(instance):
+    """
+    Return the tags affected by a change to an instance: the row itself,
+    the lists of its model and the children list of each of its parents.
+    """
+    model = type(instance)
+    tags = [instance_tag(model, instance.pk), model_tag(model)]
+    for field in model._meta.concrete_fields:
+        if field.many_to_one and field.remote_field.related_name:
+            parent_pk = getattr(instance, field.attname)
+            if parent_pk is not None:
+                tags.append(
+                    relation_tag(
+                        field.related_model, parent_pk, field.remote_field.related_name
+                    )
+                )
+    return tags
+
+
+def invalidate_instances(instances):
+    """
+    Evict the responses that include any of the instances, for writes
+    that do not send model signals such as ``bulk_create``.
+    """
+    tags = set()
+    for instance in instances:
+        tags.update(get_invalidation_tags(instance))
+    if tags:
+        response_cache.invalidate(tags)
+
+
+class ResponseCache:
+    """
+    Cache of read responses on top of a Django cache backend, so it runs
+    on the local-memory LRU by default and on Redis when ``CACHE_URL``
+    points to one.
+
+    Every entry carries tags and the time its response started to be
+    computed. Invalidating a tag stores the time it happened, and an
+    entry is only served while all its tags were last invalidated before
+    it started, so a write racing with a read never leaves it stale.
+    """
+
+    key_prefix = "response"
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, "RESPONSE_CACHE_ALIAS", "default")]
+
+    @property
+    def timeout(self):
+        return getattr(settings, "RESPONSE_CACHE_TIMEOUT", 300)
+
+    @property
+    def enabled(self):
+        return bool(self.timeout)
+
+    def make_key(self, *parts):
+        """Build a cache key from JSON-serializable parts"""
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return f"{self.key_prefix}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+    def _tag_key(self, tag):
+        return f"{self.key_prefix}:tag:{tag}"
+
+    @staticmethod
+    def now():
+        return time.time_ns()
+
+    def get(self, key):
+        """Return the cached value, or None when missing or invalidated"""
+        if not self.enabled:
+            return None
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        started_at, tags, value = entry
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        invalidated = self.cache.get_many(tag_keys)
+        if len(invalidated) != len(tag_keys):
+            return None
+        if any(at >= started_at for at in invalidated.values()):
+            return None
+        return value
+
+    @property
+    def replica_lag(self):
+        return int(getattr(settings, "DATABASE_REPLICA_LAG", 1.0) * 1e9)
+
+    def set(self, key, value, tags, started_at):
+        """
+        Cache a value computed from ``started_at`` under the given tags.
+        A value read from a replica is not cached while one of its tags
+        was invalidated less than DATABASE_REPLICA_LAG seconds before, as
+        the replica may not have applied that write yet.
+        """
+        if not self.enabled:
+            return
+        tags = sorted(set(tags))
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        if reads_from_replicas():
+            invalidated = self.cache.get_many(tag_keys)
+            if any(at > started_at - self.replica_lag for at in invalidated.values()):
+                return
+        for tag_key in tag_keys:
+            self.cache.add(tag_key, 0, timeout=None)
+        self.cache.set(key, (started_at, tags, value), timeout=self.timeout)
+
+    def invalidate(self, tags):
+        """Evict every entry carrying one of the tags"""
+        if not self.enabled:
+            return
+        now = self.now()
+        self.cache.set_many({self._tag_key(tag): now for tag in tags}, timeout=None)
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,218 @@
+from datetime import timedelta
+
+from django.db import connections, router, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Now
+
+from core.models import Change, Cliente, Projeto, Atividade
+
+# models logged by the triggers and the foreign key to their parent
+LOGGED_MODELS = {Cliente: None, Projeto: "cliente", Atividade: "projeto"}
+
+# models of the feed by name, e.g. ``atividade``
+FEED_MODELS = {model._meta.model_name: model for model in LOGGED_MODELS}
+
+MAX_PAGE_SIZE = 1000
+
+
+class CursorExpired(Exception):
+    """The changes after a cursor were pruned, the client must reload."""
+
+
+class ChangeFeed:
+    """A page of changes and the cursor to ask for the next one."""
+
+    def __init__(self, changes, cursor, has_more):
+        self.changes = changes
+        self.cursor = cursor
+        self.has_more = has_more
+
+
+def get_txid_horizon(connection):
+    """
+    Return the expression of the oldest transaction still running on
+    PostgreSQL: entries written by older transactions are all committed
+    and no more can come from them, while any entry seen later has a txid
+    from this one on. On SQLite writers hold the database lock from their
+    first write to their commit, so ids already follow commit order and
+    None is returned.
+    """
+    if connection.vendor == "postgresql":
+        return RawSQL("txid_snapshot_xmin(txid_current_snapshot())", [])
+    return None
+
+
+def get_feed_queryset():
+    """Return the entries of the log the feed may serve, see get_txid_horizon"""
+    queryset = Change.objects.all()
+    horizon = get_txid_horizon(connections[router.db_for_read(Change)])
+    if horizon is not None:
+        queryset = queryset.filter(txid__lt=horizon)
+    return queryset
+
+
+def get_feed_end():
+    """Return the (txid, id) of the last entry the feed may serve"""
+    last = (
+        get_feed_queryset().order_by("-txid", "-pk").values_list("txid", "pk").first()
+    )
+    return last or (0, 0)
+
+
+def after_cursor(txid, pk):
+    return Q(txid__gt=txid) | Q(txid=txid, pk__gt=pk)
+
+
+def format_cursor(txid, pk):
+    return f"{txid}:{pk}"
+
+
+def parse_cursor(cursor):
+    """Return the (txid, id) of a cursor, a plain id being one of txid 0"""
+    try:
+        txid, pk = map(int, cursor.split(":")) if ":" in cursor else (0, int(cursor))
+    except (AttributeError, ValueError):
+        raise ValueError("Invalid cursor.")
+    if txid < 0 or pk < 0:
+        raise ValueError("Invalid cursor.")
+    return txid, pk
+
+
+def get_changes(cursor=None, model=None, parent_id=None, limit=100):
+    """
+    Return the ChangeFeed of the changes after ``cursor``, in the order
+    their transactions committed, optionally of one model of FEED_MODELS
+    and one parent. Without a cursor the feed starts at its current end,
+    so a client loads the rows first and then follows their changes.
+
+    A row changed several times has one entry per change. Raises
+    CursorExpired when the entries after the cursor were pruned.
+    """
+    if cursor is None:
+        return ChangeFeed([], format_cursor(*get_feed_end()), False)
+    queryset = get_feed_queryset()
+    txid, pk = parse_cursor(cursor)
+    after = after_cursor(txid, pk)
+    if Change.objects.filter(after, action="prune").exists():
+        raise CursorExpired("The changes after this cursor were pruned.")
+    queryset = queryset.filter(after).exclude(action="prune")
+    if model is not None:
+        queryset = queryset.filter(model=FEED_MODELS[model]._meta.label_lower)
+    if parent_id is not None:
+        queryset = queryset.filter(parent_id=parent_id)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    changes = list(queryset.order_by("txid", "pk")[: limit + 1])
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if changes:
+        txid, pk = changes[-1].txid, changes[-1].pk
+    return ChangeFeed(changes, format_cursor(txid, pk), has_more)
+
+
+def get_changed_model(change):
+    return FEED_MODELS[change.model.split(".", 1)[1]]
+
+
+def load_instances(changes):
+    """
+    Attach the current row of each change as ``change.instance``, None
+    once deleted, with one query per model.
+    """
+    ids = {}
+    for change in changes:
+        ids.setdefault(get_changed_model(change), set()).add(change.object_id)
+    rows = {model: model.objects.in_bulk(pks) for model, pks in ids.items()}
+    for change in changes:
+        change.instance = rows[get_changed_model(change)].get(change.object_id)
+    return changes
+
+
+def prune_changes(days):
+    """
+    Delete the entries older than ``days`` days, returning how many. The
+    newest of them is kept as a ``prune`` entry, so a cursor before it is
+    known to be expired.
+    """
+    cutoff = Now() - timedelta(days=days)
+    boundary = (
+        get_feed_queryset()
+        .filter(changed_at__lt=cutoff)
+        .order_by("-txid", "-pk")
+        .first()
+    )
+    if boundary is None:
+        return 0
+    with transaction.atomic():
+        deleted, _ = (
+            Change.objects.exclude(after_cursor(boundary.txid, boundary.pk))
+            .exclude(pk=boundary.pk)
+            .delete()
+        )
+        Change.objects.filter(pk=boundary.pk).update(action="prune")
+    return deleted
+
+
+SQLITE_TRIGGERS = {
+    "ai": ("AFTER INSERT", "new", "create", None),
+    "au": ("AFTER UPDATE", "new", "update", None),
+    # a row moved to another parent leaves the list of the old one
+    "am": ("AFTER UPDATE", "old", "update", "old.{parent} IS NOT new.{parent}"),
+    "ad": ("AFTER DELETE", "old", "delete", None),
+}
+
+
+def install_sqlite_triggers(connection):
+    """
+    Create the triggers writing the change log of the logged models, and
+    replace those created with another definition by an older version.
+    SQLite drops the triggers of a table each time a migration rebuilds
+    it, so this runs after every migrate.
+    """
+    with connection.cursor() as cursor:
+        tables = set(connection.introspection.table_names(cursor))
+        if Change._meta.db_table not in tables:
+            return
+        # not before the migrations adding the columns they write are run
+        columns = {
+            column.name
+            for column in connection.introspection.get_table_description(
+                cursor, Change._meta.db_table
+            )
+        }
+        if not {field.column for field in Change._meta.concrete_fields} <= columns:
+            return
+        for model, parent in LOGGED_MODELS.items():
+            table = model._meta.db_table
+            cursor.execute(
+                "SELECT name, sql FROM sqlite_master "
+                "WHERE type = 'trigger' AND tbl_name = %s",
+                [table],
+            )
+            existing = dict(cursor.fetchall())
+            column = model._meta.get_field(parent).column if parent else None
+            for suffix, (event, row, action, when) in SQLITE_TRIGGERS.items():
+                name = f"{table}_change_{suffix}"
+                if when and not column:
+                    continue
+                condition = f"WHEN {when.format(parent=column)} " if when else ""
+                parent_value = f"{row}.{column}" if column else "NULL"
+                sql = (
+                    f"CREATE TRIGGER {name} {event} ON {table} {condition}BEGIN "
+                    f"INSERT INTO {Change._meta.db_table} "
+                    "(model, object_id, parent_id, action, changed_at, txid) VALUES ("
+                    f"'{model._meta.label_lower}', {row}.id, {parent_value}, "
+                    f"'{action}', strftime('%Y-%m-%d %H:%M:%f', 'now'), 0); END"
+                )
+                if existing.get(name) == sql:
+                    continue
+                if name in existing:
+                    cursor.execute(f"DROP TRIGGER {name}")
+                cursor.execute(sql)
+
+
+def install_change_triggers(sender, using, **kwargs):
+    """post_migrate receiver installing the SQLite change log triggers"""
+    connection = connections[using]
+    if connection.vendor == "sqlite":
+        install_sqlite_triggers(connection)
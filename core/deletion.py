@@ -0,0 +1,132 @@
+from django.db import connections, models, router, transaction
+
+from core.cache import (
+    cascade_tag,
+    invalidate_instances,
+    model_tag,
+    relation_tag,
+    response_cache,
+)
+from core.stats import get_stats_keys, refresh_stats
+
+# databases where DELETE ... RETURNING hands back the deleted rows
+RETURNING_VENDORS = {"postgresql", "sqlite"}
+
+
+def get_cascades(model, path=""):
+    """
+    Yield the models whose rows are deleted along with rows of ``model``
+    through ``on_delete=CASCADE``, with the lookup from each of them to
+    the deleted rows, children before their parents.
+    """
+    for relation in model._meta.get_fields(include_hidden=True):
+        if (
+            relation.auto_created
+            and not relation.concrete
+            and (relation.one_to_many or relation.one_to_one)
+            and relation.on_delete is models.CASCADE
+        ):
+            lookup = f"{relation.field.name}__{path}" if path else relation.field.name
+            yield from get_cascades(relation.related_model, lookup)
+            yield relation.related_model, lookup
+
+
+def get_key_fields(model):
+    """Return the primary key and foreign key attnames of a model"""
+    fields = [model._meta.pk.attname]
+    for field in model._meta.concrete_fields:
+        if field.many_to_one:
+            fields.append(field.attname)
+    return fields
+
+
+def delete_returning(queryset, fields):
+    """
+    Delete the rows of a queryset and return the ``fields`` values of
+    each, with a single ``DELETE ... RETURNING`` where the database has
+    it and a SELECT of the keys and a DELETE by them elsewhere.
+    """
+    model = queryset.model
+    connection = connections[queryset.db]
+    if (
+        connection.vendor in RETURNING_VENDORS
+        and connection.features.can_return_columns_from_insert
+    ):
+        quote = connection.ops.quote_name
+        select, params = queryset.order_by().values("pk").query.sql_with_params()
+        columns = ", ".join(
+            quote(model._meta.get_field(name).column) for name in fields
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {quote(model._meta.db_table)} "
+                f"WHERE {quote(model._meta.pk.column)} IN ({select}) "
+                f"RETURNING {columns}",
+                params,
+            )
+            return cursor.fetchall()
+    rows = list(queryset.order_by().values_list(*fields))
+    if rows:
+        model._base_manager.using(queryset.db).filter(
+            pk__in=[row[0] for row in rows]
+        )._raw_delete(queryset.db)
+    return rows
+
+
+def get_cascade_tags(model, pks):
+    """
+    Return the tags evicting the cached responses with rows cascading
+    from the given rows of ``model``: the lists and single rows of each
+    child model and the children lists of the deleted parents.
+    """
+    tags = set()
+    for child, lookup in get_cascades(model):
+        tags.update([model_tag(child), cascade_tag(child)])
+        if "__" in lookup:
+            continue
+        related_name = child._meta.get_field(lookup).remote_field.related_name
+        if related_name and not related_name.endswith("+"):
+            tags.update(relation_tag(model, pk, related_name) for pk in pks)
+    return tags
+
+
+def delete_rows(model, pks, using=None):
+    """
+    Delete the rows of ``model`` with the given primary keys and every
+    row cascading from them, with one DELETE per table instead of loading
+    them in the deletion collector and sending a ``post_delete`` per row.
+
+    Children are deleted before their parents, all in one transaction,
+    and counted by the rows each DELETE affected. Only the keys of the
+    given rows are read back, to recount the stats of their parents and
+    evict their cached responses; those of the children are evicted by
+    model, see get_cascade_tags. The ``ON DELETE CASCADE`` of the foreign
+    keys on PostgreSQL removes children inserted meanwhile.
+    Returns ``(total, {model label: rows deleted})`` like
+    ``QuerySet.delete()``.
+    """
+    using = using or router.db_for_write(model)
+    pks = list(pks)
+    counts = {}
+    with transaction.atomic(using=using):
+        for child, lookup in get_cascades(model):
+            queryset = child._base_manager.using(using).filter(**{f"{lookup}__in": pks})
+            counts[child._meta.label] = queryset._raw_delete(using)
+        queryset = model._base_manager.using(using).filter(pk__in=pks)
+        fields = get_key_fields(model)
+        instances = [
+            model.from_db(using, fields, row)
+            for row in delete_returning(queryset, fields)
+        ]
+        counts[model._meta.label] = len(instances)
+        # the stats rows sharing the primary key of a deleted row went with it
+        gone = {
+            (child, instance.pk)
+            for child, lookup in get_cascades(model)
+            if child._meta.pk.name == lookup
+            for instance in instances
+        }
+        refresh_stats(get_stats_keys(instances) - gone)
+    invalidate_instances(instances)
+    response_cache.invalidate(get_cascade_tags(model, [i.pk for i in instances]))
+    return sum(counts.values()), counts
@@ -0,0 +1,169 @@
+import csv
+import zlib
+
+from django.utils import timezone
+
+from core.api.renderers import FastJSONRenderer
+from core.api.serializers import (
+    AtividadeModelSerializer,
+    ClienteModelSerializer,
+    ProjetoModelSerializer,
+    get_fast_serializer,
+)
+from core.models import Cliente
+
+# levels of the exported graph: name, path from Cliente, serializer of the
+# rows and the field pointing to the parent, left out of the export
+LEVELS = (
+    ("cliente", "", ClienteModelSerializer, None),
+    ("projeto", "projetos__", ProjetoModelSerializer, "cliente"),
+    ("atividade", "projetos__atividades__", AtividadeModelSerializer, "projeto"),
+)
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+CHUNK_SIZE = 2000
+BUFFER_SIZE = 64 * 1024
+
+
+def get_columns():
+    """Return the ``(level, name, column, converter)`` of every exported field"""
+    tz = timezone.get_current_timezone()
+    columns = []
+    for level, path, serializer_class, parent in LEVELS:
+        serializer = get_fast_serializer(serializer_class)
+        for name, column, convert in serializer.bind_columns(tz):
+            if name != parent:
+                columns.append((level, name, path + column, convert))
+    return columns
+
+
+def iter_rows(queryset=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield one row per atividade, joined with its projeto and cliente, as
+    a ``{level: {field: value}}`` dict. Clientes without projetos and
+    projetos without atividades have a row whose missing levels hold
+    only None values.
+
+    The rows come from a single ordered query read with ``.iterator()``,
+    a server-side cursor on PostgreSQL, so memory stays constant.
+    """
+    if queryset is None:
+        queryset = Cliente.objects.all()
+    columns = get_columns()
+    rows = queryset.values(*(column for _, _, column, _ in columns)).order_by(
+        "pk", "projetos__pk", "projetos__atividades__pk"
+    )
+    for row in rows.iterator(chunk_size=chunk_size):
+        record = {level: {} for level, *_ in LEVELS}
+        for level, name, column, convert in columns:
+            value = row[column]
+            record[level][name] = (
+                value if convert is None or value is None else convert(value)
+            )
+        yield record
+
+
+def iter_clientes(rows):
+    """
+    Group the rows of ``iter_rows`` into one dict per cliente, with its
+    projetos and their atividades nested. Only one cliente is held in
+    memory at a time.
+    """
+    cliente = projeto = None
+    for row in rows:
+        if cliente is None or row["cliente"]["id"] != cliente["id"]:
+            if cliente is not None:
+                yield cliente
+            cliente = {**row["cliente"], "projetos": []}
+            projeto = None
+        if row["projeto"]["id"] is None:
+            continue
+        if projeto is None or row["projeto"]["id"] != projeto["id"]:
+            projeto = {**row["projeto"], "atividades": []}
+            cliente["projetos"].append(projeto)
+        if row["atividade"]["id"] is not None:
+            projeto["atividades"].append(row["atividade"])
+    if cliente is not None:
+        yield cliente
+
+
+class Echo:
+    """File-like object returning what is written, for ``csv.writer``"""
+
+    def write(self, value):
+        return value
+
+
+def ndjson_lines(rows):
+    renderer = FastJSONRenderer()
+    for cliente in iter_clientes(rows):
+        yield renderer.render(cliente) + b"\n"
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    columns = get_columns()
+    yield writer.writerow(f"{level}_{name}" for level, name, _, _ in columns).encode()
+    for row in rows:
+        yield writer.writerow(
+            row[level][name] for level, name, _, _ in columns
+        ).encode()
+
+
+def buffered(chunks, size=BUFFER_SIZE):
+    """Join small chunks into chunks of about ``size`` bytes"""
+    buffer, length = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield b"".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def gzip_chunks(chunks):
+    """Compress a stream of chunks into a gzip stream"""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def count_rows(queryset=None):
+    """Return the number of rows ``iter_rows`` yields, with one COUNT query"""
+    if queryset is None:
+        queryset = Cliente.objects.all()
+    return queryset.values("pk", "projetos__pk", "projetos__atividades__pk").count()
+
+
+def report_rows(rows, on_rows, every=CHUNK_SIZE):
+    """Pass rows through, calling ``on_rows(n)`` every ``every`` rows and at the end"""
+    count = 0
+    for count, row in enumerate(rows, 1):
+        yield row
+        if count % every == 0:
+            on_rows(count)
+    on_rows(count)
+
+
+def export(format, queryset=None, compress=False, chunk_size=CHUNK_SIZE, on_rows=None):
+    """
+    Return an iterator of the bytes of every cliente with its projetos and
+    atividades. NDJSON has one cliente per line with the rest nested, CSV
+    one row per atividade with the cliente and projeto columns repeated.
+    ``on_rows(n)`` is called as the rows are read, for progress reports.
+    """
+    lines = {"ndjson": ndjson_lines, "csv": csv_lines}[format]
+    rows = iter_rows(queryset, chunk_size)
+    if on_rows is not None:
+        rows = report_rows(rows, on_rows, chunk_size)
+    chunks = buffered(lines(rows))
+    return gzip_chunks(chunks) if compress else chunks
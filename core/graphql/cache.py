@@ -0,0 +1,57 @@
+from django.db.models import Model, QuerySet
+from graphene.relay import Connection
+from graphene.utils.str_converters import to_snake_case
+
+from core.cache import cascade_tag, instance_tag, model_tag, relation_tag
+
+
+def add_cache_tags(info, *tags):
+    """Tag the cached response of the current request, if any"""
+    cache_tags = getattr(info.context, "cache_tags", None)
+    if cache_tags is not None:
+        cache_tags.update(tags)
+
+
+def skip_cache(info):
+    """Keep the response of the current request out of the cache"""
+    info.context.cache_tags = None
+
+
+class CacheTagMiddleware:
+    """
+    Graphene middleware collecting the cache tags of a response from the
+    values resolved for it: every row and the cascade tag of its model,
+    the children lists of every parent and the model of every connection.
+    """
+
+    def resolve(self, next, root, info, **args):
+        result = next(root, info, **args)
+        if getattr(info.context, "cache_tags", None) is not None:
+            self.collect(info, root, result)
+        return result
+
+    def collect(self, info, root, result):
+        if isinstance(result, Model):
+            add_cache_tags(
+                info, instance_tag(type(result), result.pk), cascade_tag(type(result))
+            )
+        elif isinstance(result, Connection):
+            add_cache_tags(info, model_tag(type(result)._meta.node._meta.model))
+        elif isinstance(result, (list, tuple, QuerySet)):
+            add_cache_tags(
+                info,
+                *(
+                    tag
+                    for item in result
+                    if isinstance(item, Model)
+                    for tag in (
+                        instance_tag(type(item), item.pk),
+                        cascade_tag(type(item)),
+                    )
+                ),
+            )
+            if isinstance(root, Model):
+                add_cache_tags(
+                    info,
+                    relation_tag(type(root), root.pk, to_snake_case(info.field_name)),
+                )
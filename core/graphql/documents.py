@@ -0,0 +1,121 @@
+import hashlib
+import json
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import caches
+from graphql import GraphQLError, parse, print_ast, validate
+
+
+def sha256(query):
+    """Return the hex sha256 of a query, as sent by persisted query clients"""
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+class ParsedDocument:
+    """A query document that was parsed and validated against the schema."""
+
+    def __init__(self, document, errors):
+        self.document = document
+        self.errors = errors
+        self._normalized = None
+
+    @property
+    def normalized(self):
+        """Document printed back without whitespace or comment differences"""
+        if self._normalized is None:
+            self._normalized = print_ast(self.document)
+        return self._normalized
+
+
+class DocumentCache:
+    """
+    In-process LRU of parsed and validated documents keyed by the sha256
+    of the query text, so a repeated query skips parse and validate.
+    Documents that fail to parse are not cached.
+    """
+
+    def __init__(self, maxsize=None):
+        self._maxsize = maxsize
+        self._documents = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def maxsize(self):
+        if self._maxsize is not None:
+            return self._maxsize
+        return getattr(settings, "GRAPHQL_DOCUMENT_CACHE_SIZE", 1000)
+
+    def get(self, schema, query, validation_rules=None, max_errors=None, key=None):
+        """
+        Return the ParsedDocument of a query, parsing and validating it on
+        a miss. Raises GraphQLError when the query does not parse.
+        """
+        key = key or sha256(query)
+        with self._lock:
+            parsed = self._documents.get(key)
+            if parsed is not None:
+                self._documents.move_to_end(key)
+                return parsed
+
+        document = parse(query)
+        errors = validate(schema, document, validation_rules, max_errors)
+        parsed = ParsedDocument(document, errors)
+
+        with self._lock:
+            self._documents[key] = parsed
+            while len(self._documents) > self.maxsize:
+                self._documents.popitem(last=False)
+        return parsed
+
+    def clear(self):
+        with self._lock:
+            self._documents.clear()
+
+
+class PersistedQueryStore:
+    """
+    Store of persisted queries following the automatic persisted queries
+    protocol: a client sends ``extensions.persistedQuery.sha256Hash``
+    alone, and the full query only when the hash is not known yet.
+    Queries are kept in the Django cache, so every worker shares them.
+    """
+
+    key_prefix = "persisted-query"
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, "RESPONSE_CACHE_ALIAS", "default")]
+
+    def load(self, query_hash):
+        return self.cache.get(f"{self.key_prefix}:{query_hash}")
+
+    def save(self, query_hash, query):
+        if sha256(query) != query_hash:
+            raise GraphQLError("provided sha does not match query")
+        self.cache.set(f"{self.key_prefix}:{query_hash}", query, timeout=None)
+
+
+def get_persisted_query_hash(request, data):
+    """
+    Return the sha256Hash sent in the request extensions, if any, read
+    from the query string first as GraphQLView does for the query, so
+    persisted queries can be sent, and cached, as GET requests.
+    """
+    extensions = request.GET.get("extensions") or data.get("extensions") or {}
+    if isinstance(extensions, str):
+        try:
+            extensions = json.loads(extensions)
+        except ValueError:
+            return None
+    persisted = (
+        extensions.get("persistedQuery") if isinstance(extensions, dict) else None
+    )
+    if not isinstance(persisted, dict):
+        return None
+    return persisted.get("sha256Hash")
+
+
+document_cache = DocumentCache()
+persisted_queries = PersistedQueryStore()
@@ -24,3 +24,12 @@ class AtividadeInput(graphene.InputObjectType):
     projeto_id = graphene.ID(required=True)
     descricao = graphene.String(required=True)
     prazo = graphene.Date(required=True)
+
+
+class AtividadeBulkUpdateInput(graphene.InputObjectType):
+    """Input object type for one row of the bulkUpdateAtividades mutation."""
+
+    id = graphene.ID(required=True)
+    projeto_id = graphene.ID()
+    descricao = graphene.String()
+    prazo = graphene.Date()
@@ -0,0 +1,147 @@
+from collections import defaultdict
+
+from core.models import Cliente, Projeto, Atividade
+
+
+class DataLoader:
+    """
+    Request-scoped batch loader for the synchronous GraphQL executor.
+
+    Keys are queued with ``prime`` and the first ``load`` of a key that
+    is not cached yet flushes the whole queue through ``batch_load_fn``,
+    so every sibling primed at the same level is fetched with a single
+    query. ``key_fn`` normalizes keys, e.g. ids assigned as strings.
+    """
+
+    def __init__(self, batch_load_fn, default=None, key_fn=None):
+        self.batch_load_fn = batch_load_fn
+        self.default = default
+        self.key_fn = key_fn or (lambda key: key)
+        self._cache = {}
+        self._queue = {}
+
+    def prime(self, keys):
+        """Queue keys to be fetched on the next dispatch."""
+        for key in keys:
+            if key is None:
+                continue
+            key = self.key_fn(key)
+            if key not in self._cache:
+                self._queue[key] = None
+
+    def set(self, key, value):
+        """Cache a value already known, so it is never fetched."""
+        key = self.key_fn(key)
+        self._queue.pop(key, None)
+        self._cache[key] = value
+
+    def load(self, key):
+        """Return the value for a key, dispatching the queue if needed."""
+        key = self.key_fn(key)
+        if key not in self._cache:
+            self.prime([key])
+            self.dispatch()
+        return self._cache.get(key, self.default)
+
+    def dispatch(self):
+        """Fetch every queued key with a single call to batch_load_fn."""
+        keys = list(self._queue)
+        self._queue.clear()
+        if not keys:
+            return
+        results = self.batch_load_fn(keys)
+        for key in keys:
+            self._cache[key] = results.get(key, self.default)
+
+
+class Loaders:
+    """
+    The set of loaders used while resolving a single GraphQL request.
+
+    Every instance returned by a loader is handed back to ``track`` so the
+    relations of the next level are primed with all the siblings at once,
+    keeping a nested query at one ``IN (...)`` query per level.
+    """
+
+    def __init__(self):
+        cliente_pk = Cliente._meta.pk.to_python
+        projeto_pk = Projeto._meta.pk.to_python
+        self.projetos_by_cliente = DataLoader(
+            self._load_projetos_by_cliente, [], key_fn=cliente_pk
+        )
+        self.atividades_by_projeto = DataLoader(
+            self._load_atividades_by_projeto, [], key_fn=projeto_pk
+        )
+        self.cliente = DataLoader(self._load_clientes, key_fn=cliente_pk)
+        self.projeto = DataLoader(self._load_projetos, key_fn=projeto_pk)
+
+    def track(self, instances):
+        """
+        Prime the relation loaders with the given model instances.
+
+        Relations already prefetched or joined and foreign keys deferred
+        by ``.only()`` are left alone, so tracking never costs a query.
+        """
+        instances = list(instances)
+        for instance in instances:
+            deferred = instance.get_deferred_fields()
+            prefetched = getattr(instance, "_prefetched_objects_cache", {})
+            if isinstance(instance, Cliente):
+                if not deferred:
+                    self.cliente.set(instance.pk, instance)
+                if "projetos" not in prefetched:
+                    self.projetos_by_cliente.prime([instance.pk])
+            elif isinstance(instance, Projeto):
+                if not deferred:
+                    self.projeto.set(instance.pk, instance)
+                if "atividades" not in prefetched:
+                    self.atividades_by_projeto.prime([instance.pk])
+                if not (
+                    "cliente_id" in deferred or Projeto.cliente.is_cached(instance)
+                ):
+                    self.cliente.prime([instance.cliente_id])
+            elif isinstance(instance, Atividade):
+                if not (
+                    "projeto_id" in deferred or Atividade.projeto.is_cached(instance)
+                ):
+                    self.projeto.prime([instance.projeto_id])
+        return instances
+
+    def _group_by(self, queryset, attname):
+        grouped = defaultdict(list)
+        for instance in self.track(queryset):
+            grouped[getattr(instance, attname)].append(instance)
+        return grouped
+
+    def _load_projetos_by_cliente(self, keys):
+        return self._group_by(Projeto.objects.filter(cliente_id__in=keys), "cliente_id")
+
+    def _load_atividades_by_projeto(self, keys):
+        return self._group_by(
+            Atividade.objects.filter(projeto_id__in=keys), "projeto_id"
+        )
+
+    def _load_clientes(self, keys):
+        clientes = Cliente.objects.in_bulk(keys)
+        self.track(clientes.values())
+        return clientes
+
+    def _load_projetos(self, keys):
+        projetos = Projeto.objects.in_bulk(keys)
+        self.track(projetos.values())
+        return projetos
+
+
+def get_loaders(info):
+    """
+    Return the loaders bound to the current request, creating them on
+    first use. Without a request context a fresh set is returned.
+    """
+    context = info.context
+    if context is None:
+        return Loaders()
+    loaders = getattr(context, "loaders", None)
+    if loaders is None:
+        loaders = Loaders()
+        context.loaders = loaders
+    return loaders
@@ -1,8 +1,193 @@
 import graphene
-from .types import ClienteType, ProjetoType, AtividadeType
-from .inputs import ClienteInput, ProjetoInput, AtividadeInput
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models.signals import post_save, pre_save
+from graphql import GraphQLError
+from .types import ClienteType, ProjetoType, AtividadeType, DeletedCountType, JobType
+from .inputs import (
+    ClienteInput,
+    ProjetoInput,
+    AtividadeInput,
+    AtividadeBulkUpdateInput,
+)
+from core.api.serializers import JobCreateSerializer
+from core.cache import invalidate_instances
+from core.deletion import delete_rows
+from core.jobs import enqueue, enqueue_request
+from core.stats import get_stats_keys, refresh_stats
 from core.models import Cliente, Projeto, Atividade
 
+BULK_BATCH_SIZE = 1000
+
+
+def to_pks(model, ids):
+    """Convert GraphQL IDs to primary keys of the given model"""
+    try:
+        return [model._meta.pk.to_python(pk) for pk in ids]
+    except ValidationError:
+        raise GraphQLError(f"Invalid {model.__name__} id.")
+
+
+def check_exists(model, ids):
+    """Raise unless every id exists, using a single query"""
+    pks = set(to_pks(model, ids))
+    found = set(model.objects.filter(pk__in=pks).values_list("pk", flat=True))
+    missing = pks - found
+    if missing:
+        raise GraphQLError(
+            f"{model.__name__} does not exist: {', '.join(map(str, sorted(missing)))}."
+        )
+
+
+def validate_rows(instances, exclude):
+    """Run model validation on every row and report all the errors at once"""
+    errors = []
+    for index, instance in enumerate(instances):
+        try:
+            instance.full_clean(exclude=exclude, validate_unique=False)
+        except ValidationError as e:
+            errors.append(f"[{index}] {e.message_dict}")
+    if errors:
+        raise GraphQLError(f"Invalid input: {'; '.join(errors)}")
+
+
+def check_parents(model, values, using):
+    """
+    Check the parents referenced by ``values`` exist when the foreign key
+    constraints cannot report it: inside a transaction they are deferred
+    to the commit. Outside one the database checks them on write, so no
+    query is run.
+    """
+    if not connections[using].in_atomic_block:
+        return
+    for field in model._meta.concrete_fields:
+        if field.many_to_one and values.get(field.attname) is not None:
+            check_exists(field.related_model, [values[field.attname]])
+
+
+def parent_error(model, values, using):
+    """
+    Return the error naming the missing parents of a row whose write broke
+    a constraint, or None when they all exist and another constraint
+    failed, e.g. a NOT NULL or UNIQUE one. Only runs on the error path.
+    Inside a transaction check_parents already checked them, and the
+    failed statement may have aborted the transaction.
+    """
+    if connections[using].in_atomic_block:
+        return None
+    missing = [
+        f"{field.related_model.__name__} does not exist: {values[field.attname]}."
+        for field in model._meta.concrete_fields
+        if field.many_to_one
+        and values.get(field.attname) is not None
+        and not field.related_model._base_manager.using(using)
+        .filter(pk=values[field.attname])
+        .exists()
+    ]
+    return GraphQLError(" ".join(missing)) if missing else None
+
+
+def create_row(model, input):
+    """
+    Insert a row with its foreign keys assigned as ids, leaving their
+    existence to the database constraint instead of loading each parent.
+    """
+    values = dict(input)
+    for field in model._meta.concrete_fields:
+        if field.many_to_one and field.attname in values:
+            values[field.attname] = to_pks(
+                field.related_model, [values[field.attname]]
+            )[0]
+    using = router.db_for_write(model)
+    check_parents(model, values, using)
+    try:
+        return model.objects.using(using).create(**values)
+    except IntegrityError:
+        error = parent_error(model, values, using)
+        if error is None:
+            raise
+        raise error
+
+
+def update_row(model, id, input):
+    """
+    Update only the fields given in ``input`` with a single UPDATE, without
+    loading the row first; a row missing is told by the rows it updated.
+    The returned instance holds the given fields, the others are deferred
+    and only loaded if the response asks for them. ``pre_save`` and
+    ``post_save`` are sent as ``save()`` would, so stats and cached
+    responses follow: when ``input`` has a counted field the stats signal
+    reads the stored ones, and moves the row between counters if they
+    changed, see core.signals.
+    """
+    pk = to_pks(model, [id])[0]
+    values = {
+        model._meta.get_field(name).attname: value for name, value in input.items()
+    }
+    for field in model._meta.concrete_fields:
+        if field.many_to_one and field.attname in values:
+            values[field.attname] = to_pks(
+                field.related_model, [values[field.attname]]
+            )[0]
+    using = router.db_for_write(model)
+    check_parents(model, values, using)
+    instance = model.from_db(using, ["id", *values], [pk, *values.values()])
+    signal = {
+        "sender": model,
+        "instance": instance,
+        "raw": False,
+        "using": using,
+        "update_fields": frozenset(values),
+    }
+    pre_save.send(**signal)
+    try:
+        updated = model._base_manager.using(using).filter(pk=pk).update(**values)
+    except IntegrityError:
+        error = parent_error(model, values, using)
+        if error is None:
+            raise
+        raise error
+    if not updated:
+        raise GraphQLError(f"{model.__name__} does not exist: {pk}.")
+    post_save.send(created=False, **signal)
+    return instance
+
+
+def enqueue_delete(model, ids):
+    """Queue a job deleting the rows with the given ids, for ``run_jobs``"""
+    name = f"{model._meta.model_name}s"
+    return enqueue("delete", model=name, ids=to_pks(model, ids))
+
+
+def enqueue_job(**data):
+    """
+    Queue a job for ``run_jobs``, validated like the ones POSTed to the
+    REST jobs endpoint.
+    """
+    serializer = JobCreateSerializer(
+        data={name: value for name, value in data.items() if value is not None}
+    )
+    if not serializer.is_valid():
+        raise GraphQLError(
+            " ".join(
+                f"{name}: {' '.join(errors)}"
+                for name, errors in serializer.errors.items()
+            )
+        )
+    return enqueue_request(serializer.validated_data)
+
+
+def delete_by_ids(model, ids):
+    """
+    Delete the rows with the given ids, and the rows cascading from them,
+    with one DELETE per table. Returns the total rows deleted and the
+    count of each model.
+    """
+    total, deleted = delete_rows(model, to_pks(model, ids))
+    return total, [
+        DeletedCountType(model=label, count=count) for label, count in deleted.items()
+    ]
+
 
 class CreateClienteMutation(graphene.Mutation):
     """
@@ -31,10 +216,7 @@ class UpdateClienteMutation(graphene.Mutation):
     cliente = graphene.Field(ClienteType)
 
     def mutate(self, info, id, input):
-        cliente = Cliente.objects.get(pk=id)
-        for attr, value in input.items():
-            setattr(cliente, attr, value)
-        cliente.save()
+        cliente = update_row(Cliente, id, input)
         return UpdateClienteMutation(cliente=cliente)
 
 
@@ -47,14 +229,32 @@ class DeleteClienteMutation(graphene.Mutation):
         id = graphene.ID(required=True)
 
     success = graphene.Boolean()
+    deleted = graphene.List(DeletedCountType)
 
     def mutate(self, info, id):
-        try:
-            cliente = Cliente.objects.get(pk=id)
-            cliente.delete()
-            return DeleteClienteMutation(success=True)
-        except Cliente.DoesNotExist:
-            return DeleteClienteMutation(success=False)
+        total, deleted = delete_by_ids(Cliente, [id])
+        return DeleteClienteMutation(success=total > 0, deleted=deleted)
+
+
+class DeleteManyClientesMutation(graphene.Mutation):
+    """
+    Mutation for deleting many Clientes at once using the GraphQL API.
+    """
+
+    class Arguments:
+        ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+        background = graphene.Boolean(default_value=False)
+
+    total = graphene.Int()
+    deleted = graphene.List(DeletedCountType)
+    job = graphene.Field(JobType)
+
+    def mutate(self, info, ids, background):
+        if background:
+            job = enqueue_delete(Cliente, ids)
+            return DeleteManyClientesMutation(job=job)
+        total, deleted = delete_by_ids(Cliente, ids)
+        return DeleteManyClientesMutation(total=total, deleted=deleted)
 
 
 class CreateProjetoMutation(graphene.Mutation):
@@ -68,8 +268,7 @@ class CreateProjetoMutation(graphene.Mutation):
     projeto = graphene.Field(ProjetoType)
 
     def mutate(self, info, input):
-        cliente = Cliente.objects.get(pk=input.pop("cliente_id"))
-        projeto = Projeto.objects.create(cliente=cliente, **input)
+        projeto = create_row(Projeto, input)
         return CreateProjetoMutation(projeto=projeto)
 
 
@@ -85,10 +284,7 @@ class UpdateProjetoMutation(graphene.Mutation):
     projeto = graphene.Field(ProjetoType)
 
     def mutate(self, info, id, input):
-        projeto = Projeto.objects.get(pk=id)
-        for attr, value in input.items():
-            setattr(projeto, attr, value)
-        projeto.save()
+        projeto = update_row(Projeto, id, input)
         return UpdateProjetoMutation(projeto=projeto)
 
 
@@ -101,14 +297,32 @@ class DeleteProjetoMutation(graphene.Mutation):
         id = graphene.ID(required=True)
 
     success = graphene.Boolean()
+    deleted = graphene.List(DeletedCountType)
 
     def mutate(self, info, id):
-        try:
-            projeto = Projeto.objects.get(pk=id)
-            projeto.delete()
-            return DeleteProjetoMutation(success=True)
-        except Projeto.DoesNotExist:
-            return DeleteProjetoMutation(success=False)
+        total, deleted = delete_by_ids(Projeto, [id])
+        return DeleteProjetoMutation(success=total > 0, deleted=deleted)
+
+
+class DeleteManyProjetosMutation(graphene.Mutation):
+    """
+    Mutation for deleting many Projetos at once using the GraphQL API.
+    """
+
+    class Arguments:
+        ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+        background = graphene.Boolean(default_value=False)
+
+    total = graphene.Int()
+    deleted = graphene.List(DeletedCountType)
+    job = graphene.Field(JobType)
+
+    def mutate(self, info, ids, background):
+        if background:
+            job = enqueue_delete(Projeto, ids)
+            return DeleteManyProjetosMutation(job=job)
+        total, deleted = delete_by_ids(Projeto, ids)
+        return DeleteManyProjetosMutation(total=total, deleted=deleted)
 
 
 class CreateAtividade(graphene.Mutation):
@@ -122,8 +336,7 @@ class CreateAtividade(graphene.Mutation):
     atividade = graphene.Field(AtividadeType)
 
     def mutate(self, info, input):
-        projeto = Projeto.objects.get(pk=input.pop("projeto_id"))
-        atividade = Atividade.objects.create(projeto=projeto, **input)
+        atividade = create_row(Atividade, input)
         return CreateAtividade(atividade=atividade)
 
 
@@ -139,10 +352,7 @@ class UpdateAtividadeMutation(graphene.Mutation):
     atividade = graphene.Field(AtividadeType)
 
     def mutate(self, info, id, input):
-        atividade = Atividade.objects.get(pk=id)
-        for attr, value in input.items():
-            setattr(atividade, attr, value)
-        atividade.save()
+        atividade = update_row(Atividade, id, input)
         return UpdateAtividadeMutation(atividade=atividade)
 
 
@@ -155,14 +365,145 @@ class DeleteAtividadeMutation(graphene.Mutation):
         id = graphene.ID(required=True)
 
     success = graphene.Boolean()
+    deleted = graphene.List(DeletedCountType)
 
     def mutate(self, info, id):
-        try:
-            atividade = Atividade.objects.get(pk=id)
-            atividade.delete()
-            return DeleteAtividadeMutation(success=True)
-        except Atividade.DoesNotExist:
-            return DeleteAtividadeMutation(success=False)
+        total, deleted = delete_by_ids(Atividade, [id])
+        return DeleteAtividadeMutation(success=total > 0, deleted=deleted)
+
+
+class DeleteManyAtividadesMutation(graphene.Mutation):
+    """
+    Mutation for deleting many Atividades at once using the GraphQL API.
+    """
+
+    class Arguments:
+        ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+        background = graphene.Boolean(default_value=False)
+
+    total = graphene.Int()
+    deleted = graphene.List(DeletedCountType)
+    job = graphene.Field(JobType)
+
+    def mutate(self, info, ids, background):
+        if background:
+            job = enqueue_delete(Atividade, ids)
+            return DeleteManyAtividadesMutation(job=job)
+        total, deleted = delete_by_ids(Atividade, ids)
+        return DeleteManyAtividadesMutation(total=total, deleted=deleted)
+
+
+class BulkCreateAtividadesMutation(graphene.Mutation):
+    """
+    Mutation for creating many Atividades at once using the GraphQL API.
+    """
+
+    class Arguments:
+        input = graphene.List(graphene.NonNull(AtividadeInput), required=True)
+
+    atividades = graphene.List(AtividadeType)
+
+    def mutate(self, info, input):
+        check_exists(Projeto, [row.projeto_id for row in input])
+        atividades = [
+            Atividade(
+                projeto_id=Projeto._meta.pk.to_python(row.projeto_id),
+                descricao=row.descricao,
+                prazo=row.prazo,
+            )
+            for row in input
+        ]
+        validate_rows(atividades, exclude=["projeto", "data_criacao"])
+        with transaction.atomic():
+            atividades = Atividade.objects.bulk_create(
+                atividades, batch_size=BULK_BATCH_SIZE
+            )
+            refresh_stats(get_stats_keys(atividades))
+        invalidate_instances(atividades)
+        return BulkCreateAtividadesMutation(atividades=atividades)
+
+
+class BulkUpdateAtividadesMutation(graphene.Mutation):
+    """
+    Mutation for updating many Atividades at once using the GraphQL API.
+    """
+
+    class Arguments:
+        input = graphene.List(graphene.NonNull(AtividadeBulkUpdateInput), required=True)
+
+    atividades = graphene.List(AtividadeType)
+
+    def mutate(self, info, input):
+        pks = to_pks(Atividade, [row.id for row in input])
+        existing = Atividade.objects.in_bulk(pks)
+        missing = set(pks) - set(existing)
+        if missing:
+            raise GraphQLError(
+                f"Atividade does not exist: {', '.join(map(str, sorted(missing)))}."
+            )
+        projeto_ids = [row.projeto_id for row in input if row.projeto_id is not None]
+        if projeto_ids:
+            check_exists(Projeto, projeto_ids)
+
+        stats_keys = get_stats_keys(existing.values())
+        atividades, fields = [], set()
+        for pk, row in zip(pks, input):
+            atividade = existing[pk]
+            for attr, value in row.items():
+                if attr == "id" or value is None:
+                    continue
+                if attr == "projeto_id":
+                    value = Projeto._meta.pk.to_python(value)
+                setattr(atividade, attr, value)
+                fields.add(attr)
+            atividades.append(atividade)
+        validate_rows(atividades, exclude=["projeto"])
+        if fields:
+            with transaction.atomic():
+                Atividade.objects.bulk_update(
+                    atividades, fields, batch_size=BULK_BATCH_SIZE
+                )
+                refresh_stats(stats_keys | get_stats_keys(atividades))
+            invalidate_instances(atividades)
+        return BulkUpdateAtividadesMutation(atividades=atividades)
+
+
+class ImportFileMutation(graphene.Mutation):
+    """
+    Mutation queueing the import of a file of rows using the GraphQL API.
+    The file is a part of the multipart request, ``file`` being its name.
+    """
+
+    class Arguments:
+        model = graphene.String(required=True)
+        file = graphene.String(required=True)
+        format = graphene.String()
+
+    job = graphene.Field(JobType)
+
+    def mutate(self, info, model, file, format=None):
+        upload = info.context.FILES.get(file)
+        if upload is None:
+            raise GraphQLError(f"No file uploaded as {file}.")
+        job = enqueue_job(kind="import", model=model, file=upload, format=format)
+        return ImportFileMutation(job=job)
+
+
+class ExportFileMutation(graphene.Mutation):
+    """
+    Mutation queueing the export of every Cliente using the GraphQL API,
+    downloaded from the REST jobs endpoint once done.
+    """
+
+    class Arguments:
+        format = graphene.String()
+        gzip = graphene.Boolean(default_value=False)
+
+    job = graphene.Field(JobType)
+
+    def mutate(self, info, gzip, format=None):
+        job = enqueue_job(kind="export", format=format, gzip=gzip)
+        return ExportFileMutation(job=job)
 
 
 class Mutation(graphene.ObjectType):
@@ -174,11 +515,19 @@ class Mutation(graphene.ObjectType):
     create_cliente = CreateClienteMutation.Field()
     update_cliente = UpdateClienteMutation.Field()
     delete_cliente = DeleteClienteMutation.Field()
+    delete_many_clientes = DeleteManyClientesMutation.Field()
 
     create_projeto = CreateProjetoMutation.Field()
     update_projeto = UpdateProjetoMutation.Field()
     delete_projeto = DeleteProjetoMutation.Field()
+    delete_many_projetos = DeleteManyProjetosMutation.Field()
 
     create_atividade = CreateAtividade.Field()
     update_atividade = UpdateAtividadeMutation.Field()
     delete_atividade = DeleteAtividadeMutation.Field()
+    delete_many_atividades = DeleteManyAtividadesMutation.Field()
+    bulk_create_atividades = BulkCreateAtividadesMutation.Field()
+    bulk_update_atividades = BulkUpdateAtividadesMutation.Field()
+
+    import_file = ImportFileMutation.Field()
+    export_file = ExportFileMutation.Field()
@@ -0,0 +1,113 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from graphene.utils.str_converters import to_snake_case
+from graphql.language import FieldNode, FragmentSpreadNode, InlineFragmentNode
+
+
+def get_field_selections(info, field_nodes):
+    """
+    Return the FieldNodes selected under the given nodes, expanding
+    fragment spreads and inline fragments.
+    """
+    selections = []
+    for node in field_nodes:
+        if node.selection_set is not None:
+            selections.extend(_expand(info, node.selection_set.selections))
+    return selections
+
+
+def get_node_selections(info):
+    """
+    Return the FieldNodes selected on ``edges { node { ... } }`` of the
+    current connection field.
+    """
+    edges = [
+        selection
+        for selection in get_field_selections(info, info.field_nodes)
+        if selection.name.value == "edges"
+    ]
+    nodes = [
+        selection
+        for selection in get_field_selections(info, edges)
+        if selection.name.value == "node"
+    ]
+    return get_field_selections(info, nodes)
+
+
+def _expand(info, selections):
+    for selection in selections:
+        if isinstance(selection, FieldNode):
+            yield selection
+        elif isinstance(selection, FragmentSpreadNode):
+            fragment = info.fragments[selection.name.value]
+            yield from _expand(info, fragment.selection_set.selections)
+        elif isinstance(selection, InlineFragmentNode):
+            yield from _expand(info, selection.selection_set.selections)
+
+
+def _plan(model, selections, info, prefix=""):
+    """
+    Walk the selections of a model type and return the ``only`` field
+    paths, the ``select_related`` paths and, by path, the reverse
+    relations to prefetch with the selections made on them. A relation
+    selected under several aliases is prefetched once for all of them.
+    """
+    only, select, prefetch = [], [], {}
+    for selection in selections:
+        try:
+            field = model._meta.get_field(to_snake_case(selection.name.value))
+        except FieldDoesNotExist:
+            continue
+        path = prefix + field.name
+        if field.is_relation and field.concrete and not field.many_to_many:
+            only.append(path)
+            select.append(path)
+            nested = _plan(
+                field.related_model,
+                get_field_selections(info, [selection]),
+                info,
+                prefix=f"{path}__",
+            )
+            only.extend(nested[0])
+            select.extend(nested[1])
+            for nested_path, (related, nodes) in nested[2].items():
+                prefetch.setdefault(nested_path, (related, []))[1].extend(nodes)
+        elif field.one_to_many:
+            prefetch.setdefault(path, (field, []))[1].append(selection)
+        elif field.concrete:
+            only.append(path)
+    return only, select, prefetch
+
+
+def optimize(queryset, info, selections=None, required=()):
+    """
+    Narrow a queryset to what the GraphQL selection asks for.
+
+    Only the selected columns are fetched, forward relations are joined
+    with ``select_related`` and reverse relations are prefetched with their
+    own narrowed querysets. ``selections`` defaults to the fields selected
+    on the current field; ``required`` lists fields always loaded.
+    """
+    if selections is None:
+        selections = get_field_selections(info, info.field_nodes)
+    only, select, prefetch = _plan(queryset.model, selections, info)
+    only = list(dict.fromkeys([*required, *only])) or [queryset.model._meta.pk.name]
+    queryset = queryset.only(*only)
+    if select:
+        queryset = queryset.select_related(*dict.fromkeys(select))
+    if prefetch:
+        queryset = queryset.prefetch_related(
+            *(
+                Prefetch(
+                    path,
+                    queryset=optimize(
+                        field.related_model._default_manager.all(),
+                        info,
+                        get_field_selections(info, nodes),
+                        required=[field.field.name],
+                    ),
+                )
+                for path, (field, nodes) in prefetch.items()
+            )
+        )
+    return queryset
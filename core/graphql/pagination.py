@@ -0,0 +1,84 @@
+from base64 import b64decode, b64encode
+
+import graphene
+from graphene.relay import PageInfo
+from graphene_django.settings import graphene_settings
+from graphql import GraphQLError
+
+from .loaders import get_loaders
+
+CURSOR_PREFIX = "cursor:"
+
+
+def encode_cursor(pk):
+    """Build an opaque cursor from a primary key"""
+    return b64encode(f"{CURSOR_PREFIX}{pk}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return the primary key stored in a cursor"""
+    try:
+        value = b64decode(cursor.encode(), validate=True).decode()
+        if not value.startswith(CURSOR_PREFIX):
+            raise ValueError(value)
+        return int(value[len(CURSOR_PREFIX) :])
+    except ValueError:
+        raise GraphQLError(f"Invalid cursor: {cursor}.")
+
+
+class KeysetConnectionField(graphene.Field):
+    """
+    Field for a Relay connection paginated with keyset cursors.
+
+    Accepts ``first`` and ``after``; ``first`` defaults to and may not
+    exceed ``RELAY_CONNECTION_MAX_LIMIT`` from the GRAPHENE settings.
+    """
+
+    def __init__(self, connection, **kwargs):
+        kwargs.setdefault("first", graphene.Int())
+        kwargs.setdefault("after", graphene.String())
+        super().__init__(connection, **kwargs)
+
+
+def get_page_size(info, first=None):
+    """
+    Return the number of rows asked by ``first``, which defaults to and
+    may not exceed ``RELAY_CONNECTION_MAX_LIMIT``.
+    """
+    max_limit = graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+    if first is None:
+        return max_limit
+    if first < 0:
+        raise GraphQLError("Argument 'first' must be a non-negative integer.")
+    if first > max_limit:
+        raise GraphQLError(
+            f"Requesting {first} records on the `{info.field_name}` connection "
+            f"exceeds the `first` limit of {max_limit} records."
+        )
+    return first
+
+
+def paginate(queryset, info, connection, first=None, after=None):
+    """
+    Return one page of a queryset as a Relay connection.
+
+    Rows are ordered by primary key and the page starts right after the
+    ``after`` cursor, so the cost of a page does not grow with its depth.
+    """
+    first = get_page_size(info, first)
+    queryset = queryset.order_by("pk")
+    if after is not None:
+        queryset = queryset.filter(pk__gt=decode_cursor(after))
+    rows = get_loaders(info).track(queryset[: first + 1])
+    nodes = rows[:first]
+
+    edges = [
+        connection.Edge(node=node, cursor=encode_cursor(node.pk)) for node in nodes
+    ]
+    page_info = PageInfo(
+        start_cursor=edges[0].cursor if edges else None,
+        end_cursor=edges[-1].cursor if edges else None,
+        has_previous_page=after is not None,
+        has_next_page=len(rows) > first,
+    )
+    return connection(edges=edges, page_info=page_info)
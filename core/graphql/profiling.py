@@ -0,0 +1,36 @@
+from inspect import isawaitable
+from time import perf_counter
+
+from graphql import get_named_type, is_leaf_type
+
+from core.profiling import get_profile
+
+
+class ResolverTimingMiddleware:
+    """
+    Graphene middleware adding the time spent in each resolver to the
+    profile of the request, by ``Type.field``. Only root fields and fields
+    returning objects are timed, scalars are resolved from loaded rows.
+    It is a no-op unless ProfilingMiddleware profiles the request, and it
+    is the last middleware so it times the whole chain.
+    """
+
+    def resolve(self, next, root, info, **args):
+        profile = get_profile()
+        if profile is None or (
+            root is not None and is_leaf_type(get_named_type(info.return_type))
+        ):
+            return next(root, info, **args)
+        field = f"{info.parent_type.name}.{info.field_name}"
+        started = perf_counter()
+        result = next(root, info, **args)
+        if isawaitable(result):
+            return self.await_result(result, profile, field, started)
+        profile.add_resolver(field, perf_counter() - started)
+        return result
+
+    async def await_result(self, result, profile, field, started):
+        try:
+            return await result
+        finally:
+            profile.add_resolver(field, perf_counter() - started)
@@ -1,7 +1,37 @@
 import graphene
 from graphql import GraphQLError
-from .types import ClienteType, ProjetoType, AtividadeType
-from core.models import Cliente, Projeto, Atividade
+from .types import (
+    ClienteType,
+    ProjetoType,
+    AtividadeType,
+    ClienteConnection,
+    ProjetoConnection,
+    AtividadeConnection,
+    ClienteStatsType,
+    ProjetoStatsType,
+    SearchResultType,
+    JobType,
+    ChangeFeedType,
+)
+from .loaders import get_loaders
+from .optimizer import optimize, get_node_selections
+from .pagination import KeysetConnectionField, get_page_size, paginate
+from .cache import add_cache_tags, skip_cache
+from core.cache import model_tag, relation_tag
+from core.models import Cliente, Projeto, Atividade, Job
+from core.changes import FEED_MODELS, CursorExpired, get_changes, load_instances
+from core.stats import get_cliente_stats, get_projeto_stats
+from core.search import search
+
+
+def fetch_changes(cursor, model, parent_id, first):
+    """Return the ChangeFeed of ``changesSince``, reporting bad arguments"""
+    if model is not None and model not in FEED_MODELS:
+        raise GraphQLError(f"Model must be one of: {', '.join(FEED_MODELS)}.")
+    try:
+        return get_changes(cursor, model, parent_id, first or 100)
+    except (ValueError, CursorExpired) as e:
+        raise GraphQLError(str(e))
 
 
 class Query(graphene.ObjectType):
@@ -11,70 +41,144 @@ class Query(graphene.ObjectType):
     """
 
     # Cliente queries
-    all_clientes = graphene.List(ClienteType)
+    all_clientes = KeysetConnectionField(ClienteConnection)
     get_cliente = graphene.Field(ClienteType, id=graphene.Int(required=True))
 
     # Projeto queries
-    all_projetos = graphene.List(ProjetoType)
+    all_projetos = KeysetConnectionField(ProjetoConnection)
     get_projeto = graphene.Field(ProjetoType, id=graphene.Int(required=True))
     get_projetos_by_cliente_id = graphene.List(
         ProjetoType, cliente_id=graphene.Int(required=True)
     )
 
     # Atividade queries
-    all_atividades = graphene.List(AtividadeType)
+    all_atividades = KeysetConnectionField(AtividadeConnection)
     get_atividade = graphene.Field(AtividadeType, id=graphene.Int(required=True))
     get_atividades_by_projeto_id = graphene.List(
         AtividadeType, projeto_id=graphene.Int(required=True)
     )
 
-    def resolve_all_clientes(self, info):
-        """This method will return a list of clientes"""
-        return Cliente.objects.all()
+    # Search
+    search = graphene.List(
+        SearchResultType, text=graphene.String(required=True), first=graphene.Int()
+    )
+
+    # Summary queries
+    cliente_stats = graphene.Field(
+        ClienteStatsType, cliente_id=graphene.Int(required=True)
+    )
+    projeto_stats = graphene.Field(
+        ProjetoStatsType, projeto_id=graphene.Int(required=True)
+    )
+
+    # Background jobs
+    job = graphene.Field(JobType, id=graphene.Int(required=True))
+
+    # Change feed
+    changes_since = graphene.Field(
+        ChangeFeedType,
+        cursor=graphene.String(),
+        model=graphene.String(),
+        parent_id=graphene.Int(),
+        first=graphene.Int(),
+    )
+
+    def resolve_all_clientes(self, info, first=None, after=None):
+        """This method will return a page of clientes"""
+        queryset = optimize(Cliente.objects.all(), info, get_node_selections(info))
+        return paginate(queryset, info, ClienteConnection, first, after)
 
     def resolve_get_cliente(self, info, id):
         """This method will return a cliente from a cliente id"""
         try:
-            return Cliente.objects.get(pk=id)
+            return optimize(Cliente.objects.all(), info).get(pk=id)
         except Cliente.DoesNotExist:
             raise GraphQLError("Cliente does not exist.")
 
-    def resolve_all_projetos(self, info):
-        """This method will return a list of projetos"""
-        return Projeto.objects.all()
+    def resolve_all_projetos(self, info, first=None, after=None):
+        """This method will return a page of projetos"""
+        queryset = optimize(Projeto.objects.all(), info, get_node_selections(info))
+        return paginate(queryset, info, ProjetoConnection, first, after)
 
     def resolve_get_projeto(self, info, id):
         """This method will return a projeto from a projeto id"""
         try:
-            return Projeto.objects.get(pk=id)
+            return optimize(Projeto.objects.all(), info).get(pk=id)
         except Projeto.DoesNotExist:
             raise GraphQLError("Projeto does not exist.")
 
     def resolve_get_projetos_by_cliente_id(self, info, cliente_id):
         """This method will return a list of projetos attached to a cliente"""
+        add_cache_tags(info, relation_tag(Cliente, cliente_id, "projetos"))
         try:
-            return Projeto.objects.filter(cliente_id=cliente_id)
+            return get_loaders(info).track(
+                optimize(Projeto.objects.filter(cliente_id=cliente_id), info)
+            )
         except Projeto.DoesNotExist:
             return GraphQLError("No projetos found for this cliente.")
         except Exception as e:
             raise GraphQLError(f"Exception error: {str(e)}")
 
-    def resolve_all_atividades(self, info):
-        """This method will return a list of atividades"""
-        return Atividade.objects.all()
+    def resolve_all_atividades(self, info, first=None, after=None):
+        """This method will return a page of atividades"""
+        queryset = optimize(Atividade.objects.all(), info, get_node_selections(info))
+        return paginate(queryset, info, AtividadeConnection, first, after)
 
     def resolve_get_atividade(self, info, id):
         """This method will return an atividade from an atividade id"""
         try:
-            return Atividade.objects.get(pk=id)
+            return optimize(Atividade.objects.all(), info).get(pk=id)
         except Atividade.DoesNotExist:
             raise GraphQLError("Atividade does not exist.")
 
     def resolve_get_atividades_by_projeto_id(self, info, projeto_id):
         """This method will return a list of atividades attached to a projeto"""
+        add_cache_tags(info, relation_tag(Projeto, projeto_id, "atividades"))
         try:
-            return Atividade.objects.filter(projeto_id=projeto_id)
+            return get_loaders(info).track(
+                optimize(Atividade.objects.filter(projeto_id=projeto_id), info)
+            )
         except Atividade.DoesNotExist:
             return GraphQLError("No atividades found for this projeto.")
         except Exception as e:
             raise GraphQLError(f"Exception error: {str(e)}")
+
+    def resolve_cliente_stats(self, info, cliente_id):
+        """This method will return the projeto counts of a cliente"""
+        stats = get_cliente_stats([cliente_id]).get(cliente_id)
+        if stats is None:
+            raise GraphQLError("Cliente does not exist.")
+        return stats
+
+    def resolve_projeto_stats(self, info, projeto_id):
+        """This method will return the atividade counts of a projeto"""
+        stats = get_projeto_stats([projeto_id]).get(projeto_id)
+        if stats is None:
+            raise GraphQLError("Projeto does not exist.")
+        return stats
+
+    def resolve_job(self, info, id):
+        """This method will return the status of a background job"""
+        # jobs are updated by the workers, which do not evict responses
+        skip_cache(info)
+        try:
+            return Job.objects.get(pk=id)
+        except Job.DoesNotExist:
+            raise GraphQLError("Job does not exist.")
+
+    def resolve_changes_since(
+        self, info, cursor=None, model=None, parent_id=None, first=None
+    ):
+        """This method will return the changes after a cursor"""
+        # new entries are written by triggers, which do not evict responses
+        skip_cache(info)
+        feed = fetch_changes(cursor, model, parent_id, first)
+        load_instances(feed.changes)
+        return feed
+
+    def resolve_search(self, info, text, first=None):
+        """This method will return the projetos and atividades best matching a text"""
+        add_cache_tags(info, model_tag(Projeto), model_tag(Atividade))
+        hits = search(text, get_page_size(info, first))
+        get_loaders(info).track([hit.instance for hit in hits])
+        return hits
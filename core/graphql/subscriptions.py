@@ -0,0 +1,116 @@
+import asyncio
+from weakref import WeakKeyDictionary
+
+import graphene
+from django.conf import settings
+
+from core.changes import get_feed_end, load_instances, parse_cursor
+from .queries import fetch_changes
+from .types import ChangeFeedType
+from .websocket import database_sync_to_async
+
+
+def poll_changes(cursor, model, parent_id, first):
+    feed = fetch_changes(cursor, model, parent_id, first)
+    load_instances(feed.changes)
+    return feed
+
+
+class ChangeWatcher:
+    """
+    Looks for the end of the change log every CHANGE_FEED_POLL_INTERVAL
+    seconds while subscriptions wait for it, with one query for all the
+    subscriptions of an event loop, and wakes those it moved past.
+    """
+
+    def __init__(self):
+        self.end = None
+        self.error = None
+        self.waiting = 0
+        self.changed = asyncio.Condition()
+        self.task = None
+
+    async def wait(self, position):
+        """Wait until the end of the log is past ``position`` and return it"""
+        self.waiting += 1
+        try:
+            if self.task is None:
+                self.error = None
+                self.task = asyncio.ensure_future(self.run())
+            async with self.changed:
+                await self.changed.wait_for(
+                    lambda: self.error or (self.end or position) > position
+                )
+                if self.error:
+                    raise self.error
+                return self.end
+        finally:
+            self.waiting -= 1
+
+    async def run(self):
+        read_end = database_sync_to_async(get_feed_end)
+        try:
+            while self.waiting:
+                end = await read_end()
+                async with self.changed:
+                    self.end = end
+                    self.changed.notify_all()
+                await asyncio.sleep(settings.CHANGE_FEED_POLL_INTERVAL)
+        except Exception as e:
+            async with self.changed:
+                self.error = e
+                self.changed.notify_all()
+        finally:
+            self.task = None
+
+
+watchers = WeakKeyDictionary()
+
+
+def get_watcher():
+    """Return the ChangeWatcher of the running event loop"""
+    loop = asyncio.get_event_loop()
+    if loop not in watchers:
+        watchers[loop] = ChangeWatcher()
+    return watchers[loop]
+
+
+class Subscription(graphene.ObjectType):
+    """
+    The Subscription class represents the operations that push data to
+    the client, over the websocket served at ``/api/graphql/``.
+    """
+
+    changes = graphene.Field(
+        ChangeFeedType,
+        cursor=graphene.String(),
+        model=graphene.String(),
+        parent_id=graphene.Int(),
+        first=graphene.Int(),
+    )
+
+    async def subscribe_changes(
+        root, info, cursor=None, model=None, parent_id=None, first=None
+    ):
+        """
+        Send a page of the change log each time it has new entries, the
+        same as polling ``changesSince`` but from the server. A
+        ChangeWatcher looks for new entries for all the subscriptions, so
+        a subscription only reads its page once the log moved past it.
+        """
+        poll = database_sync_to_async(poll_changes)
+        watcher = get_watcher()
+        if cursor is None:
+            cursor = (await poll(None, model, parent_id, first)).cursor
+        while True:
+            # the page read next includes the entries up to the known end
+            end = watcher.end or (0, 0)
+            feed = await poll(cursor, model, parent_id, first)
+            cursor = feed.cursor
+            if feed.changes:
+                yield feed
+            if not feed.has_more:
+                await watcher.wait(max(parse_cursor(cursor), end))
+
+    def resolve_changes(root, info, **kwargs):
+        return root
@@ -1,5 +1,23 @@
+import graphene
 from graphene_django import DjangoObjectType
-from core.models import Cliente, Projeto, Atividade
+from core.models import (
+    Cliente,
+    Projeto,
+    Atividade,
+    ClienteStats,
+    ProjetoStats,
+    Job,
+    Change,
+)
+from .loaders import get_loaders
+
+
+def get_prefetched(instance, name):
+    """Return a relation loaded by prefetch_related, or None"""
+    cache = getattr(instance, "_prefetched_objects_cache", {})
+    if name in cache:
+        return list(cache[name])
+    return None
 
 
 class ClienteType(DjangoObjectType):
@@ -14,6 +32,13 @@ class ClienteType(DjangoObjectType):
         model = Cliente
         field = "__all__"
 
+    def resolve_projetos(self, info):
+        """Batch the projetos of every cliente resolved in this request"""
+        prefetched = get_prefetched(self, "projetos")
+        if prefetched is not None:
+            return prefetched
+        return get_loaders(info).projetos_by_cliente.load(self.pk)
+
 
 class ProjetoType(DjangoObjectType):
     """
@@ -27,6 +52,19 @@ class ProjetoType(DjangoObjectType):
         model = Projeto
         field = "__all__"
 
+    def resolve_cliente(self, info):
+        """Batch the cliente of every projeto resolved in this request"""
+        if Projeto.cliente.is_cached(self):
+            return self.cliente
+        return get_loaders(info).cliente.load(self.cliente_id)
+
+    def resolve_atividades(self, info):
+        """Batch the atividades of every projeto resolved in this request"""
+        prefetched = get_prefetched(self, "atividades")
+        if prefetched is not None:
+            return prefetched
+        return get_loaders(info).atividades_by_projeto.load(self.pk)
+
 
 class AtividadeType(DjangoObjectType):
     """
@@ -39,3 +77,132 @@ class AtividadeType(DjangoObjectType):
     class Meta:
         model = Atividade
         field = "__all__"
+
+    def resolve_projeto(self, info):
+        """Batch the projeto of every atividade resolved in this request"""
+        if Atividade.projeto.is_cached(self):
+            return self.projeto
+        return get_loaders(info).projeto.load(self.projeto_id)
+
+
+class ClienteStatsType(DjangoObjectType):
+    """
+    GraphQL type for the ClienteStats summary of a Cliente.
+    """
+
+    class Meta:
+        model = ClienteStats
+        fields = "__all__"
+
+    def resolve_cliente(self, info):
+        return get_loaders(info).cliente.load(self.cliente_id)
+
+
+class ProjetoStatsType(DjangoObjectType):
+    """
+    GraphQL type for the ProjetoStats summary of a Projeto.
+    """
+
+    class Meta:
+        model = ProjetoStats
+        fields = "__all__"
+
+    def resolve_projeto(self, info):
+        return get_loaders(info).projeto.load(self.projeto_id)
+
+
+class SearchResultType(graphene.ObjectType):
+    """
+    A Projeto or an Atividade matching a search, with its rank.
+    """
+
+    rank = graphene.Float()
+    projeto = graphene.Field(ProjetoType)
+    atividade = graphene.Field(AtividadeType)
+
+    def resolve_rank(self, info):
+        return self.rank
+
+    def resolve_projeto(self, info):
+        return self.instance if isinstance(self.instance, Projeto) else None
+
+    def resolve_atividade(self, info):
+        return self.instance if isinstance(self.instance, Atividade) else None
+
+
+class JobType(DjangoObjectType):
+    """
+    GraphQL type for a background Job, with its status and progress.
+    """
+
+    params = graphene.JSONString()
+    result = graphene.JSONString()
+
+    class Meta:
+        model = Job
+        fields = "__all__"
+
+
+class ChangeType(DjangoObjectType):
+    """
+    GraphQL type for an entry of the change log, with the current row it
+    refers to, null once deleted.
+    """
+
+    cliente = graphene.Field(ClienteType)
+    projeto = graphene.Field(ProjetoType)
+    atividade = graphene.Field(AtividadeType)
+
+    class Meta:
+        model = Change
+        fields = "__all__"
+
+    def resolve_cliente(self, info):
+        return self.instance if isinstance(self.instance, Cliente) else None
+
+    def resolve_projeto(self, info):
+        return self.instance if isinstance(self.instance, Projeto) else None
+
+    def resolve_atividade(self, info):
+        return self.instance if isinstance(self.instance, Atividade) else None
+
+
+class ChangeFeedType(graphene.ObjectType):
+    """
+    A page of the change log and the cursor to ask for the next one.
+    """
+
+    cursor = graphene.String()
+    has_more = graphene.Boolean()
+    changes = graphene.List(ChangeType)
+
+
+class DeletedCountType(graphene.ObjectType):
+    """
+    Number of rows of a model removed by a delete, including the rows
+    deleted along with it.
+    """
+
+    model = graphene.String()
+    count = graphene.Int()
+
+
+class ClienteConnection(graphene.relay.Connection):
+    """Relay connection of Cliente, paginated with keyset cursors."""
+
+    class Meta:
+        node = ClienteType
+
+
+class ProjetoConnection(graphene.relay.Connection):
+    """Relay connection of Projeto, paginated with keyset cursors."""
+
+    class Meta:
+        node = ProjetoType
+
+
+class AtividadeConnection(graphene.relay.Connection):
+    """Relay connection of Atividade, paginated with keyset cursors."""
+
+    class Meta:
+        node = AtividadeType
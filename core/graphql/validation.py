@@ -0,0 +1,202 @@
+from math import ceil
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, router
+from graphene.relay import Connection
+from graphene.utils.str_converters import to_snake_case
+from graphene_django.settings import graphene_settings
+from graphql import (
+    FieldNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    InlineFragmentNode,
+    IntValueNode,
+    OperationType,
+    VariableNode,
+    get_named_type,
+    get_nullable_type,
+    is_list_type,
+)
+from graphql.validation import ValidationRule
+
+DEFAULT_MAX_DEPTH = 5
+DEFAULT_MAX_COST = 10000
+DEFAULT_ROW_ESTIMATE_TIMEOUT = 300
+
+
+def estimate_rows(model):
+    """
+    Return an estimate of the number of rows of a model: the planner
+    statistics of ``pg_class`` on PostgreSQL and a ``COUNT(*)`` on other
+    databases or tables never analyzed. Estimates are kept in the cache
+    for ``GRAPHQL_ROW_ESTIMATE_TIMEOUT`` seconds.
+    """
+    cache = caches[getattr(settings, "RESPONSE_CACHE_ALIAS", "default")]
+    key = f"row-estimate:{model._meta.label_lower}"
+    estimate = cache.get(key)
+    if estimate is None:
+        estimate = _count_rows(model)
+        cache.set(
+            key,
+            estimate,
+            getattr(
+                settings, "GRAPHQL_ROW_ESTIMATE_TIMEOUT", DEFAULT_ROW_ESTIMATE_TIMEOUT
+            ),
+        )
+    return estimate
+
+
+def _count_rows(model):
+    connection = connections[router.db_for_read(model)]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+                [connection.ops.quote_name(model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+        if row is not None and row[0] >= 0:
+            return row[0]
+    return model._default_manager.count()
+
+
+def get_model(graphql_type):
+    """Return the Django model of a DjangoObjectType, or None"""
+    meta = getattr(getattr(graphql_type, "graphene_type", None), "_meta", None)
+    return getattr(meta, "model", None)
+
+
+def get_connection_model(graphql_type):
+    """Return the Django model of the nodes of a Relay connection, or None"""
+    graphene_type = getattr(graphql_type, "graphene_type", None)
+    if isinstance(graphene_type, type) and issubclass(graphene_type, Connection):
+        return getattr(graphene_type._meta.node._meta, "model", None)
+    return None
+
+
+class QueryCostRule(ValidationRule):
+    """
+    Reject operations deeper or more expensive than the configured budgets
+    before they are executed.
+
+    The depth of an operation is the number of nested model types it
+    selects, so Relay ``edges { node }`` wrappers do not count. Its cost is
+    the estimated number of model rows it resolves: a connection returns
+    ``first`` rows, or the page size limit, a relation list returns the
+    average number of children per parent and a single object one row,
+    all multiplied by the rows of the parent field. Mutations, bounded by
+    their input, are only checked for depth.
+
+    Budgets are the ``GRAPHQL_MAX_DEPTH`` and ``GRAPHQL_MAX_COST`` settings.
+    """
+
+    def enter_operation_definition(self, node, *_):
+        self.variable_defaults = {
+            definition.variable.name.value: definition.default_value
+            for definition in node.variable_definitions or ()
+        }
+        root_type = self.context.schema.get_root_type(node.operation)
+        if root_type is None:
+            return
+        depth, cost = self.measure(node.selection_set, root_type, 1, set())
+
+        max_depth = getattr(settings, "GRAPHQL_MAX_DEPTH", DEFAULT_MAX_DEPTH)
+        if depth > max_depth:
+            self.report_error(
+                GraphQLError(
+                    f"Query depth of {depth} exceeds the maximum depth of {max_depth}.",
+                    node,
+                )
+            )
+        max_cost = getattr(settings, "GRAPHQL_MAX_COST", DEFAULT_MAX_COST)
+        if node.operation == OperationType.QUERY and cost > max_cost:
+            self.report_error(
+                GraphQLError(
+                    f"Query cost of {cost} exceeds the maximum cost of {max_cost}.",
+                    node,
+                )
+            )
+
+    def measure(self, selection_set, parent_type, rows, fragments):
+        """Return the depth and cost of a selection set resolved ``rows`` times"""
+        depth = cost = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                field = getattr(parent_type, "fields", {}).get(selection.name.value)
+                if field is None or selection.selection_set is None:
+                    continue
+                named_type = get_named_type(field.type)
+                model = get_model(named_type)
+                field_rows = rows * self.fanout(parent_type, field, selection)
+                sub_depth, sub_cost = self.measure(
+                    selection.selection_set, named_type, field_rows, fragments
+                )
+                if model is not None:
+                    sub_depth += 1
+                    sub_cost += field_rows
+                depth, cost = max(depth, sub_depth), cost + sub_cost
+                continue
+
+            if isinstance(selection, InlineFragmentNode):
+                fragment, visited = selection, fragments
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment, visited = self.context.get_fragment(name), fragments | {name}
+                if fragment is None or name in fragments:
+                    continue
+            else:
+                continue
+            fragment_type = parent_type
+            if fragment.type_condition is not None:
+                fragment_type = self.context.schema.get_type(
+                    fragment.type_condition.name.value
+                )
+            sub_depth, sub_cost = self.measure(
+                fragment.selection_set, fragment_type, rows, visited
+            )
+            depth, cost = max(depth, sub_depth), cost + sub_cost
+        return depth, cost
+
+    def fanout(self, parent_type, field, node):
+        """Estimated rows returned by one resolution of a field"""
+        named_type = get_named_type(field.type)
+        connection_model = get_connection_model(named_type)
+        if connection_model is not None:
+            return min(self.get_first(node), estimate_rows(connection_model))
+
+        model = get_model(named_type)
+        if model is None or not is_list_type(get_nullable_type(field.type)):
+            return 1
+
+        parent_model = get_model(parent_type)
+        if parent_model is None:
+            # a root list filtered by a foreign key, e.g. ``clienteId``
+            for argument in node.arguments:
+                parent_model = self.get_filtered_model(model, argument.name.value)
+                if parent_model is not None:
+                    break
+        rows = estimate_rows(model)
+        if parent_model is None:
+            return rows
+        return ceil(rows / max(estimate_rows(parent_model), 1))
+
+    def get_first(self, node):
+        max_limit = graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+        for argument in node.arguments:
+            if argument.name.value != "first":
+                continue
+            value = argument.value
+            if isinstance(value, VariableNode):
+                value = self.variable_defaults.get(value.name.value)
+            if isinstance(value, IntValueNode):
+                return max(min(int(value.value), max_limit), 0)
+        return max_limit
+
+    @staticmethod
+    def get_filtered_model(model, argument_name):
+        attname = to_snake_case(argument_name)
+        for field in model._meta.concrete_fields:
+            if field.many_to_one and field.attname == attname:
+                return field.related_model
+        return None
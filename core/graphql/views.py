@@ -0,0 +1,299 @@
+from inspect import isawaitable
+
+from asgiref.sync import sync_to_async
+from django.db import connection, transaction
+from django.db.models import Model
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.utils.utils import set_rollback
+from graphene_django.views import GraphQLView, HttpError
+from graphql import (
+    ExecutionResult,
+    GraphQLError,
+    GraphQLObjectType,
+    OperationType,
+    execute,
+    get_named_type,
+    get_operation_ast,
+    specified_rules,
+    validate,
+    validate_schema,
+)
+
+from core.cache import response_cache
+from core.routers import pin_to_primary
+from .documents import document_cache, get_persisted_query_hash, persisted_queries
+from .validation import QueryCostRule
+
+
+class PreparedOperation:
+    """A validated operation ready to run, with its response cache entry."""
+
+    def __init__(self, document, operation, cache_key=None, started_at=None):
+        self.document = document
+        self.operation = operation
+        self.cache_key = cache_key
+        self.started_at = started_at
+
+
+class CachedGraphQLView(GraphQLView):
+    """
+    GraphQLView with three caches in front of the executor:
+
+    - persisted queries: a client may send only the sha256 of a query it
+      registered before, instead of the whole document;
+    - parsed documents: parse and validate run once per distinct query;
+    - responses: results of query operations without errors are served
+      from the response cache until a write evicts their tags.
+
+    Documents are validated with the standard rules once, when they are
+    cached, and with QueryCostRule on every request, as their cost follows
+    the row estimates. Query operations read from the database replicas, see core.routers.
+    """
+
+    validation_rules = specified_rules
+    request_validation_rules = (QueryCostRule,)
+
+    def execute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        prepared = self.prepare(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+        if not isinstance(prepared, PreparedOperation):
+            return prepared
+        result = self.execute_document(request, prepared, variables, operation_name)
+        self.cache_result(request, prepared, result)
+        return result
+
+    def prepare(self, request, data, query, variables, operation_name, show_graphiql):
+        """
+        Resolve the query document and look the response up in the cache.
+        Returns the final ExecutionResult (or None for GraphiQL) when the
+        operation does not need to run, else a PreparedOperation.
+        """
+        query_hash = get_persisted_query_hash(request, data)
+        if query_hash:
+            try:
+                if query:
+                    persisted_queries.save(query_hash, query)
+                else:
+                    query = persisted_queries.load(query_hash)
+            except GraphQLError as e:
+                return ExecutionResult(errors=[e])
+            if not query:
+                return ExecutionResult(errors=[GraphQLError("PersistedQueryNotFound")])
+
+        if not query:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+
+        schema = self.schema.graphql_schema
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return ExecutionResult(data=None, errors=schema_validation_errors)
+
+        try:
+            parsed = document_cache.get(
+                schema,
+                query,
+                self.validation_rules,
+                graphene_settings.MAX_VALIDATION_ERRORS,
+                key=query_hash,
+            )
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+        operation_ast = get_operation_ast(parsed.document, operation_name)
+        operation = operation_ast.operation if operation_ast is not None else None
+        if operation not in (None, OperationType.QUERY):
+            # mutations, and the reads after them, go to the primary
+            pin_to_primary()
+
+        if request.method.lower() == "get" and operation not in (
+            None,
+            OperationType.QUERY,
+        ):
+            if show_graphiql:
+                return None
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ["POST"],
+                    "Can only perform a {} operation from a POST request.".format(
+                        operation.value
+                    ),
+                )
+            )
+
+        errors = parsed.errors or validate(
+            schema,
+            parsed.document,
+            self.request_validation_rules,
+            graphene_settings.MAX_VALIDATION_ERRORS,
+        )
+        if errors:
+            return ExecutionResult(data=None, errors=errors)
+
+        if operation != OperationType.QUERY or not response_cache.enabled:
+            return PreparedOperation(parsed.document, operation)
+
+        key = response_cache.make_key(
+            "graphql", parsed.normalized, variables, operation_name
+        )
+        started_at = response_cache.now()
+        cached = response_cache.get(key)
+        if cached is not None:
+            return ExecutionResult(data=cached)
+        request.cache_tags = set()
+        return PreparedOperation(parsed.document, operation, key, started_at)
+
+    def cache_result(self, request, prepared, result):
+        if prepared.cache_key is None or result.errors or result.data is None:
+            return
+        if request.cache_tags is None:
+            # a resolver read rows that are changed without evicting it
+            return
+        response_cache.set(
+            prepared.cache_key, result.data, request.cache_tags, prepared.started_at
+        )
+
+    def get_execute_options(self, request, variables, operation_name):
+        execute_options = {
+            "root_value": self.get_root_value(request),
+            "context_value": self.get_context(request),
+            "variable_values": variables,
+            "operation_name": operation_name,
+            "middleware": self.get_middleware(request),
+        }
+        if self.execution_context_class:
+            execute_options["execution_context_class"] = self.execution_context_class
+        return execute_options
+
+    def is_atomic(self, operation):
+        return operation == OperationType.MUTATION and (
+            graphene_settings.ATOMIC_MUTATIONS is True
+            or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
+        )
+
+    def execute_document(self, request, prepared, variables, operation_name):
+        """Execute a validated document the way GraphQLView does"""
+        try:
+            execute_options = self.get_execute_options(
+                request, variables, operation_name
+            )
+            if self.is_atomic(prepared.operation):
+                with transaction.atomic():
+                    result = execute(
+                        self.schema.graphql_schema, prepared.document, **execute_options
+                    )
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+                return result
+
+            return execute(
+                self.schema.graphql_schema, prepared.document, **execute_options
+            )
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+
+class SyncToAsyncResolverMiddleware:
+    """
+    Graphene middleware used by AsyncGraphQLView. Root fields and the
+    relations of model types, the only ones that reach the database, are
+    resolved through ``sync_to_async``, which under ASGI runs them on the
+    request's own thread, so the event loop keeps serving other requests.
+    It must be the last middleware so the whole chain runs off the loop.
+    """
+
+    def resolve(self, next, root, info, **args):
+        if (root is None or isinstance(root, Model)) and isinstance(
+            get_named_type(info.return_type), GraphQLObjectType
+        ):
+            return sync_to_async(next)(root, info, **args)
+        return next(root, info, **args)
+
+
+class AsyncGraphQLView(CachedGraphQLView):
+    """
+    Async counterpart of CachedGraphQLView for ASGI deployments. The
+    operation is executed with graphql-core's async executor, awaiting
+    every resolver that may hit the database instead of blocking a worker.
+    Mutations atomic through ATOMIC_MUTATIONS and batch requests are
+    served by the sync view.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        return await self.dispatch(request, *args, **kwargs)
+
+    async def post(self, request, *args, **kwargs):
+        return await self.dispatch(request, *args, **kwargs)
+
+    def get_middleware(self, request):
+        return [*(self.middleware or []), SyncToAsyncResolverMiddleware()]
+
+    async def dispatch(self, request, *args, **kwargs):
+        sync_dispatch = sync_to_async(super().dispatch)
+        if request.method.lower() not in ("get", "post") or self.batch:
+            return await sync_dispatch(request, *args, **kwargs)
+        try:
+            data = self.parse_body(request)
+            if self.graphiql and self.can_display_graphiql(request, data):
+                return await sync_dispatch(request, *args, **kwargs)
+            result, status_code = await self.aget_response(request, data)
+            return HttpResponse(
+                status=status_code, content=result, content_type="application/json"
+            )
+        except HttpError as e:
+            response = e.response
+            response["Content-Type"] = "application/json"
+            response.content = self.json_encode(
+                request, {"errors": [self.format_error(e)]}
+            )
+            return response
+
+    async def aget_response(self, request, data):
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+        execution_result = await self.aexecute_graphql_request(
+            request, data, query, variables, operation_name
+        )
+
+        status_code = 200
+        response = {}
+        if execution_result.errors:
+            await sync_to_async(set_rollback)()
+            response["errors"] = [self.format_error(e) for e in execution_result.errors]
+        if execution_result.errors and any(
+            not getattr(e, "path", None) for e in execution_result.errors
+        ):
+            status_code = 400
+        else:
+            response["data"] = execution_result.data
+        return self.json_encode(request, response), status_code
+
+    async def aexecute_graphql_request(
+        self, request, data, query, variables, operation_name
+    ):
+        prepared = await sync_to_async(self.prepare)(
+            request, data, query, variables, operation_name, False
+        )
+        if not isinstance(prepared, PreparedOperation):
+            return prepared
+        if self.is_atomic(prepared.operation):
+            return await sync_to_async(self.execute_document)(
+                request, prepared, variables, operation_name
+            )
+        try:
+            result = execute(
+                self.schema.graphql_schema,
+                prepared.document,
+                **self.get_execute_options(request, variables, operation_name),
+            )
+            if isawaitable(result):
+                result = await result
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+        await sync_to_async(self.cache_result)(request, prepared, result)
+        return result
@@ -0,0 +1,249 @@
+import asyncio
+import json
+from functools import wraps
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from graphene_django.settings import graphene_settings
+from graphene_django.views import instantiate_middleware
+from graphql import (
+    ExecutionResult,
+    GraphQLError,
+    OperationType,
+    create_source_event_stream,
+    execute,
+    get_operation_ast,
+    validate,
+)
+
+from .documents import document_cache
+from .views import CachedGraphQLView
+
+
+def database_sync_to_async(func):
+    """
+    Return an async version of ``func`` running on any thread of the
+    executor, instead of the single thread sync_to_async shares between
+    all the websockets of the process, and closing the connection past
+    CONN_MAX_AGE around the call as the request handler does.
+    """
+
+    @wraps(func)
+    def call(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(call, thread_sensitive=False)
+
+
+class GraphQLWebSocketApp:
+    """
+    ASGI application serving the subscriptions of a schema over websockets
+    with the ``graphql-transport-ws`` protocol, the one spoken by the
+    ``graphql-ws`` client and Apollo. Documents are validated like the
+    HTTP view's, and each event is resolved off the event loop with the
+    schema's middleware and a fresh context, as a request would be.
+    Queries and mutations keep going through the HTTP endpoint.
+    """
+
+    protocol = "graphql-transport-ws"
+    connection_init_timeout = 10
+
+    def __init__(
+        self,
+        schema,
+        middleware=None,
+        validation_rules=None,
+        request_validation_rules=None,
+    ):
+        self.schema = schema
+        if middleware is None:
+            middleware = graphene_settings.MIDDLEWARE
+        self.middleware = list(instantiate_middleware(middleware))
+        self.validation_rules = validation_rules or CachedGraphQLView.validation_rules
+        if request_validation_rules is None:
+            request_validation_rules = CachedGraphQLView.request_validation_rules
+        self.request_validation_rules = request_validation_rules
+
+    async def __call__(self, scope, receive, send):
+        message = await receive()
+        if message["type"] != "websocket.connect":
+            return
+        if self.protocol not in scope.get("subprotocols", []):
+            await send({"type": "websocket.close", "code": 4406})
+            return
+        await send({"type": "websocket.accept", "subprotocol": self.protocol})
+        await GraphQLWebSocketConnection(self, scope, send).run(receive)
+
+    def get_context(self, scope):
+        # responses pushed to a websocket are never cached
+        return SimpleNamespace(scope=scope, user=scope.get("user"), cache_tags=None)
+
+
+class GraphQLWebSocketConnection:
+    """The state of one websocket: its handshake and running operations."""
+
+    def __init__(self, app, scope, send):
+        self.app = app
+        self.scope = scope
+        self._send = send
+        self.initialised = False
+        self.acknowledged = False
+        self.closed = False
+        self.operations = {}
+
+    async def run(self, receive):
+        timeout = asyncio.ensure_future(self.close_unless_acknowledged())
+        try:
+            while not self.closed:
+                message = await receive()
+                if message["type"] == "websocket.disconnect":
+                    self.closed = True
+                elif message["type"] == "websocket.receive":
+                    await self.handle(message.get("text") or message.get("bytes"))
+        finally:
+            timeout.cancel()
+            for task in self.operations.values():
+                task.cancel()
+
+    async def send(self, message):
+        if not self.closed:
+            await self._send({"type": "websocket.send", "text": json.dumps(message)})
+
+    async def close(self, code, reason):
+        if not self.closed:
+            self.closed = True
+            await self._send(
+                {"type": "websocket.close", "code": code, "reason": reason}
+            )
+
+    async def close_unless_acknowledged(self):
+        await asyncio.sleep(self.app.connection_init_timeout)
+        if not self.acknowledged:
+            await self.close(4408, "Connection initialisation timeout")
+
+    async def handle(self, text):
+        try:
+            message = json.loads(text)
+            kind = message["type"]
+        except (TypeError, ValueError, KeyError):
+            return await self.close(4400, "Invalid message")
+
+        if kind == "connection_init":
+            if self.initialised:
+                return await self.close(4429, "Too many initialisation requests")
+            self.initialised = self.acknowledged = True
+            await self.send({"type": "connection_ack"})
+        elif kind == "ping":
+            await self.send({"type": "pong"})
+        elif kind == "pong":
+            pass
+        elif kind == "subscribe":
+            if not self.acknowledged:
+                return await self.close(4401, "Unauthorized")
+            id, payload = message.get("id"), message.get("payload")
+            if not isinstance(id, str) or not isinstance(payload, dict):
+                return await self.close(4400, "Invalid message")
+            if id in self.operations:
+                return await self.close(4409, f"Subscriber for {id} already exists")
+            self.operations[id] = asyncio.ensure_future(self.run_operation(id, payload))
+        elif kind == "complete":
+            task = self.operations.pop(message.get("id"), None)
+            if task is not None:
+                task.cancel()
+        else:
+            await self.close(4400, "Invalid message")
+
+    async def run_operation(self, id, payload):
+        """Send the results of a subscription until it ends or is completed"""
+        try:
+            stream = await self.subscribe(payload)
+            if isinstance(stream, ExecutionResult):
+                return await self.send_errors(id, stream.errors)
+            try:
+                async for result in stream:
+                    await self.send(
+                        {"type": "next", "id": id, "payload": result.formatted}
+                    )
+            except GraphQLError as e:
+                # raised by the source stream, e.g. an expired cursor
+                return await self.send_errors(id, [e])
+            finally:
+                await stream.aclose()
+            await self.send({"type": "complete", "id": id})
+        finally:
+            if self.operations.get(id) is asyncio.current_task():
+                del self.operations[id]
+
+    async def send_errors(self, id, errors):
+        await self.send(
+            {"type": "error", "id": id, "payload": [e.formatted for e in errors]}
+        )
+
+    async def subscribe(self, payload):
+        """
+        Validate a subscription and return the async iterator of its
+        results, or an ExecutionResult with the errors preventing it.
+        """
+        schema = self.app.schema.graphql_schema
+        query = payload.get("query")
+        variables = payload.get("variables")
+        operation_name = payload.get("operationName")
+        if not isinstance(query, str):
+            return ExecutionResult(errors=[GraphQLError("Must provide query string.")])
+        try:
+            parsed = await database_sync_to_async(document_cache.get)(
+                schema,
+                query,
+                self.app.validation_rules,
+                graphene_settings.MAX_VALIDATION_ERRORS,
+            )
+        except GraphQLError as e:
+            return ExecutionResult(errors=[e])
+        errors = parsed.errors or await database_sync_to_async(validate)(
+            schema,
+            parsed.document,
+            self.app.request_validation_rules,
+            graphene_settings.MAX_VALIDATION_ERRORS,
+        )
+        if errors:
+            return ExecutionResult(errors=errors)
+        operation = get_operation_ast(parsed.document, operation_name)
+        if operation is None or operation.operation != OperationType.SUBSCRIPTION:
+            return ExecutionResult(
+                errors=[GraphQLError("Only subscriptions are served over websockets.")]
+            )
+
+        events = await create_source_event_stream(
+            schema,
+            parsed.document,
+            context_value=self.app.get_context(self.scope),
+            variable_values=variables,
+            operation_name=operation_name,
+        )
+        if isinstance(events, ExecutionResult):
+            return events
+        return self.map_events(events, parsed.document, variables, operation_name)
+
+    async def map_events(self, events, document, variables, operation_name):
+        resolve = database_sync_to_async(self.resolve_event)
+        try:
+            async for event in events:
+                yield await resolve(event, document, variables, operation_name)
+        finally:
+            await events.aclose()
+
+    def resolve_event(self, event, document, variables, operation_name):
+        return execute(
+            self.app.schema.graphql_schema,
+            document,
+            root_value=event,
+            context_value=self.app.get_context(self.scope),
+            variable_values=variables,
+            operation_name=operation_name,
+            middleware=self.app.middleware,
+        )
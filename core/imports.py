@@ -0,0 +1,304 @@
+import csv
+import io
+import json
+import time
+
+from django.db import connections, router, transaction
+from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
+
+from core.api.serializers import (
+    AtividadeModelSerializer,
+    ClienteModelSerializer,
+    ProjetoModelSerializer,
+)
+from core.cache import get_invalidation_tags, response_cache
+from core.models import Cliente
+from core.stats import get_stats_keys, refresh_stats
+
+SERIALIZERS = {
+    "clientes": ClienteModelSerializer,
+    "projetos": ProjetoModelSerializer,
+    "atividades": AtividadeModelSerializer,
+}
+
+# unique fields a row may reference its parent by, e.g. ``cliente_email``
+NATURAL_KEYS = {Cliente: "email"}
+
+CHUNK_SIZE = 1000
+
+
+def read_rows(stream, format):
+    """
+    Yield the line number and the row of each record of a CSV or NDJSON
+    text stream. An NDJSON line that is not a JSON object is yielded as
+    a ``serializers.ValidationError``.
+    """
+    if format == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, serializers.ValidationError(f"Invalid JSON: {e}")
+            continue
+        if not isinstance(row, dict):
+            row = serializers.ValidationError("Expected a JSON object.")
+        yield number, row
+
+
+def copy_value(value):
+    """Format a value for the text format of PostgreSQL COPY"""
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class ImportResult:
+    """Counts of an import run."""
+
+    def __init__(self):
+        self.imported = 0
+        self.rejected = 0
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.imported / self.elapsed if self.elapsed else 0.0
+
+
+class Importer:
+    """
+    Loads rows into a model in batches, validating each row with the
+    model's serializer, so they follow the same rules as the REST API.
+
+    Foreign keys are resolved through in-memory maps filled with one
+    query per batch, and may also be given by a natural key such as
+    ``cliente_email``. Unique fields are checked once per batch instead
+    of once per row. Valid rows are written with ``COPY`` on PostgreSQL
+    and ``bulk_create`` elsewhere; rejected rows are passed with their
+    errors to ``on_reject(line, row, errors)``, and the ImportResult so
+    far to ``on_batch(result)`` after every batch.
+    """
+
+    def __init__(
+        self,
+        serializer_class,
+        batch_size=5000,
+        use_copy=None,
+        on_reject=None,
+        on_batch=None,
+    ):
+        self.model = serializer_class.Meta.model
+        self.batch_size = batch_size
+        self.on_reject = on_reject
+        self.on_batch = on_batch
+        self.using = router.db_for_write(self.model)
+        self.connection = connections[self.using]
+        if use_copy is None:
+            use_copy = self.connection.vendor == "postgresql"
+        self.use_copy = use_copy
+
+        self.foreign_keys = [
+            field for field in self.model._meta.concrete_fields if field.many_to_one
+        ]
+        self.related_objects = {field.related_model: {} for field in self.foreign_keys}
+        self.natural_keys = {field.related_model: {} for field in self.foreign_keys}
+        self.serializer = serializer_class(
+            context={"related_objects": self.related_objects}
+        )
+        self.unique_fields = []
+        for name, field in self.serializer.fields.items():
+            validators = [
+                v for v in field.validators if not isinstance(v, UniqueValidator)
+            ]
+            if len(validators) != len(field.validators):
+                field.validators = validators
+                self.unique_fields.append(name)
+
+    def run(self, rows):
+        """Import ``(line, row)`` pairs and return an ImportResult"""
+        result = ImportResult()
+        started = time.perf_counter()
+        last_pk = self.get_last_pk()
+        batch = []
+        for line, row in rows:
+            batch.append((line, row))
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch, result)
+                batch = []
+        if batch:
+            self.import_batch(batch, result)
+        self.after_import(last_pk)
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    def get_last_pk(self):
+        last = self.model._default_manager.using(self.using).order_by("-pk").first()
+        return last.pk if last is not None else 0
+
+    def import_batch(self, batch, result):
+        self.resolve_related([row for _, row in batch if isinstance(row, dict)])
+        instances, seen = [], {name: set() for name in self.unique_fields}
+        taken = self.get_taken_values(
+            [row for _, row in batch if isinstance(row, dict)]
+        )
+        for line, row in batch:
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                attrs = self.serializer.run_validation(row)
+                errors = {}
+                for name in self.unique_fields:
+                    value = attrs.get(name)
+                    if value in taken[name] or value in seen[name]:
+                        errors[name] = [
+                            f"{self.model.__name__} with this {name} already exists."
+                        ]
+                if errors:
+                    raise serializers.ValidationError(errors)
+            except serializers.ValidationError as e:
+                result.rejected += 1
+                if self.on_reject is not None:
+                    self.on_reject(line, row, e.detail)
+                continue
+            for name in self.unique_fields:
+                seen[name].add(attrs.get(name))
+            instances.append(self.model(**attrs))
+        with transaction.atomic(using=self.using):
+            self.insert(instances)
+        result.imported += len(instances)
+        if self.on_batch is not None:
+            self.on_batch(result)
+
+    def resolve_related(self, rows):
+        """
+        Load the parents referenced by a batch into the in-memory maps, and
+        replace natural keys by primary keys in the rows.
+        """
+        for field in self.foreign_keys:
+            model = field.related_model
+            known = self.related_objects[model]
+            natural_key = NATURAL_KEYS.get(model)
+            key_column = f"{field.name}_{natural_key}" if natural_key else None
+
+            if key_column:
+                natural = self.natural_keys[model]
+                values = {
+                    row[key_column]
+                    for row in rows
+                    if row.get(key_column) and not row.get(field.name)
+                }
+                missing = list(values - set(natural))
+                for start in range(0, len(missing), CHUNK_SIZE):
+                    natural.update(
+                        model._default_manager.using(self.using)
+                        .filter(
+                            **{
+                                f"{natural_key}__in": missing[
+                                    start : start + CHUNK_SIZE
+                                ]
+                            }
+                        )
+                        .values_list(natural_key, "pk")
+                    )
+                for row in rows:
+                    if key_column in row and not row.get(field.name):
+                        row[field.name] = natural.get(row.pop(key_column))
+                for pk in natural.values():
+                    known.setdefault(pk, model(pk=pk))
+
+            pks = set()
+            for row in rows:
+                try:
+                    pks.add(model._meta.pk.to_python(row.get(field.name)))
+                except Exception:
+                    continue
+            missing = list(pks - set(known) - {None})
+            for start in range(0, len(missing), CHUNK_SIZE):
+                for pk in (
+                    model._default_manager.using(self.using)
+                    .filter(pk__in=missing[start : start + CHUNK_SIZE])
+                    .values_list("pk", flat=True)
+                ):
+                    known[pk] = model(pk=pk)
+
+    def get_taken_values(self, rows):
+        """Return the values of the unique fields of a batch already stored"""
+        taken = {}
+        for name in self.unique_fields:
+            values = list({row[name] for row in rows if row.get(name)})
+            taken[name] = set()
+            for start in range(0, len(values), CHUNK_SIZE):
+                taken[name].update(
+                    self.model._default_manager.using(self.using)
+                    .filter(**{f"{name}__in": values[start : start + CHUNK_SIZE]})
+                    .values_list(name, flat=True)
+                )
+        return taken
+
+    def insert(self, instances):
+        if not instances:
+            return
+        if not self.use_copy:
+            self.model._default_manager.using(self.using).bulk_create(
+                instances, batch_size=CHUNK_SIZE
+            )
+            return
+        fields = [
+            field
+            for field in self.model._meta.concrete_fields
+            if field is not self.model._meta.pk
+        ]
+        buffer = io.StringIO()
+        for instance in instances:
+            values = (
+                field.get_db_prep_save(
+                    field.pre_save(instance, True), connection=self.connection
+                )
+                for field in fields
+            )
+            buffer.write("\t".join(map(copy_value, values)) + "\n")
+        buffer.seek(0)
+        quote = self.connection.ops.quote_name
+        columns = ", ".join(quote(field.column) for field in fields)
+        with self.connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {quote(self.model._meta.db_table)} ({columns}) FROM STDIN",
+                buffer,
+            )
+
+    def after_import(self, last_pk):
+        """
+        Recount the stats and evict the cached responses the new rows
+        affect, as the batch writes send no model signals.
+        """
+        tags = set()
+        new_rows = (
+            self.model._default_manager.using(self.using)
+            .filter(pk__gt=last_pk)
+            .only("pk", *(field.attname for field in self.foreign_keys))
+        )
+        chunk = []
+        for instance in new_rows.iterator(chunk_size=CHUNK_SIZE):
+            chunk.append(instance)
+            # the instance tag is left out, no response of a new row is cached
+            tags.update(get_invalidation_tags(instance)[1:])
+            if len(chunk) == CHUNK_SIZE:
+                refresh_stats(get_stats_keys(chunk))
+                chunk = []
+        if chunk:
+            refresh_stats(get_stats_keys(chunk))
+        if tags:
+            response_cache.invalidate(tags)
@@ -0,0 +1,261 @@
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.deletion import delete_rows
+from core.exports import count_rows, export
+from core.imports import SERIALIZERS, Importer, read_rows
+from core.models import Job
+
+logger = logging.getLogger(__name__)
+
+# ids deleted per transaction by delete jobs, between progress reports
+DELETE_BATCH_SIZE = 100
+
+# functions running each kind of job, ``handler(job, **job.params)``
+HANDLERS = {}
+
+
+def handler(kind):
+    """Register the function running the jobs of a kind"""
+
+    def register(function):
+        HANDLERS[kind] = function
+        return function
+
+    return register
+
+
+def get_path(name):
+    """Return the path of a file kept in JOBS_DIR"""
+    return os.path.join(settings.JOBS_DIR, os.path.basename(name))
+
+
+def save_upload(upload):
+    """Store an uploaded file in JOBS_DIR and return its name"""
+    os.makedirs(settings.JOBS_DIR, exist_ok=True)
+    name = f"{uuid.uuid4().hex}{os.path.splitext(upload.name)[1].lower()}"
+    with open(get_path(name), "wb") as output:
+        for chunk in upload.chunks():
+            output.write(chunk)
+    return name
+
+
+def enqueue(kind, **params):
+    """Add a pending job, run by the next free ``run_jobs`` worker"""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}.")
+    return Job.objects.create(kind=kind, params=params)
+
+
+def enqueue_request(data):
+    """
+    Queue the job of the validated data of a JobCreateSerializer, storing
+    the file of an import.
+    """
+    if data["kind"] == "import":
+        params = {
+            "model": data["model"],
+            "file": save_upload(data["file"]),
+            "format": data["format"],
+        }
+    elif data["kind"] == "export":
+        params = {"format": data.get("format", "ndjson"), "gzip": data["gzip"]}
+    else:
+        params = {"model": data["model"], "ids": data["ids"]}
+    return enqueue(data["kind"], **params)
+
+
+def claim_job():
+    """
+    Mark the oldest pending job as running and return its id, or None
+    when the queue is empty. The claim is a conditional UPDATE, so two
+    workers never run the same job, on any database.
+
+    A running job is leased to its worker, which renews the lease while
+    it runs, see Heartbeat. When it was not renewed for JOB_LEASE_TIMEOUT
+    seconds the worker is gone, e.g. killed, and the job is claimed again
+    as if it were pending, or failed once it was run JOB_MAX_ATTEMPTS
+    times.
+    """
+    now = timezone.now()
+    expired = now - timedelta(seconds=settings.JOB_LEASE_TIMEOUT)
+    claimable = Job.objects.filter(
+        Q(status="pendente")
+        | Q(status="executando", heartbeat_at__lt=expired)
+        | Q(status="executando", heartbeat_at__isnull=True)
+    ).order_by("pk")
+    for pk, status, attempts in claimable.values_list("pk", "status", "attempts")[:10]:
+        # the attempts the job had when read are the version of the claim
+        unclaimed = Job.objects.filter(pk=pk, status=status, attempts=attempts)
+        if attempts >= settings.JOB_MAX_ATTEMPTS:
+            unclaimed.update(
+                status="falhou",
+                error=f"The worker running the job stopped {attempts} times.",
+                finished_at=now,
+            )
+            continue
+        claimed = unclaimed.update(
+            status="executando",
+            attempts=attempts + 1,
+            started_at=now,
+            heartbeat_at=now,
+        )
+        if claimed:
+            return pk
+    return None
+
+
+class Heartbeat(threading.Thread):
+    """
+    Thread renewing the lease of a running job every third of
+    JOB_LEASE_TIMEOUT, until stopped. Renewals stop once the job was
+    claimed again by another worker.
+    """
+
+    def __init__(self, pk, attempt):
+        super().__init__(daemon=True)
+        self.pk = pk
+        self.attempt = attempt
+        self.stopped = threading.Event()
+
+    def run(self):
+        renewed = False
+        try:
+            while not self.stopped.wait(settings.JOB_LEASE_TIMEOUT / 3):
+                renewed = True
+                Job.objects.filter(
+                    pk=self.pk, status="executando", attempts=self.attempt
+                ).update(heartbeat_at=timezone.now())
+        finally:
+            # the connection of this thread is not closed by a request
+            if renewed:
+                connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def report_progress(job, processed, total=None):
+    """Store how many of the ``total`` items of a running job are done"""
+    changes = {"processed": processed, "heartbeat_at": timezone.now()}
+    if total is not None:
+        changes["total"] = total
+    Job.objects.filter(pk=job.pk).update(**changes)
+
+
+def fail_job(pk, error, attempt=None):
+    """
+    Store the error of a job that did not finish, unless ``attempt`` is
+    given and the job was claimed again since.
+    """
+    jobs = Job.objects.filter(pk=pk)
+    if attempt is not None:
+        jobs = jobs.filter(attempts=attempt)
+    jobs.update(
+        status="falhou",
+        error=str(error) or type(error).__name__,
+        finished_at=timezone.now(),
+    )
+    return "falhou"
+
+
+def run_job(pk):
+    """
+    Run a claimed job and store its result, or its error when it fails.
+    Called by the ``run_jobs`` worker, in a process of its pool.
+    """
+    job = Job.objects.get(pk=pk)
+    heartbeat = Heartbeat(pk, job.attempts)
+    heartbeat.start()
+    try:
+        result = HANDLERS[job.kind](job, **job.params)
+    except Exception as e:
+        logger.exception("Job %s failed", job)
+        return fail_job(pk, e, job.attempts)
+    finally:
+        heartbeat.stop()
+    Job.objects.filter(pk=pk, attempts=job.attempts).update(
+        status="concluido",
+        result=result,
+        total=F("processed"),
+        finished_at=timezone.now(),
+    )
+    return "concluido"
+
+
+@handler("import")
+def import_file(job, model, file, format, batch_size=5000):
+    """Import an uploaded file, keeping its rejected rows in JOBS_DIR"""
+    rejects_name = f"job-{job.pk}-rejects.ndjson"
+    with open(get_path(file), newline="", encoding="utf-8") as stream, open(
+        get_path(rejects_name), "w"
+    ) as rejects:
+
+        def on_reject(line, row, errors):
+            row = row if isinstance(row, dict) else None
+            record = {"line": line, "row": row, "errors": errors}
+            rejects.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+        importer = Importer(
+            SERIALIZERS[model],
+            batch_size=batch_size,
+            on_reject=on_reject,
+            on_batch=lambda result: report_progress(
+                job, result.imported + result.rejected
+            ),
+        )
+        result = importer.run(read_rows(stream, format))
+    os.remove(get_path(file))
+    if not result.rejected:
+        os.remove(get_path(rejects_name))
+    return {
+        "imported": result.imported,
+        "rejected": result.rejected,
+        "rejects": rejects_name if result.rejected else None,
+        "elapsed": result.elapsed,
+    }
+
+
+@handler("export")
+def export_file(job, format, gzip=False):
+    """Export every cliente to a file in JOBS_DIR, to be downloaded"""
+    name = f"job-{job.pk}.{format}" + (".gz" if gzip else "")
+    os.makedirs(settings.JOBS_DIR, exist_ok=True)
+    report_progress(job, 0, count_rows())
+    written = 0
+    with open(get_path(name), "wb") as output:
+        for chunk in export(
+            format,
+            compress=gzip,
+            on_rows=lambda count: report_progress(job, count),
+        ):
+            output.write(chunk)
+            written += len(chunk)
+    return {"file": name, "bytes": written}
+
+
+@handler("delete")
+def delete_ids(job, model, ids):
+    """Delete rows and their cascades in batches, adding up the counts"""
+    model = SERIALIZERS[model].Meta.model
+    report_progress(job, 0, len(ids))
+    total, deleted = 0, {}
+    for start in range(0, len(ids), DELETE_BATCH_SIZE):
+        batch_total, batch_deleted = delete_rows(
+            model, ids[start : start + DELETE_BATCH_SIZE]
+        )
+        total += batch_total
+        for label, count in batch_deleted.items():
+            deleted[label] = deleted.get(label, 0) + count
+        report_progress(job, min(start + DELETE_BATCH_SIZE, len(ids)))
+    return {"total": total, "deleted": deleted}
@@ -0,0 +1,99 @@
+from concurrent.futures import ThreadPoolExecutor
+from statistics import quantiles
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.models import Cliente
+
+
+class Command(BaseCommand):
+    """
+    Compare the latency of the REST retrieve of a cliente with a new
+    database connection per request (``CONN_MAX_AGE=0``) against
+    persistent connections reused across requests.
+
+    Requests go through Django's request handler in-process from a thread
+    pool, like a threaded WSGI server, with the response cache disabled
+    so every request reaches the database. Run it against PostgreSQL,
+    where opening a connection is expensive.
+    """
+
+    help = "Benchmark REST retrieve latency with and without persistent connections."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument("--conn-max-age", type=int, default=60)
+
+    def handle(self, *args, **options):
+        cliente = Cliente.objects.order_by("pk").first()
+        if cliente is None:
+            cliente = Cliente.objects.create(nome="bench", email="bench@example.com")
+        path = reverse("core:clientes-detail", args=[cliente.pk])
+
+        opened = []
+
+        def count_connection(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        connection_created.connect(count_connection, dispatch_uid="bench_connections")
+        db_settings = connections.settings[DEFAULT_DB_ALIAS]
+        initial_max_age = db_settings["CONN_MAX_AGE"]
+        overrides = {
+            "ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, "testserver"],
+            "RESPONSE_CACHE_TIMEOUT": 0,
+        }
+        try:
+            with override_settings(**overrides):
+                for name, max_age in (
+                    ("new connection per request", 0),
+                    ("persistent connections", options["conn_max_age"]),
+                ):
+                    connections.close_all()
+                    db_settings["CONN_MAX_AGE"] = max_age
+                    opened.clear()
+                    latencies, elapsed = self.run(path, options)
+                    self.report(name, latencies, elapsed, len(opened))
+        finally:
+            db_settings["CONN_MAX_AGE"] = initial_max_age
+            connection_created.disconnect(dispatch_uid="bench_connections")
+
+    def run(self, path, options):
+        requests, concurrency = options["requests"], options["concurrency"]
+
+        def work(worker):
+            client = Client()
+            latencies = []
+            try:
+                for _ in range(worker, requests, concurrency):
+                    started = perf_counter()
+                    response = client.get(path)
+                    assert response.status_code == 200, response.status_code
+                    # the test client skips this end of request hook of the handler
+                    close_old_connections()
+                    latencies.append(perf_counter() - started)
+            finally:
+                # release the connection this thread kept open
+                connections.close_all()
+            return latencies
+
+        with ThreadPoolExecutor(concurrency) as pool:
+            started = perf_counter()
+            results = list(pool.map(work, range(concurrency)))
+            elapsed = perf_counter() - started
+        return [latency for latencies in results for latency in latencies], elapsed
+
+    def report(self, name, latencies, elapsed, opened):
+        percentiles = quantiles(latencies, n=100)
+        p50, p99 = percentiles[49], percentiles[98]
+        self.stdout.write(
+            f"{name}: {len(latencies) / elapsed:.0f} req/s, "
+            f"p50 {p50 * 1000:.2f}ms, p99 {p99 * 1000:.2f}ms, "
+            f"{opened} connections opened"
+        )
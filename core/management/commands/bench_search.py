@@ -0,0 +1,71 @@
+import random
+from datetime import date
+from statistics import median
+from timeit import timeit
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from core.benchmark import WORDS
+from core.models import Atividade, Cliente, Projeto
+from core.search import filter_search, search_model
+from core.stats import get_stats_keys, refresh_stats
+
+
+class Command(BaseCommand):
+    """
+    Compare the full-text search against ``icontains`` over
+    Atividade.descricao. Atividades with random descriptions are added
+    until the table holds ``--rows`` rows, so run it on a scratch database.
+    """
+
+    help = "Benchmark full-text search vs icontains over Atividade.descricao."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        self.seed(options["rows"], options["batch_size"])
+        terms = ["orçamento", "homologação", "revisar contrato"]
+        for term in terms:
+            timings = {
+                "icontains count": lambda: Atividade.objects.filter(
+                    *(Q(descricao__icontains=word) for word in term.split())
+                ).count(),
+                "full-text count": lambda: filter_search(
+                    Atividade.objects.all(), term
+                ).count(),
+                "full-text top 20": lambda: search_model(Atividade, term, 20),
+            }
+            for name, run in timings.items():
+                elapsed = median(
+                    timeit(run, number=1) for _ in range(options["repeat"])
+                )
+                self.stdout.write(f"{term!r} {name}: {elapsed * 1000:.1f}ms")
+
+    def seed(self, rows, batch_size):
+        missing = rows - Atividade.objects.count()
+        if missing <= 0:
+            return
+        self.stdout.write(f"Adding {missing} atividades...")
+        rng = random.Random(0)
+        cliente, _ = Cliente.objects.get_or_create(
+            email="bench@email.com", defaults={"nome": "bench"}
+        )
+        projeto, _ = Projeto.objects.get_or_create(nome="bench", cliente=cliente)
+        while missing > 0:
+            size = min(batch_size, missing)
+            with transaction.atomic():
+                Atividade.objects.bulk_create(
+                    Atividade(
+                        projeto=projeto,
+                        descricao=" ".join(rng.sample(WORDS, 6)),
+                        prazo=date(2024, 1, 1),
+                    )
+                    for _ in range(size)
+                )
+            missing -= size
+        refresh_stats(get_stats_keys([projeto]))
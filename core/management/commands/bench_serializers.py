@@ -0,0 +1,67 @@
+from datetime import date, datetime, timezone
+from timeit import timeit
+
+from django.core.management.base import BaseCommand
+
+from core.api.serializers import (
+    AtividadeModelSerializer,
+    ClienteModelSerializer,
+    ProjetoModelSerializer,
+    FastReadSerializer,
+)
+from core.models import Atividade, Cliente, Projeto
+
+
+class Command(BaseCommand):
+    """
+    Compare the per-row cost of the ModelSerializers against the
+    FastReadSerializer used by the list endpoints. Rows are built in
+    memory, so only serialization is measured and no database is needed.
+    """
+
+    help = "Benchmark ModelSerializer vs FastReadSerializer per-row cost."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], options["repeat"]
+        now = datetime(2024, 9, 13, 12, 0, tzinfo=timezone.utc)
+        samples = {
+            ClienteModelSerializer: Cliente(
+                id=1,
+                nome="cliente",
+                email="cliente@email.com",
+                telefone="+5511972345738",
+            ),
+            ProjetoModelSerializer: Projeto(
+                id=1, nome="projeto", descricao="descricao", cliente_id=1
+            ),
+            AtividadeModelSerializer: Atividade(
+                id=1,
+                projeto_id=1,
+                descricao="descricao",
+                data_criacao=now,
+                prazo=date(2024, 12, 31),
+            ),
+        }
+        for serializer_class, instance in samples.items():
+            fast = FastReadSerializer(serializer_class)
+            instances = [instance] * rows
+            values = [
+                {column: getattr(instance, column) for _, column, _ in fast.columns}
+            ] * rows
+
+            before = min(
+                timeit(lambda: serializer_class(instances, many=True).data, number=1)
+                for _ in range(repeat)
+            )
+            after = min(
+                timeit(lambda: fast.many(values), number=1) for _ in range(repeat)
+            )
+            self.stdout.write(
+                f"{serializer_class.__name__}: "
+                f"{before / rows * 1e6:.2f}us/row -> {after / rows * 1e6:.2f}us/row "
+                f"({before / after:.1f}x)"
+            )
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import SCENARIOS, BenchmarkError, run_suite
+
+
+class Command(BaseCommand):
+    """
+    Run the benchmark suite of REST and GraphQL requests against the data
+    in the database (see ``seed_benchmark``), reporting throughput and
+    latency percentiles. Fails when a scenario runs more SQL queries per
+    request than its budget, so it can guard against N+1 regressions.
+    """
+
+    help = "Benchmark REST and GraphQL requests and check their query counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--warmup", type=int, default=10)
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=[scenario.name for scenario in SCENARIOS],
+            help="Run only this scenario, may be repeated.",
+        )
+
+    def handle(self, *args, **options):
+        scenarios = [
+            scenario
+            for scenario in SCENARIOS
+            if not options["scenario"] or scenario.name in options["scenario"]
+        ]
+        try:
+            results = run_suite(options["requests"], options["warmup"], scenarios)
+        except BenchmarkError as e:
+            raise CommandError(e)
+
+        for result in results:
+            self.stdout.write(
+                f"{result.scenario.name}: {result.throughput:.0f} req/s, "
+                f"p50 {result.percentile(50) * 1000:.1f}ms, "
+                f"p95 {result.percentile(95) * 1000:.1f}ms, "
+                f"p99 {result.percentile(99) * 1000:.1f}ms, "
+                f"{result.max_queries} queries (max {result.scenario.max_queries})"
+            )
+        regressed = [result.scenario.name for result in results if result.regressed]
+        if regressed:
+            raise CommandError(f"Query count regressed: {', '.join(regressed)}.")
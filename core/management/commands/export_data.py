@@ -0,0 +1,46 @@
+import sys
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from core.exports import CHUNK_SIZE, FORMATS, export
+
+
+class Command(BaseCommand):
+    """
+    Write every cliente with its projetos and atividades to a file, or to
+    stdout with ``-``, as NDJSON (one nested cliente per line) or CSV (one
+    row per atividade). Rows are streamed from the database, so memory
+    stays constant for any table size.
+    """
+
+    help = "Export clientes, projetos and atividades as NDJSON or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to write, or - for stdout.")
+        parser.add_argument("--format", choices=FORMATS, default="ndjson")
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        output = sys.stdout.buffer if path == "-" else open(path, "wb")
+        started = perf_counter()
+        written = 0
+        try:
+            for chunk in export(
+                options["format"],
+                compress=options["gzip"],
+                chunk_size=options["chunk_size"],
+            ):
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if path == "-":
+                output.flush()
+            else:
+                output.close()
+        if path != "-":
+            self.stdout.write(
+                f"Wrote {written} bytes to {path} in {perf_counter() - started:.2f}s."
+            )
@@ -0,0 +1,75 @@
+import json
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.imports import SERIALIZERS, Importer, read_rows
+
+
+class Command(BaseCommand):
+    """
+    Load clientes, projetos or atividades from a CSV or NDJSON file, or
+    from stdin with ``-``. Rows are validated by the API serializers and
+    written in batches; rejected rows are counted and, with ``--rejects``,
+    written as NDJSON with their line number and errors.
+
+    Projetos may reference their cliente by ``cliente`` (id) or by
+    ``cliente_email``; atividades reference their projeto by ``projeto``.
+    """
+
+    help = "Bulk import clientes, projetos or atividades from CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", choices=SERIALIZERS)
+        parser.add_argument("path", help="File to read, or - for stdin.")
+        parser.add_argument("--format", choices=["csv", "ndjson"])
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--rejects", help="Write the rejected rows to this file.")
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Use bulk_create instead of COPY on PostgreSQL.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        format = options["format"]
+        if format is None:
+            extension = os.path.splitext(path)[1].lower()
+            format = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}.get(
+                extension
+            )
+            if format is None:
+                raise CommandError("Cannot infer the format, use --format.")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        rejects = open(options["rejects"], "w") if options["rejects"] else None
+        stream = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+
+        def on_reject(line, row, errors):
+            if rejects is not None:
+                row = row if isinstance(row, dict) else None
+                record = {"line": line, "row": row, "errors": errors}
+                rejects.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+        importer = Importer(
+            SERIALIZERS[options["model"]],
+            batch_size=options["batch_size"],
+            use_copy=False if options["no_copy"] else None,
+            on_reject=on_reject,
+        )
+        try:
+            result = importer.run(read_rows(stream, format))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if rejects is not None:
+                rejects.close()
+
+        self.stdout.write(
+            f"Imported {result.imported} {options['model']} in "
+            f"{result.elapsed:.2f}s ({result.rows_per_second:.0f} rows/s), "
+            f"{result.rejected} rejected."
+        )
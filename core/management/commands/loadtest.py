@@ -0,0 +1,109 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from statistics import quantiles
+from time import perf_counter
+
+from asgiref.sync import ThreadSensitiveContext
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+
+GRAPHQL_QUERY = """
+query {
+    allProjetos(first: 50) {
+        edges { node { nome cliente { nome } atividades { descricao prazo } } }
+    }
+}
+"""
+
+TARGETS = {
+    "rest": ("/api/projetos/", "/api/async/projetos/"),
+    "graphql": ("/api/graphql/", "/api/async/graphql/"),
+}
+
+
+class Command(BaseCommand):
+    """
+    Compare the throughput of the sync (WSGI) views against their async
+    (ASGI) counterparts with ``N`` requests at a given concurrency.
+
+    Requests go through Django's request handlers in-process, without a
+    server: the sync views are called from a thread pool, like a threaded
+    WSGI server, and the async ones from a single event loop, each request
+    in its own thread-sensitive context, like the ASGI handler. The
+    response cache is disabled unless ``--cache`` is given.
+    """
+
+    help = "Compare sync (WSGI) and async (ASGI) views throughput."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target", choices=TARGETS, default="rest")
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--cache", action="store_true")
+
+    def handle(self, *args, **options):
+        sync_path, async_path = TARGETS[options["target"]]
+        if options["target"] == "graphql":
+            request = {
+                "data": json.dumps({"query": GRAPHQL_QUERY}),
+                "content_type": "application/json",
+            }
+            method = "post"
+        else:
+            request, method = {}, "get"
+
+        overrides = {"ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, "testserver"]}
+        if not options["cache"]:
+            overrides["RESPONSE_CACHE_TIMEOUT"] = 0
+        with override_settings(**overrides):
+            for name, run, path in (
+                ("WSGI", self.run_sync, sync_path),
+                ("ASGI", self.run_async, async_path),
+            ):
+                latencies, elapsed = run(path, method, request, options)
+                self.report(name, path, latencies, elapsed)
+
+    def run_sync(self, path, method, request, options):
+        def call(_):
+            client = Client()
+            started = perf_counter()
+            response = getattr(client, method)(path, **request)
+            assert response.status_code == 200, response.status_code
+            latency = perf_counter() - started
+            connections.close_all()
+            return latency
+
+        started = perf_counter()
+        with ThreadPoolExecutor(options["concurrency"]) as pool:
+            latencies = list(pool.map(call, range(options["requests"])))
+        return latencies, perf_counter() - started
+
+    def run_async(self, path, method, request, options):
+        async def call(client, semaphore):
+            async with semaphore, ThreadSensitiveContext():
+                started = perf_counter()
+                response = await getattr(client, method)(path, **request)
+                assert response.status_code == 200, response.status_code
+                return perf_counter() - started
+
+        async def run():
+            client = AsyncClient()
+            semaphore = asyncio.Semaphore(options["concurrency"])
+            started = perf_counter()
+            latencies = await asyncio.gather(
+                *(call(client, semaphore) for _ in range(options["requests"]))
+            )
+            return latencies, perf_counter() - started
+
+        return asyncio.run(run())
+
+    def report(self, name, path, latencies, elapsed):
+        percentiles = quantiles(latencies, n=100)
+        p50, p95 = percentiles[49], percentiles[94]
+        self.stdout.write(
+            f"{name} {path}: {len(latencies) / elapsed:.0f} req/s, "
+            f"p50 {p50 * 1000:.1f}ms, p95 {p95 * 1000:.1f}ms"
+        )
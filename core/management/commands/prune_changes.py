@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.changes import prune_changes
+
+
+class Command(BaseCommand):
+    """
+    Delete the old entries of the change log, meant to run daily from
+    cron. A client whose cursor is older than the kept entries is told to
+    reload its rows, so ``--days`` should exceed the time a client may
+    stay offline.
+    """
+
+    help = "Delete the change log entries older than --days days."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=7)
+
+    def handle(self, *args, **options):
+        if options["days"] < 0:
+            raise CommandError("--days must not be negative.")
+        deleted = prune_changes(options["days"])
+        self.stdout.write(f"Deleted {deleted} change log entries.")
@@ -0,0 +1,92 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+from core.jobs import claim_job, fail_job, run_job
+
+
+class Command(BaseCommand):
+    """
+    Worker of the background jobs queued in the Job table. Jobs are
+    claimed one at a time, oldest first, and run in a pool of
+    ``--processes`` processes, so a heavy import does not hold back the
+    other jobs. Any number of workers may run against the same database.
+
+    The workers evict cached responses through the cache backend, so it
+    must be shared with the web processes, e.g. ``CACHE_URL`` pointing to
+    Redis, for their caches to see the changes.
+    """
+
+    help = "Run the queued background jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Jobs run at once, 0 runs them one by one in this process.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the queue is empty instead of waiting for jobs.",
+        )
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        if options["processes"] < 0:
+            raise CommandError("--processes cannot be negative.")
+        if options["processes"] == 0:
+            self.run_inline(options["once"], options["poll_interval"])
+        else:
+            self.run_pool(
+                options["processes"], options["once"], options["poll_interval"]
+            )
+
+    def report(self, pk, status):
+        self.stdout.write(f"Job {pk}: {status}")
+
+    def run_inline(self, once, poll_interval):
+        while True:
+            pk = claim_job()
+            if pk is not None:
+                self.report(pk, run_job(pk))
+            elif once:
+                return
+            else:
+                time.sleep(poll_interval)
+
+    def run_pool(self, processes, once, poll_interval):
+        # spawned processes do not share the database connections of this one
+        with ProcessPoolExecutor(
+            processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=django.setup,
+        ) as pool:
+            running = {}
+            while True:
+                while len(running) < processes:
+                    pk = claim_job()
+                    if pk is None:
+                        break
+                    running[pool.submit(run_job, pk)] = pk
+                if not running:
+                    if once:
+                        return
+                    time.sleep(poll_interval)
+                    continue
+                done, _ = wait(
+                    running, timeout=poll_interval, return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    pk = running.pop(future)
+                    try:
+                        status = future.result()
+                    except Exception as e:
+                        # the process running it died
+                        status = fail_job(pk, e)
+                    self.report(pk, status)
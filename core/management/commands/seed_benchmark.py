@@ -0,0 +1,37 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from core.benchmark import seed
+
+
+class Command(BaseCommand):
+    """
+    Fill the database with synthetic data for benchmarks: ``--clientes``
+    clientes, each with ``--projetos`` projetos of ``--atividades``
+    atividades. Rows are added to the existing ones, so run it on a
+    scratch database.
+    """
+
+    help = "Generate clientes x projetos x atividades of synthetic data."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clientes", type=int, default=1000)
+        parser.add_argument("--projetos", type=int, default=10)
+        parser.add_argument("--atividades", type=int, default=10)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        counts = seed(
+            options["clientes"],
+            options["projetos"],
+            options["atividades"],
+            batch_size=options["batch_size"],
+            seed=options["seed"],
+        )
+        rows = ", ".join(
+            f"{n} {model._meta.verbose_name_plural}" for model, n in counts.items()
+        )
+        self.stdout.write(f"Added {rows} in {perf_counter() - started:.1f}s.")
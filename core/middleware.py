@@ -0,0 +1,79 @@
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+from core.profiling import (
+    log_duplicates,
+    metrics,
+    server_timing,
+    start_profile,
+    stop_profile,
+)
+from core.routers import pin_to_primary, routing_context
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Gives every request its own routing state for ReplicaRouter: safe
+    methods read from the replicas, unsafe ones are pinned to the primary
+    unless the view is marked with ``primary_exempt``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with routing_context():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with routing_context():
+            return await self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in SAFE_METHODS and not getattr(
+            view_func, "primary_exempt", False
+        ):
+            pin_to_primary()
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in with ``PROFILING``: times the SQL queries and GraphQL resolvers
+    of every request, sends them in a ``Server-Timing`` header and adds
+    them to the Prometheus metrics served at ``/metrics``. Statements run
+    ``PROFILING_DUPLICATE_THRESHOLD`` times or more by one request are
+    logged as possible N+1 queries.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile, token = start_profile()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            stop_profile(token)
+        duplicates = profile.get_duplicates(settings.PROFILING_DUPLICATE_THRESHOLD)
+        if duplicates:
+            log_duplicates(request, duplicates)
+        response["Server-Timing"] = server_timing(profile, duplicates)
+        metrics.record(request, response, profile, duplicates)
+        return response
@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-18 14:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_alter_cliente_telefone"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="atividade",
+            index=models.Index(
+                fields=["projeto", "prazo"], name="atividade_projeto_prazo_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="projeto",
+            index=models.Index(
+                fields=["cliente", "status"], name="projeto_cliente_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="projeto",
+            index=models.Index(
+                condition=models.Q(("status", "em_andamento")),
+                fields=["cliente"],
+                name="projeto_em_andamento_idx",
+            ),
+        ),
+    ]
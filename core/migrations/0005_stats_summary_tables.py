@@ -0,0 +1,93 @@
+# Generated by Django 4.2 on 2026-10-18 14:25
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def fill_stats(apps, schema_editor):
+    """Count the stats of the existing clientes and projetos"""
+    Cliente = apps.get_model("core", "Cliente")
+    Projeto = apps.get_model("core", "Projeto")
+    ClienteStats = apps.get_model("core", "ClienteStats")
+    ProjetoStats = apps.get_model("core", "ProjetoStats")
+    statuses = ["em_andamento", "concluido", "pausado"]
+
+    cliente_stats = {
+        pk: ClienteStats(cliente_id=pk)
+        for pk in Cliente.objects.values_list("pk", flat=True)
+    }
+    rows = Projeto.objects.values("cliente_id", "status").annotate(total=Count("pk"))
+    for row in rows.order_by():
+        stats = cliente_stats[row["cliente_id"]]
+        stats.total_projetos += row["total"]
+        if row["status"] in statuses:
+            setattr(stats, row["status"], getattr(stats, row["status"]) + row["total"])
+    ClienteStats.objects.bulk_create(cliente_stats.values(), batch_size=1000)
+
+    today = timezone.localdate()
+    rows = Projeto.objects.annotate(
+        total=Count("atividades"),
+        atrasadas=Count("atividades", filter=Q(atividades__prazo__lt=today)),
+    ).values_list("pk", "total", "atrasadas")
+    ProjetoStats.objects.bulk_create(
+        (
+            ProjetoStats(
+                projeto_id=pk,
+                total_atividades=total,
+                atividades_atrasadas=atrasadas,
+                data_referencia=today,
+            )
+            for pk, total, atrasadas in rows.order_by().iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_composite_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ClienteStats",
+            fields=[
+                (
+                    "cliente",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="+",
+                        serialize=False,
+                        to="core.cliente",
+                    ),
+                ),
+                ("total_projetos", models.IntegerField(default=0)),
+                ("em_andamento", models.IntegerField(default=0)),
+                ("concluido", models.IntegerField(default=0)),
+                ("pausado", models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ProjetoStats",
+            fields=[
+                (
+                    "projeto",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="+",
+                        serialize=False,
+                        to="core.projeto",
+                    ),
+                ),
+                ("total_atividades", models.IntegerField(default=0)),
+                ("atividades_atrasadas", models.IntegerField(default=0)),
+                ("data_referencia", models.DateField()),
+            ],
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2 on 2026-10-18 14:28
+
+from django.db import migrations, models
+
+# GIN trigram indexes over UPPER(column), the expression compared by the
+# icontains lookups of the search filter, PostgreSQL only.
+TRIGRAM_INDEXES = [
+    ("projeto_nome_trgm_idx", "core_projeto", "nome"),
+    ("projeto_descricao_trgm_idx", "core_projeto", "descricao"),
+    ("atividade_descricao_trgm_idx", "core_atividade", "descricao"),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" '
+            f'USING gin (UPPER("{column}") gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_stats_summary_tables"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="atividade",
+            index=models.Index(fields=["prazo"], name="atividade_prazo_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="atividade",
+            index=models.Index(
+                fields=["data_criacao"], name="atividade_data_criacao_idx"
+            ),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
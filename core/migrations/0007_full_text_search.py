@@ -0,0 +1,93 @@
+from django.db import migrations
+
+POSTGRESQL = [
+    (
+        """
+        ALTER TABLE core_projeto ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('portuguese', coalesce(nome, '')), 'A')
+            || setweight(to_tsvector('portuguese', coalesce(descricao, '')), 'B')
+        ) STORED
+        """,
+        "ALTER TABLE core_projeto DROP COLUMN search_vector",
+    ),
+    (
+        "CREATE INDEX projeto_search_idx ON core_projeto USING gin (search_vector)",
+        "DROP INDEX projeto_search_idx",
+    ),
+    (
+        """
+        ALTER TABLE core_atividade ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            to_tsvector('portuguese', coalesce(descricao, ''))
+        ) STORED
+        """,
+        "ALTER TABLE core_atividade DROP COLUMN search_vector",
+    ),
+    (
+        "CREATE INDEX atividade_search_idx ON core_atividade USING gin (search_vector)",
+        "DROP INDEX atividade_search_idx",
+    ),
+]
+
+# External content FTS5 tables, kept in sync by the triggers installed by
+# core.search.install_sqlite_triggers after every migrate.
+SQLITE = [
+    (
+        """
+        CREATE VIRTUAL TABLE core_projeto_fts USING fts5(
+            nome, descricao, content='core_projeto', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        "DROP TABLE core_projeto_fts",
+    ),
+    (
+        """
+        CREATE VIRTUAL TABLE core_atividade_fts USING fts5(
+            descricao, content='core_atividade', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        "DROP TABLE core_atividade_fts",
+    ),
+]
+
+
+def run(statements):
+    """Run the forward or backward statements of the current database"""
+
+    def operation(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        for statement in statements.get(vendor, []):
+            schema_editor.execute(statement)
+
+    return operation
+
+
+class Migration(migrations.Migration):
+    """
+    Text search indexes over nome and descricao: a generated tsvector
+    column with a GIN index on PostgreSQL and an FTS5 table on SQLite.
+    """
+
+    dependencies = [
+        ("core", "0006_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run(
+                {
+                    "postgresql": [forward for forward, _ in POSTGRESQL],
+                    "sqlite": [forward for forward, _ in SQLITE],
+                }
+            ),
+            run(
+                {
+                    "postgresql": [backward for _, backward in reversed(POSTGRESQL)],
+                    "sqlite": [backward for _, backward in reversed(SQLITE)],
+                }
+            ),
+        ),
+    ]
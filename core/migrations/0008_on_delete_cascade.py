@@ -0,0 +1,62 @@
+from django.db import migrations
+
+# foreign keys whose rows go with their parent
+CASCADES = [
+    ("projeto", "cliente"),
+    ("atividade", "projeto"),
+    ("clientestats", "cliente"),
+    ("projetostats", "projeto"),
+]
+
+
+def on_delete(action):
+    """
+    Recreate the foreign key constraints of CASCADES with the given ON
+    DELETE action, keeping their names and deferral. Only PostgreSQL is
+    changed: SQLite cannot alter a constraint without rebuilding the
+    table and runs one writer at a time, so core.deletion deleting the
+    children first is enough there.
+    """
+
+    def operation(apps, schema_editor):
+        connection = schema_editor.connection
+        if connection.vendor != "postgresql":
+            return
+        quote = schema_editor.quote_name
+        for model_name, field_name in CASCADES:
+            model = apps.get_model("core", model_name)
+            field = model._meta.get_field(field_name)
+            table = model._meta.db_table
+            with connection.cursor() as cursor:
+                constraints = connection.introspection.get_constraints(cursor, table)
+            for name, constraint in constraints.items():
+                if not constraint["foreign_key"] or constraint["columns"] != [
+                    field.column
+                ]:
+                    continue
+                schema_editor.execute(
+                    f"ALTER TABLE {quote(table)} DROP CONSTRAINT {quote(name)}, "
+                    f"ADD CONSTRAINT {quote(name)} FOREIGN KEY ({quote(field.column)}) "
+                    f"REFERENCES {quote(field.related_model._meta.db_table)} "
+                    f"({quote(field.target_field.column)}) ON DELETE {action} "
+                    "DEFERRABLE INITIALLY DEFERRED"
+                )
+
+    return operation
+
+
+class Migration(migrations.Migration):
+    """
+    Database level ON DELETE CASCADE on the foreign keys, so a parent
+    deleted with a single DELETE takes along children inserted while it
+    was being deleted. Django recreates these constraints without it if
+    the fields are altered later, so they must be added again then.
+    """
+
+    dependencies = [
+        ("core", "0007_full_text_search"),
+    ]
+
+    operations = [
+        migrations.RunPython(on_delete("CASCADE"), on_delete("NO ACTION")),
+    ]
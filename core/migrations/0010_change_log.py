@@ -0,0 +1,124 @@
+# Generated by Django 4.2 on 2026-10-18 14:55
+
+from django.db import migrations, models
+
+# logged tables and the column of their parent row
+LOGGED_TABLES = {
+    "core_cliente": None,
+    "core_projeto": "cliente_id",
+    "core_atividade": "projeto_id",
+}
+
+POSTGRESQL_FUNCTION = """
+CREATE FUNCTION core_log_change() RETURNS trigger AS $$
+DECLARE
+    changed record;
+    parent bigint;
+    old_parent bigint;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        changed := OLD;
+    ELSE
+        changed := NEW;
+    END IF;
+    IF TG_ARGV[1] <> '' THEN
+        parent := (to_jsonb(changed) ->> TG_ARGV[1])::bigint;
+    END IF;
+    INSERT INTO core_change (model, object_id, parent_id, action, changed_at)
+    VALUES (
+        TG_ARGV[0],
+        changed.id,
+        parent,
+        CASE TG_OP WHEN 'INSERT' THEN 'create' WHEN 'UPDATE' THEN 'update'
+        ELSE 'delete' END,
+        clock_timestamp()
+    );
+    IF TG_OP = 'UPDATE' AND TG_ARGV[1] <> '' THEN
+        -- a row moved to another parent leaves the list of the old one
+        old_parent := (to_jsonb(OLD) ->> TG_ARGV[1])::bigint;
+        IF old_parent IS DISTINCT FROM parent THEN
+            INSERT INTO core_change (model, object_id, parent_id, action, changed_at)
+            VALUES (TG_ARGV[0], changed.id, old_parent, 'update', clock_timestamp());
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def install_postgresql_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(POSTGRESQL_FUNCTION)
+    for table, parent in LOGGED_TABLES.items():
+        label = "core." + table.removeprefix("core_")
+        schema_editor.execute(
+            f"CREATE TRIGGER {table}_change AFTER INSERT OR UPDATE OR DELETE "
+            f"ON {table} FOR EACH ROW "
+            f"EXECUTE FUNCTION core_log_change('{label}', '{parent or ''}')"
+        )
+
+
+def drop_postgresql_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table in LOGGED_TABLES:
+        schema_editor.execute(f"DROP TRIGGER {table}_change ON {table}")
+    schema_editor.execute("DROP FUNCTION core_log_change()")
+
+
+class Migration(migrations.Migration):
+    """
+    Change log of clientes, projetos and atividades, written by a trigger
+    on each table. On PostgreSQL they are created here; the SQLite ones
+    are installed by core.changes.install_sqlite_triggers after every
+    migrate, as SQLite drops them when a migration rebuilds a table.
+    """
+
+    dependencies = [
+        ("core", "0009_job"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Change",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("model", models.CharField(max_length=50)),
+                ("object_id", models.BigIntegerField()),
+                ("parent_id", models.BigIntegerField(blank=True, null=True)),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("create", "Criação"),
+                            ("update", "Alteração"),
+                            ("delete", "Exclusão"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("changed_at", models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="change",
+            index=models.Index(
+                fields=["model", "parent_id", "id"], name="change_parent_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="change",
+            index=models.Index(fields=["changed_at"], name="change_changed_at_idx"),
+        ),
+        migrations.RunPython(install_postgresql_triggers, drop_postgresql_triggers),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2 on 2026-10-18 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_change_log"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="atividade",
+            options={"base_manager_name": "objects"},
+        ),
+        migrations.AlterModelOptions(
+            name="cliente",
+            options={"base_manager_name": "objects"},
+        ),
+        migrations.AlterModelOptions(
+            name="projeto",
+            options={"base_manager_name": "objects"},
+        ),
+        migrations.AddField(
+            model_name="atividade",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="atividade",
+            name="version",
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name="cliente",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="cliente",
+            name="version",
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name="projeto",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="projeto",
+            name="version",
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
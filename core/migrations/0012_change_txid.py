@@ -0,0 +1,109 @@
+# Generated by Django 4.2 on 2026-10-18 15:13
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+POSTGRESQL_FUNCTION = """
+CREATE OR REPLACE FUNCTION core_log_change() RETURNS trigger AS $$
+DECLARE
+    changed record;
+    parent bigint;
+    old_parent bigint;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        changed := OLD;
+    ELSE
+        changed := NEW;
+    END IF;
+    IF TG_ARGV[1] <> '' THEN
+        parent := (to_jsonb(changed) ->> TG_ARGV[1])::bigint;
+    END IF;
+    INSERT INTO core_change (model, object_id, parent_id, action, changed_at, txid)
+    VALUES (
+        TG_ARGV[0],
+        changed.id,
+        parent,
+        CASE TG_OP WHEN 'INSERT' THEN 'create' WHEN 'UPDATE' THEN 'update'
+        ELSE 'delete' END,
+        clock_timestamp(),
+        txid_current()
+    );
+    IF TG_OP = 'UPDATE' AND TG_ARGV[1] <> '' THEN
+        -- a row moved to another parent leaves the list of the old one
+        old_parent := (to_jsonb(OLD) ->> TG_ARGV[1])::bigint;
+        IF old_parent IS DISTINCT FROM parent THEN
+            INSERT INTO core_change
+                (model, object_id, parent_id, action, changed_at, txid)
+            VALUES (
+                TG_ARGV[0], changed.id, old_parent, 'update', clock_timestamp(),
+                txid_current()
+            );
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def replace_postgresql_function(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(POSTGRESQL_FUNCTION)
+
+
+def restore_postgresql_function(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        previous = import_module("core.migrations.0010_change_log")
+        schema_editor.execute(
+            previous.POSTGRESQL_FUNCTION.replace("CREATE", "CREATE OR REPLACE", 1)
+        )
+
+
+class Migration(migrations.Migration):
+    """
+    Order the change log by the id of the writing transaction, so the feed
+    only serves entries of transactions no longer running. The entries
+    logged before have txid 0, before any new one.
+    """
+
+    dependencies = [
+        ("core", "0011_row_version"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="change",
+            name="change_parent_idx",
+        ),
+        migrations.AddField(
+            model_name="change",
+            name="txid",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="change",
+            name="action",
+            field=models.CharField(
+                choices=[
+                    ("create", "Criação"),
+                    ("update", "Alteração"),
+                    ("delete", "Exclusão"),
+                    ("prune", "Limpeza"),
+                ],
+                max_length=10,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="change",
+            index=models.Index(fields=["txid", "id"], name="change_txid_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="change",
+            index=models.Index(
+                fields=["model", "parent_id", "txid", "id"],
+                name="change_parent_txid_idx",
+            ),
+        ),
+        migrations.RunPython(replace_postgresql_function, restore_postgresql_function),
+    ]
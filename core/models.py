@@ -1,8 +1,54 @@
 from django.db import models
+from django.db.models import F
 from django.core.validators import RegexValidator
+from django.utils import timezone
 
 
-class Cliente(models.Model):
+class VersionedQuerySet(models.QuerySet):
+    """
+    QuerySet bumping the ``version`` of every row it updates, and setting
+    its ``updated_at`` unless given. ``save()``, ``bulk_update()`` and
+    ``update()`` all run through here, so no write path can skip it.
+    """
+
+    def update(self, **kwargs):
+        kwargs.setdefault("updated_at", timezone.now())
+        kwargs["version"] = F("version") + 1
+        return super().update(**kwargs)
+
+    update.alters_data = True
+
+    def _update(self, values):
+        version = self.model._meta.get_field("version")
+        updated_at = self.model._meta.get_field("updated_at")
+        values = [value for value in values if value[0] is not version]
+        if not any(value[0] is updated_at for value in values):
+            values.append((updated_at, None, timezone.now()))
+        values.append((version, None, F("version") + 1))
+        return super()._update(values)
+
+    _update.alters_data = True
+    _update.queryset_only = False
+
+
+class VersionedModel(models.Model):
+    """
+    Abstract model with a row ``version``, incremented by every UPDATE of
+    the row, and the time of its last write. Together they identify the
+    state of a row, e.g. for the ETag of its REST resource.
+    """
+    version = models.PositiveIntegerField(default=1, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = VersionedQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+        # save() updates through the base manager
+        base_manager_name = "objects"
+
+
+class Cliente(VersionedModel):
     """
     Model that represents Cliente data
     """
@@ -20,7 +66,7 @@ class Cliente(models.Model):
         return self.nome
 
 
-class Projeto(models.Model):
+class Projeto(VersionedModel):
     """
     Model that represents Projet data
     """
@@ -38,11 +84,23 @@ class Projeto(models.Model):
         max_length=20, choices=STATUS_CHOICES, default="em_andamento"
     )
 
+    class Meta(VersionedModel.Meta):
+        indexes = [
+            models.Index(
+                fields=["cliente", "status"], name="projeto_cliente_status_idx"
+            ),
+            models.Index(
+                fields=["cliente"],
+                condition=models.Q(status="em_andamento"),
+                name="projeto_em_andamento_idx",
+            ),
+        ]
+
     def __str__(self):
         return self.nome
 
 
-class Atividade(models.Model):
+class Atividade(VersionedModel):
     """
     Model that represents Atividade data
     """
@@ -53,5 +111,124 @@ class Atividade(models.Model):
     data_criacao = models.DateTimeField(auto_now_add=True)
     prazo = models.DateField()
 
+    class Meta(VersionedModel.Meta):
+        indexes = [
+            models.Index(
+                fields=["projeto", "prazo"], name="atividade_projeto_prazo_idx"
+            ),
+            models.Index(fields=["prazo"], name="atividade_prazo_idx"),
+            models.Index(fields=["data_criacao"], name="atividade_data_criacao_idx"),
+        ]
+
     def __str__(self):
         return f"{self.projeto.nome} - {self.descricao[:20]}"
+
+
+class ClienteStats(models.Model):
+    """
+    Summary of the projetos of a Cliente, kept up to date by the model
+    signals so dashboards read one row instead of counting projetos.
+    There is one counter per Projeto status.
+    """
+    cliente = models.OneToOneField(
+        Cliente, on_delete=models.CASCADE, primary_key=True, related_name="+"
+    )
+    total_projetos = models.IntegerField(default=0)
+    em_andamento = models.IntegerField(default=0)
+    concluido = models.IntegerField(default=0)
+    pausado = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.cliente_id} - {self.total_projetos} projetos"
+
+
+class ProjetoStats(models.Model):
+    """
+    Summary of the atividades of a Projeto, kept up to date by the model
+    signals. ``atividades_atrasadas`` counts the atividades with a prazo
+    before ``data_referencia``, and is recounted when read on a later day.
+    """
+    projeto = models.OneToOneField(
+        Projeto, on_delete=models.CASCADE, primary_key=True, related_name="+"
+    )
+    total_atividades = models.IntegerField(default=0)
+    atividades_atrasadas = models.IntegerField(default=0)
+    data_referencia = models.DateField()
+
+    def __str__(self):
+        return f"{self.projeto_id} - {self.total_atividades} atividades"
+
+
+class Job(models.Model):
+    """
+    Model that represents a background Job: an import, export or delete
+    run by the ``run_jobs`` worker, with its progress and result.
+    """
+    KIND_CHOICES = [
+        ("import", "Importação"),
+        ("export", "Exportação"),
+        ("delete", "Exclusão"),
+    ]
+    STATUS_CHOICES = [
+        ("pendente", "Pendente"),
+        ("executando", "Executando"),
+        ("concluido", "Concluído"),
+        ("falhou", "Falhou"),
+    ]
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pendente")
+    processed = models.IntegerField(default=0)
+    total = models.IntegerField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # renewed by the worker running the job, see core.jobs.claim_job
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "id"], name="job_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} - {self.status}"
+
+
+class Change(models.Model):
+    """
+    Model that represents an entry of the change log: a Cliente, Projeto
+    or Atividade created, updated or deleted. Entries are written by
+    database triggers, so bulk writes and cascades are logged too. The
+    feed is ordered by ``txid``, the id of the writing transaction on
+    PostgreSQL (0 on SQLite), then ``id``, the cursor clients follow it
+    with. A ``prune`` entry marks where older entries were deleted.
+    """
+    ACTION_CHOICES = [
+        ("create", "Criação"),
+        ("update", "Alteração"),
+        ("delete", "Exclusão"),
+        ("prune", "Limpeza"),
+    ]
+    model = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    parent_id = models.BigIntegerField(null=True, blank=True)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    changed_at = models.DateTimeField()
+    txid = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["txid", "id"], name="change_txid_idx"),
+            models.Index(
+                fields=["model", "parent_id", "txid", "id"],
+                name="change_parent_txid_idx",
+            ),
+            models.Index(fields=["changed_at"], name="change_changed_at_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.model}:{self.object_id} - {self.action}"
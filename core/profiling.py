@@ -0,0 +1,197 @@
+import logging
+import threading
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+logger = logging.getLogger(__name__)
+
+# profile of the current request, set by ProfilingMiddleware
+_current_profile = ContextVar("current_profile", default=None)
+
+
+class RequestProfile:
+    """
+    Timings of one request: its SQL queries, counted by statement to spot
+    the same query run again and again (N+1), and its GraphQL resolvers
+    by ``Type.field``.
+    """
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.query_count = 0
+        self.sql_time = 0.0
+        self.statements = Counter()
+        self.resolvers = defaultdict(lambda: [0, 0.0])
+
+    def __call__(self, execute, sql, params, many, context):
+        """``connection.execute_wrapper`` timing every query"""
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_count += 1
+            self.sql_time += perf_counter() - started
+            self.statements[sql] += 1
+
+    def add_resolver(self, field, elapsed):
+        timing = self.resolvers[field]
+        timing[0] += 1
+        timing[1] += elapsed
+
+    @property
+    def elapsed(self):
+        return perf_counter() - self.started
+
+    def get_duplicates(self, threshold):
+        """Return the statements run at least ``threshold`` times"""
+        return {sql: n for sql, n in self.statements.items() if n >= threshold}
+
+
+def get_profile():
+    """Return the profile of the current request, None when not profiled"""
+    return _current_profile.get()
+
+
+def start_profile():
+    profile = RequestProfile()
+    return profile, _current_profile.set(profile)
+
+
+def stop_profile(token):
+    _current_profile.reset(token)
+
+
+def server_timing(profile, duplicates, max_resolvers=5):
+    """Format a profile as a ``Server-Timing`` header"""
+    desc = f"{profile.query_count} queries"
+    if duplicates:
+        desc += f", {sum(duplicates.values())} repeated"
+    entries = [
+        f"total;dur={profile.elapsed * 1000:.1f}",
+        f'db;dur={profile.sql_time * 1000:.1f};desc="{desc}"',
+    ]
+    slowest = sorted(profile.resolvers.items(), key=lambda item: -item[1][1])
+    for field, (count, elapsed) in slowest[:max_resolvers]:
+        entries.append(f'gql-{field};dur={elapsed * 1000:.1f};desc="{count} calls"')
+    return ", ".join(entries)
+
+
+class Metrics:
+    """
+    In-process Prometheus counters and summaries, rendered in the text
+    exposition format. Each server process keeps its own, so every
+    worker is scraped (or a single worker is run) for complete numbers.
+    """
+
+    FAMILIES = {
+        "core_http_requests_total": (
+            "counter",
+            "HTTP requests by view, method and status.",
+        ),
+        "core_http_request_duration_seconds": (
+            "summary",
+            "Time spent handling HTTP requests by view.",
+        ),
+        "core_db_queries_total": ("counter", "SQL queries run by view."),
+        "core_db_query_duration_seconds_total": (
+            "counter",
+            "Time spent running SQL queries by view.",
+        ),
+        "core_db_duplicate_queries_total": (
+            "counter",
+            "Repeated SQL queries (N+1) by view.",
+        ),
+        "core_graphql_resolver_duration_seconds": (
+            "summary",
+            "Time spent in GraphQL resolvers by field.",
+        ),
+    }
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(float)
+
+    def inc(self, name, labels, value=1.0, suffix=""):
+        key = (name, suffix, tuple(sorted(labels.items())))
+        with self.lock:
+            self.samples[key] += value
+
+    def observe(self, name, labels, value, count=1):
+        self.inc(name, labels, value, "_sum")
+        self.inc(name, labels, count, "_count")
+
+    def record(self, request, response, profile, duplicates):
+        match = request.resolver_match
+        labels = {"view": match.view_name if match is not None else ""}
+        self.inc(
+            "core_http_requests_total",
+            {**labels, "method": request.method, "status": str(response.status_code)},
+        )
+        self.observe("core_http_request_duration_seconds", labels, profile.elapsed)
+        self.inc("core_db_queries_total", labels, profile.query_count)
+        self.inc("core_db_query_duration_seconds_total", labels, profile.sql_time)
+        if duplicates:
+            self.inc(
+                "core_db_duplicate_queries_total", labels, sum(duplicates.values())
+            )
+        for field, (count, elapsed) in profile.resolvers.items():
+            self.observe(
+                "core_graphql_resolver_duration_seconds",
+                {"field": field},
+                elapsed,
+                count,
+            )
+
+    def render(self):
+        with self.lock:
+            samples = sorted(self.samples.items())
+        lines = []
+        for name, (kind, help) in self.FAMILIES.items():
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            for (sample, suffix, labels), value in samples:
+                if sample == name:
+                    lines.append(f"{name}{suffix}{format_labels(labels)} {value!r}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self.lock:
+            self.samples.clear()
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    values = (
+        '{}="{}"'.format(
+            name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        for name, value in labels
+    )
+    return "{" + ",".join(values) + "}"
+
+
+metrics = Metrics()
+
+
+def log_duplicates(request, duplicates):
+    for sql, count in duplicates.items():
+        logger.warning(
+            "Possible N+1: query run %d times by %s %s: %s",
+            count,
+            request.method,
+            request.path,
+            sql,
+        )
+
+
+def metrics_view(request):
+    """Prometheus endpoint, only served when PROFILING is on"""
+    if not settings.PROFILING:
+        raise Http404
+    return HttpResponse(
+        metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,82 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# set once the current request, or task, must read from the primary
+_use_primary = ContextVar("use_primary", default=False)
+
+
+def get_replicas():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+def reads_from_replicas():
+    """Return whether the reads of the current request go to a replica"""
+    return bool(get_replicas()) and not _use_primary.get()
+
+
+def pin_to_primary():
+    """Send the reads of the rest of the current request to the primary"""
+    _use_primary.set(True)
+
+
+@contextmanager
+def routing_context():
+    """
+    Run a block with its own routing state, reading from the replicas
+    until it writes or is pinned to the primary.
+    """
+    token = _use_primary.set(False)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+def primary_exempt(view_func):
+    """
+    Mark a view whose unsafe requests may still read from the replicas,
+    because it pins the primary itself before writing. Like
+    ``csrf_exempt``, it is read by ReplicaRoutingMiddleware.
+    """
+    view_func.primary_exempt = True
+    return view_func
+
+
+class ReplicaRouter:
+    """
+    Sends reads to a random replica of ``DATABASE_REPLICAS`` and writes to
+    the primary. Once a request writes, or is pinned to the primary, its
+    later reads go to the primary too, so it reads its own writes; reads
+    inside a transaction of the primary also stay there.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if not replicas or _use_primary.get():
+            return DEFAULT_DB_ALIAS
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas receive the schema through replication
+        if db in get_replicas():
+            return False
+        return None
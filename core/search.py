@@ -0,0 +1,178 @@
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from core.models import Projeto, Atividade
+
+# text search configuration of the PostgreSQL search_vector columns
+SEARCH_CONFIG = "portuguese"
+
+# searched columns of each model and their weight, higher ranks first
+SEARCH_FIELDS = {
+    Projeto: {"nome": 2.0, "descricao": 1.0},
+    Atividade: {"descricao": 1.0},
+}
+
+
+class SearchHit:
+    """A row matching a search and its rank, higher is better."""
+
+    def __init__(self, instance, rank):
+        self.instance = instance
+        self.rank = rank
+
+
+def fts_table(model):
+    return f"{model._meta.db_table}_fts"
+
+
+def fts_query(text):
+    """Quote every word of a text as an FTS5 phrase, so all must match"""
+    return " ".join('"{}"'.format(word.replace('"', '""')) for word in text.split())
+
+
+def get_match_sql(model, connection):
+    """
+    Return the SQL selecting the ``id`` and ``rank`` of the rows matching
+    one text parameter, or None when the database has no text index.
+    """
+    table = connection.ops.quote_name(model._meta.db_table)
+    if connection.vendor == "postgresql":
+        return (
+            f"SELECT id, ts_rank(search_vector, query) AS rank "
+            f"FROM {table}, websearch_to_tsquery('{SEARCH_CONFIG}', %s) query "
+            f"WHERE search_vector @@ query"
+        )
+    if connection.vendor == "sqlite":
+        fts = connection.ops.quote_name(fts_table(model))
+        weights = ", ".join(map(str, SEARCH_FIELDS[model].values()))
+        return (
+            f"SELECT rowid AS id, -bm25({fts}, {weights}) AS rank "
+            f"FROM {fts} WHERE {fts} MATCH %s"
+        )
+    return None
+
+
+def get_match_params(connection, text):
+    return [fts_query(text) if connection.vendor == "sqlite" else text]
+
+
+def filter_search(queryset, text):
+    """
+    Narrow a queryset to the rows matching a text, through the text
+    index of the database. Other databases fall back to ``icontains``.
+    """
+    model = queryset.model
+    connection = connections[queryset.db]
+    sql = get_match_sql(model, connection)
+    if not text.split():
+        return queryset.none()
+    if sql is None:
+        condition = Q()
+        for word in text.split():
+            condition &= Q(
+                *(Q(**{f"{name}__icontains": word}) for name in SEARCH_FIELDS[model]),
+                _connector=Q.OR,
+            )
+        return queryset.filter(condition)
+    return queryset.filter(
+        pk__in=RawSQL(
+            f"SELECT id FROM ({sql}) matches", get_match_params(connection, text)
+        )
+    )
+
+
+def search_model(model, text, limit, queryset=None):
+    """Return the SearchHits of the ``limit`` best matches of a model"""
+    if queryset is None:
+        queryset = model._default_manager.all()
+    connection = connections[router.db_for_read(model)]
+    sql = get_match_sql(model, connection)
+    if sql is None or not text.split():
+        ranks = {
+            pk: 0.0
+            for pk in filter_search(queryset, text).values_list("pk", flat=True)[:limit]
+        }
+    else:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"{sql} ORDER BY rank DESC, id LIMIT %s",
+                [*get_match_params(connection, text), limit],
+            )
+            ranks = dict(cursor.fetchall())
+    instances = queryset.in_bulk(ranks)
+    return [
+        SearchHit(instances[pk], rank) for pk, rank in ranks.items() if pk in instances
+    ]
+
+
+def search(text, limit, querysets=None):
+    """
+    Return the ``limit`` best matches of a text among projetos and
+    atividades, ranked together. ``querysets`` optionally maps a model to
+    the queryset its rows are loaded with.
+    """
+    querysets = querysets or {}
+    hits = []
+    for model in SEARCH_FIELDS:
+        hits.extend(search_model(model, text, limit, querysets.get(model)))
+    hits.sort(key=lambda hit: hit.rank, reverse=True)
+    return hits[:limit]
+
+
+SQLITE_TRIGGERS = {
+    "ai": "AFTER INSERT ON {table} BEGIN {insert}; END",
+    "ad": "AFTER DELETE ON {table} BEGIN {delete}; END",
+    "au": "AFTER UPDATE ON {table} BEGIN {delete}; {insert}; END",
+}
+
+
+def install_sqlite_triggers(connection):
+    """
+    Create the triggers that keep the SQLite FTS5 tables in sync with
+    their models, rebuilding a table whose triggers were missing. SQLite
+    drops the triggers of a table each time a migration rebuilds it, so
+    this runs after every migrate.
+    """
+    with connection.cursor() as cursor:
+        tables = set(connection.introspection.table_names(cursor))
+        for model, fields in SEARCH_FIELDS.items():
+            fts = fts_table(model)
+            if fts not in tables:
+                continue
+            table = model._meta.db_table
+            columns = ", ".join(fields)
+            new = ", ".join(f"new.{name}" for name in fields)
+            old = ", ".join(f"old.{name}" for name in fields)
+            statements = {
+                "insert": f"INSERT INTO {fts} (rowid, {columns}) VALUES (new.id, {new})",
+                "delete": (
+                    f"INSERT INTO {fts} ({fts}, rowid, {columns}) "
+                    f"VALUES ('delete', old.id, {old})"
+                ),
+            }
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s",
+                [table],
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            missing = {
+                f"{fts}_{suffix}": trigger
+                for suffix, trigger in SQLITE_TRIGGERS.items()
+                if f"{fts}_{suffix}" not in existing
+            }
+            if not missing:
+                continue
+            for name, trigger in missing.items():
+                cursor.execute(
+                    f"CREATE TRIGGER {name} "
+                    + trigger.format(table=table, **statements)
+                )
+            cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+def install_search_triggers(sender, using, **kwargs):
+    """post_migrate receiver installing the SQLite search triggers"""
+    connection = connections[using]
+    if connection.vendor == "sqlite":
+        install_sqlite_triggers(connection)
@@ -0,0 +1,98 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import stats
+from core.cache import get_invalidation_tags, response_cache
+from core.models import Cliente, Projeto, Atividade
+
+# fields of each model counted by the stats tables
+COUNTED_FIELDS = {
+    Projeto: ("cliente_id", "status"),
+    Atividade: ("projeto_id", "prazo"),
+}
+COUNTERS = {
+    Projeto: stats.count_projeto,
+    Atividade: stats.count_atividade,
+}
+# remembered instead of the counted fields when a save does not change them
+UNCOUNTED = object()
+
+
+def get_counted_names(model):
+    """Return the names and attnames of the counted fields of a model"""
+    names = set()
+    for attname in COUNTED_FIELDS[model]:
+        field = model._meta.get_field(attname)
+        names.update([field.name, field.attname])
+    return names
+
+
+@receiver(post_save, sender=Cliente)
+@receiver(post_save, sender=Projeto)
+@receiver(post_save, sender=Atividade)
+@receiver(post_delete, sender=Cliente)
+@receiver(post_delete, sender=Projeto)
+@receiver(post_delete, sender=Atividade)
+def invalidate_response_cache(sender, instance, **kwargs):
+    """Evict the cached responses that include the changed row"""
+    response_cache.invalidate(get_invalidation_tags(instance))
+
+
+@receiver(pre_save, sender=Projeto)
+@receiver(pre_save, sender=Atividade)
+def remember_counted_fields(sender, instance, update_fields=None, **kwargs):
+    """
+    Keep the stored values of the counted fields of an updated row. Counted
+    fields deferred on a partial update are filled from them, so they are
+    not loaded again by ``update_stats``. New rows and partial updates of
+    no counted field have nothing to read.
+    """
+    instance._counted_fields = None
+    if instance._state.adding:
+        return
+    if update_fields is not None and update_fields.isdisjoint(
+        get_counted_names(sender)
+    ):
+        instance._counted_fields = UNCOUNTED
+        return
+    instance._counted_fields = (
+        sender.objects.filter(pk=instance.pk)
+        .values_list(*COUNTED_FIELDS[sender])
+        .first()
+    )
+    if instance._counted_fields is not None:
+        deferred = instance.get_deferred_fields()
+        for name, value in zip(COUNTED_FIELDS[sender], instance._counted_fields):
+            if name in deferred:
+                setattr(instance, name, value)
+
+
+@receiver(post_save, sender=Cliente)
+@receiver(post_save, sender=Projeto)
+@receiver(post_save, sender=Atividade)
+def update_stats(sender, instance, created, **kwargs):
+    """Move the changed row between the counters of the stats tables"""
+    if created and sender in (Cliente, Projeto):
+        stats.create_stats(instance)
+    if sender not in COUNTERS:
+        return
+    previous = instance.__dict__.pop("_counted_fields", None)
+    if previous is UNCOUNTED:
+        return
+    current = tuple(getattr(instance, name) for name in COUNTED_FIELDS[sender])
+    if previous == current:
+        return
+    if previous is None and not created:
+        # saved over an existing row without loading it
+        stats.refresh_stats(stats.get_stats_keys([instance]))
+        return
+    if previous is not None:
+        COUNTERS[sender](*previous, -1)
+    COUNTERS[sender](*current, 1)
+
+
+@receiver(post_delete, sender=Projeto)
+@receiver(post_delete, sender=Atividade)
+def discount_stats(sender, instance, **kwargs):
+    """Remove a deleted row from the counters of the stats tables"""
+    COUNTERS[sender](*(getattr(instance, name) for name in COUNTED_FIELDS[sender]), -1)
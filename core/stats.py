@@ -0,0 +1,163 @@
+from django.db.models import Case, Count, F, Q, Value, When
+from django.utils import timezone
+
+from core.cache import instance_tag, model_tag, response_cache
+from core.models import Cliente, ClienteStats, Projeto, ProjetoStats, Atividade
+
+STATUS_FIELDS = [status for status, _ in Projeto.STATUS_CHOICES]
+
+
+def invalidate_stats(model, pks):
+    """Evict the cached responses that include the given stats rows"""
+    tags = [instance_tag(model, pk) for pk in pks]
+    response_cache.invalidate([*tags, model_tag(model)])
+
+
+def count_projeto(cliente_id, status, delta):
+    """Add ``delta`` projetos with a status to the stats of a cliente"""
+    changes = {"total_projetos": F("total_projetos") + delta}
+    if status in STATUS_FIELDS:
+        changes[status] = F(status) + delta
+    ClienteStats.objects.filter(pk=cliente_id).update(**changes)
+    invalidate_stats(ClienteStats, [cliente_id])
+
+
+def count_atividade(projeto_id, prazo, delta):
+    """Add ``delta`` atividades with a prazo to the stats of a projeto"""
+    ProjetoStats.objects.filter(pk=projeto_id).update(
+        total_atividades=F("total_atividades") + delta,
+        atividades_atrasadas=F("atividades_atrasadas")
+        + Case(When(data_referencia__gt=prazo, then=Value(delta)), default=Value(0)),
+    )
+    invalidate_stats(ProjetoStats, [projeto_id])
+
+
+def create_stats(instance):
+    """Create the empty stats row of a new Cliente or Projeto"""
+    if isinstance(instance, Cliente):
+        stats = ClienteStats(cliente_id=instance.pk)
+    else:
+        stats = ProjetoStats(
+            projeto_id=instance.pk, data_referencia=timezone.localdate()
+        )
+    type(stats).objects.bulk_create([stats], ignore_conflicts=True)
+
+
+def refresh_cliente_stats(cliente_ids):
+    """
+    Recount the stats of the given clientes from the projetos table and
+    return them by cliente id. Ids of missing clientes are ignored.
+    """
+    ids = Cliente.objects.filter(pk__in=cliente_ids).values_list("pk", flat=True)
+    stats = {pk: ClienteStats(cliente_id=pk) for pk in ids}
+    if not stats:
+        return stats
+    rows = (
+        Projeto.objects.filter(cliente_id__in=stats)
+        .values("cliente_id", "status")
+        .annotate(total=Count("pk"))
+        .order_by()
+    )
+    for row in rows:
+        row_stats = stats[row["cliente_id"]]
+        row_stats.total_projetos += row["total"]
+        if row["status"] in STATUS_FIELDS:
+            setattr(
+                row_stats,
+                row["status"],
+                getattr(row_stats, row["status"]) + row["total"],
+            )
+    ClienteStats.objects.bulk_create(
+        stats.values(),
+        update_conflicts=True,
+        unique_fields=["cliente"],
+        update_fields=["total_projetos", *STATUS_FIELDS],
+    )
+    invalidate_stats(ClienteStats, stats)
+    return stats
+
+
+def refresh_projeto_stats(projeto_ids):
+    """
+    Recount the stats of the given projetos from the atividades table as
+    of today and return them by projeto id. Ids of missing projetos are
+    ignored.
+    """
+    today = timezone.localdate()
+    ids = Projeto.objects.filter(pk__in=projeto_ids).values_list("pk", flat=True)
+    stats = {pk: ProjetoStats(projeto_id=pk, data_referencia=today) for pk in ids}
+    if not stats:
+        return stats
+    rows = (
+        Atividade.objects.filter(projeto_id__in=stats)
+        .values("projeto_id")
+        .annotate(total=Count("pk"), atrasadas=Count("pk", filter=Q(prazo__lt=today)))
+        .order_by()
+    )
+    for row in rows:
+        stats[row["projeto_id"]].total_atividades = row["total"]
+        stats[row["projeto_id"]].atividades_atrasadas = row["atrasadas"]
+    ProjetoStats.objects.bulk_create(
+        stats.values(),
+        update_conflicts=True,
+        unique_fields=["projeto"],
+        update_fields=["total_atividades", "atividades_atrasadas", "data_referencia"],
+    )
+    invalidate_stats(ProjetoStats, stats)
+    return stats
+
+
+def get_stats_keys(instances):
+    """
+    Return the stats rows, as ``(stats model, pk)`` pairs, that count the
+    given Cliente, Projeto or Atividade instances.
+    """
+    keys = set()
+    for instance in instances:
+        if isinstance(instance, Cliente):
+            keys.add((ClienteStats, instance.pk))
+        elif isinstance(instance, Projeto):
+            keys.update(
+                [(ClienteStats, instance.cliente_id), (ProjetoStats, instance.pk)]
+            )
+        elif isinstance(instance, Atividade):
+            keys.add((ProjetoStats, instance.projeto_id))
+    return keys
+
+
+def refresh_stats(keys):
+    """
+    Recount the given stats rows, for writes that do not send model
+    signals such as ``bulk_create`` and ``bulk_update``.
+    """
+    refresh = {ClienteStats: refresh_cliente_stats, ProjetoStats: refresh_projeto_stats}
+    for model, refresh_model in refresh.items():
+        pks = {pk for key_model, pk in keys if key_model is model}
+        if pks:
+            refresh_model(pks)
+
+
+def get_cliente_stats(cliente_ids):
+    """Return the stats of the given clientes by id, counting missing rows"""
+    stats = ClienteStats.objects.in_bulk(cliente_ids)
+    missing = set(cliente_ids) - set(stats)
+    if missing:
+        stats.update(refresh_cliente_stats(missing))
+    return stats
+
+
+def get_projeto_stats(projeto_ids):
+    """
+    Return the stats of the given projetos by id. Missing rows, and rows
+    whose atrasadas were counted before today, are recounted.
+    """
+    today = timezone.localdate()
+    stats = ProjetoStats.objects.in_bulk(projeto_ids)
+    stale = {
+        pk
+        for pk in projeto_ids
+        if pk not in stats or stats[pk].data_referencia != today
+    }
+    if stale:
+        stats.update(refresh_projeto_stats(stale))
+    return stats
@@ -1,9 +1,41 @@
-from datetime import date
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+from unittest import skipUnless
+from unittest.mock import patch
+import orjson
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Value
+from django.test import TransactionTestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from core.models import Cliente, Projeto, Atividade
+from core.changes import get_changes
+from core.jobs import claim_job, enqueue
+from core.models import (
+    Atividade,
+    Change,
+    Cliente,
+    ClienteStats,
+    Job,
+    Projeto,
+    ProjetoStats,
+)
+from core.profiling import metrics
+from core.api.serializers import (
+    ClienteModelSerializer,
+    ProjetoModelSerializer,
+    AtividadeModelSerializer,
+    get_fast_serializer,
+)
 
 
 class TestApi(APITestCase):
@@ -16,6 +48,7 @@ class TestApi(APITestCase):
 
     def setUp(self):
         """Initial data"""
+        cache.clear()
         self.headerInfo = {"content-type": "application/json"}
         self.cliente1 = Cliente(
             nome="cliente1", email="cliente1@email.com", telefone="+5511972345738"
@@ -110,13 +143,27 @@ class TestApi(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
     def test_delete_cliente(self):
-        """Test if DELETE is returning 204 and data is deleted."""
+        """Test if DELETE removes the row and its children and counts them."""
         response = self.client.delete(
             self.cliente_detail, format="json", headers=self.headerInfo
         )
 
-        self.assertFalse(response.data)
-        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["deleted"]["core.Cliente"], 1)
+        self.assertEqual(response.data["deleted"]["core.Projeto"], 1)
+        self.assertEqual(response.data["deleted"]["core.Atividade"], 1)
+        self.assertFalse(Cliente.objects.filter(pk=self.cliente1.pk).exists())
+
+    def test_delete_cliente_evicts_cached_children(self):
+        """Test if DELETE evicts the cached details of the rows it cascades to."""
+        response = self.client.get(self.atividade_detail, format="json")
+        self.assertEqual(response["X-Cache"], "MISS")
+        response = self.client.get(self.atividade_detail, format="json")
+        self.assertEqual(response["X-Cache"], "HIT")
+
+        self.client.delete(self.cliente_detail, format="json", headers=self.headerInfo)
+        response = self.client.get(self.atividade_detail, format="json")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
     # --- Projeto ---
     def test_get_projeto(self):
@@ -147,13 +194,22 @@ class TestApi(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
     def test_delete_projeto(self):
-        """Test if DELETE is returning 204 and data is deleted."""
+        """Test if DELETE removes the row and its children and counts them."""
         response = self.client.delete(
             self.projeto_detail, format="json", headers=self.headerInfo
         )
 
-        self.assertFalse(response.data)
-        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["deleted"]["core.Projeto"], 1)
+        self.assertEqual(response.data["deleted"]["core.Atividade"], 1)
+        self.assertEqual(
+            ClienteStats.objects.get(pk=self.cliente1.pk).total_projetos, 0
+        )
+
+        response = self.client.delete(
+            self.projeto_detail, format="json", headers=self.headerInfo
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
     # --- Atividade ---
     def test_get_atividade(self):
@@ -186,10 +242,661 @@ class TestApi(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
     def test_delete_atividade(self):
-        """Test if DELETE is returning 204 and data is deleted."""
+        """Test if DELETE removes the row and its children and counts them."""
         response = self.client.delete(
             self.atividade_detail, format="json", headers=self.headerInfo
         )
 
-        self.assertFalse(response.data)
-        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["deleted"]["core.Atividade"], 1)
+        self.assertEqual(
+            ProjetoStats.objects.get(pk=self.projeto1.pk).total_atividades, 0
+        )
+
+    # --- Pagination and streaming ---
+    def test_list_is_keyset_paginated(self):
+        """Test if GET list pages through rows with a cursor"""
+        for i in range(3):
+            Cliente.objects.create(nome=f"page{i}", email=f"page{i}@email.com")
+        response = self.client.get(self.cliente_list, {"page_size": 2}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNotNone(response.data["next"])
+
+        response = self.client.get(response.data["next"], format="json")
+        self.assertEqual(
+            [row["nome"] for row in response.data["results"]], ["page1", "page2"]
+        )
+        self.assertIsNone(response.data["next"])
+
+    def test_list_streams_ndjson(self):
+        """Test if GET list with stream=ndjson yields one JSON row per line"""
+        Atividade.objects.create(
+            projeto=self.projeto1, descricao="Outra", prazo=date(2025, 1, 31)
+        )
+        response = self.client.get(self.atividade_list, {"stream": "ndjson"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [row["descricao"] for row in rows], ["Primeira Atividade", "Outra"]
+        )
+        self.assertEqual(rows[1]["prazo"], "2025-01-31")
+
+    # --- Bulk ---
+    def test_bulk_create_atividades(self):
+        """Test if POST bulk creates every row with a single FK lookup"""
+        url = reverse("core:atividades-bulk-create")
+        data = [
+            {
+                "projeto": self.projeto1.id,
+                "descricao": f"bulk{i}",
+                "prazo": "2025-01-31",
+            }
+            for i in range(5)
+        ]
+        with self.assertNumQueries(7):
+            # FK lookup, savepoint, INSERT, 3 to recount the projeto stats,
+            # release savepoint
+            response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(
+            Atividade.objects.filter(descricao__startswith="bulk").count(), 5
+        )
+
+    def test_bulk_create_rejects_unknown_projeto(self):
+        """Test if POST bulk validates every row before writing"""
+        url = reverse("core:atividades-bulk-create")
+        data = [
+            {"projeto": self.projeto1.id, "descricao": "ok", "prazo": "2025-01-31"},
+            {"projeto": 999, "descricao": "bad", "prazo": "2025-01-31"},
+        ]
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("projeto", response.data[1])
+        self.assertFalse(Atividade.objects.filter(descricao="ok").exists())
+
+    def test_bulk_update_and_delete_projetos(self):
+        """Test if PATCH and DELETE bulk update and remove the given rows"""
+        url = reverse("core:projetos-bulk-create")
+        projeto2 = Projeto.objects.create(nome="projeto2", cliente=self.cliente1)
+        data = [
+            {"id": self.projeto1.id, "status": "concluido"},
+            {"id": projeto2.id, "nome": "projeto2 UPDATED"},
+        ]
+        response = self.client.patch(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.projeto1.refresh_from_db()
+        projeto2.refresh_from_db()
+        self.assertEqual(self.projeto1.status, "concluido")
+        self.assertEqual(projeto2.nome, "projeto2 UPDATED")
+        # the rows returned carry the versions stored by the UPDATE
+        detail = self.client.get(self.projeto_detail, format="json")
+        self.assertEqual(response.data[0]["version"], 2)
+        self.assertEqual(response.data[0]["updated_at"], detail.data["updated_at"])
+        response = self.client.patch(
+            self.projeto_detail,
+            {"nome": "renomeado"},
+            format="json",
+            HTTP_IF_MATCH=detail["ETag"],
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.delete(
+            url, {"ids": [self.projeto1.id, projeto2.id]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["deleted"]["core.Projeto"], 2)
+        self.assertEqual(response.data["deleted"]["core.Atividade"], 1)
+
+    # --- Fast read serializers ---
+    def test_fast_serializer_matches_model_serializer(self):
+        """Test if list rows rendered from .values() match the ModelSerializer"""
+        for serializer_class in (
+            ClienteModelSerializer,
+            ProjetoModelSerializer,
+            AtividadeModelSerializer,
+        ):
+            fast = get_fast_serializer(serializer_class)
+            queryset = serializer_class.Meta.model.objects.order_by("pk")
+            self.assertEqual(
+                fast.many(fast.values(queryset)),
+                serializer_class(queryset, many=True).data,
+            )
+
+    def test_list_is_rendered_with_orjson(self):
+        """Test if JSON responses are encoded by orjson"""
+        with patch("core.api.renderers.orjson.dumps", wraps=orjson.dumps) as dumps:
+            response = self.client.get(self.projeto_list, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        dumps.assert_called_once()
+        self.assertEqual(json.loads(response.content), response.data)
+
+    # --- Response cache ---
+    def test_retrieve_is_cached_until_the_row_changes(self):
+        """Test if GET detail is served from cache and evicted on update"""
+        response = self.client.get(self.projeto_detail, format="json")
+        self.assertEqual(response["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            response = self.client.get(self.projeto_detail, format="json")
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(response.data["nome"], "projeto1")
+
+        self.projeto1.nome = "projeto1 UPDATED"
+        self.projeto1.save()
+        response = self.client.get(self.projeto_detail, format="json")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["nome"], "projeto1 UPDATED")
+
+    def test_list_cache_is_evicted_by_bulk_create(self):
+        """Test if writes without model signals still evict cached lists"""
+        self.client.get(self.atividade_list, format="json")
+        response = self.client.get(self.atividade_list, format="json")
+        self.assertEqual(response["X-Cache"], "HIT")
+
+        data = [
+            {"projeto": self.projeto1.id, "descricao": "bulk", "prazo": "2025-01-31"}
+        ]
+        self.client.post(reverse("core:atividades-bulk-create"), data, format="json")
+        response = self.client.get(self.atividade_list, format="json")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(len(response.data["results"]), 2)
+
+    # --- Filters ---
+    def test_filter_projetos_by_status_and_cliente(self):
+        """Test if GET list filters projetos on the server"""
+        cliente2 = Cliente.objects.create(nome="cliente2", email="c2@email.com")
+        Projeto.objects.create(nome="pausado", cliente=self.cliente1, status="pausado")
+        Projeto.objects.create(nome="outro", cliente=cliente2, status="pausado")
+
+        response = self.client.get(
+            self.projeto_list, {"status": "pausado", "cliente": self.cliente1.id}
+        )
+        self.assertEqual([row["nome"] for row in response.data["results"]], ["pausado"])
+        response = self.client.get(
+            self.projeto_list,
+            {"status__in": "pausado,em_andamento", "ordering": "-nome"},
+        )
+        self.assertEqual(
+            [row["nome"] for row in response.data["results"]],
+            ["projeto1", "pausado", "outro"],
+        )
+        response = self.client.get(self.projeto_list, {"status": "cancelado"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("status", response.data)
+
+    def test_filter_atividades_by_prazo_range(self):
+        """Test if GET list filters atividades by a prazo range"""
+        for day in (10, 20, 30):
+            Atividade.objects.create(
+                projeto=self.projeto1, descricao=f"dia{day}", prazo=date(2025, 1, day)
+            )
+        response = self.client.get(
+            self.atividade_list,
+            {
+                "prazo__gte": "2025-01-15",
+                "prazo__lte": "2025-01-31",
+                "ordering": "-prazo",
+            },
+        )
+        self.assertEqual(
+            [row["descricao"] for row in response.data["results"]], ["dia30", "dia20"]
+        )
+        response = self.client.get(self.atividade_list, {"prazo__gte": "amanha"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_and_ordering_whitelist(self):
+        """Test if search matches nome or descricao and ordering is whitelisted"""
+        Projeto.objects.create(
+            nome="Portal", descricao="site do CLIENTE", cliente=self.cliente1
+        )
+        response = self.client.get(self.projeto_list, {"search": "cliente"})
+        self.assertEqual([row["nome"] for row in response.data["results"]], ["Portal"])
+        response = self.client.get(self.projeto_list, {"search": "projeto"})
+        self.assertEqual(
+            [row["nome"] for row in response.data["results"]], ["projeto1"]
+        )
+        # descricao is not an ordering field, so the default order is kept
+        response = self.client.get(self.projeto_list, {"ordering": "-descricao"})
+        self.assertEqual(
+            [row["nome"] for row in response.data["results"]], ["projeto1", "Portal"]
+        )
+
+    def test_ordering_by_a_shared_value_pages_every_row(self):
+        """Test if pages ordered by a non-unique field neither skip nor repeat"""
+        for nome in ("b", "c", "d", "e"):
+            Projeto.objects.create(nome=nome, cliente=self.cliente1)
+        ids, url = [], self.projeto_list
+        params = {"ordering": "-status", "page_size": 2}
+        while url:
+            response = self.client.get(url, params)
+            ids.extend(row["id"] for row in response.data["results"])
+            url, params = response.data["next"], None
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(ids), 5)
+
+    def test_full_text_search(self):
+        """Test if ?q= matches every word, ignoring case and accents"""
+        Atividade.objects.create(
+            projeto=self.projeto1, descricao="Revisar o orçamento", prazo=date.today()
+        )
+        Atividade.objects.create(
+            projeto=self.projeto1, descricao="Enviar orçamento", prazo=date.today()
+        )
+        response = self.client.get(self.atividade_list, {"q": "ORCAMENTO revisar"})
+        self.assertEqual(
+            [row["descricao"] for row in response.data["results"]],
+            ["Revisar o orçamento"],
+        )
+
+    # --- Stats ---
+    def test_cliente_stats_follow_projeto_writes(self):
+        """Test if the cliente stats are kept up to date by the signals"""
+        url = reverse("core:cliente-stats-detail", args=[self.cliente1.id])
+        projeto2 = Projeto.objects.create(
+            nome="projeto2", cliente=self.cliente1, status="pausado"
+        )
+        with self.assertNumQueries(1):
+            response = self.client.get(url, format="json")
+        self.assertEqual(
+            response.data,
+            {
+                "cliente": self.cliente1.id,
+                "total_projetos": 2,
+                "em_andamento": 1,
+                "concluido": 0,
+                "pausado": 1,
+            },
+        )
+
+        # saving no counted field neither reads the row nor touches the stats
+        projeto2.nome = "renomeado"
+        with self.assertNumQueries(1):
+            projeto2.save(update_fields=["nome"])
+
+        projeto2.status = "concluido"
+        projeto2.save()
+        self.projeto1.delete()
+        response = self.client.get(url, format="json")
+        self.assertEqual(response.data["total_projetos"], 1)
+        self.assertEqual(response.data["em_andamento"], 0)
+        self.assertEqual(response.data["concluido"], 1)
+        self.assertEqual(response.data["pausado"], 0)
+
+    def test_projeto_stats_count_overdue_atividades(self):
+        """Test if the projeto stats count atividades past their prazo"""
+        today = timezone.localdate()
+        url = reverse("core:projeto-stats-detail", args=[self.projeto1.id])
+        Atividade.objects.create(
+            projeto=self.projeto1, descricao="futura", prazo=today + timedelta(1)
+        )
+        data = [
+            {
+                "projeto": self.projeto1.id,
+                "descricao": "bulk",
+                "prazo": str(today - timedelta(1)),
+            }
+        ]
+        self.client.post(reverse("core:atividades-bulk-create"), data, format="json")
+        response = self.client.get(url, format="json")
+        self.assertEqual(response.data["total_atividades"], 3)
+        self.assertEqual(response.data["atividades_atrasadas"], 2)
+
+        # counted yesterday, so recounted on read
+        ProjetoStats.objects.update(
+            data_referencia=today - timedelta(1), atividades_atrasadas=0
+        )
+        response = self.client.get(reverse("core:projeto-stats-list"), format="json")
+        self.assertEqual(response.data["results"][0]["atividades_atrasadas"], 2)
+        self.assertEqual(response.data["results"][0]["data_referencia"], str(today))
+
+    def test_import_data_command(self):
+        """Test if import_data loads valid rows and reports the rejected ones"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "projetos.csv")
+            rejects = os.path.join(tmp, "rejects.ndjson")
+            with open(path, "w", newline="") as f:
+                f.write(
+                    "nome,descricao,cliente,cliente_email,status\n"
+                    f"by id,,{self.cliente1.id},,concluido\n"
+                    "by email,,,cliente1@email.com,pausado\n"
+                    "unknown cliente,,9999,,pausado\n"
+                    f"bad status,,{self.cliente1.id},,parado\n"
+                )
+            out = io.StringIO()
+            call_command(
+                "import_data",
+                "projetos",
+                path,
+                rejects=rejects,
+                batch_size=2,
+                stdout=out,
+            )
+            with open(rejects) as f:
+                rejected = [json.loads(line) for line in f]
+        self.assertIn("Imported 2 projetos", out.getvalue())
+        self.assertIn("2 rejected", out.getvalue())
+        self.assertEqual([r["line"] for r in rejected], [4, 5])
+        self.assertIn("cliente", rejected[0]["errors"])
+        self.assertIn("status", rejected[1]["errors"])
+        self.assertEqual(
+            set(Projeto.objects.values_list("nome", flat=True)),
+            {"projeto1", "by id", "by email"},
+        )
+
+        # the stats are recounted, as the rows are written in bulk
+        response = self.client.get(
+            reverse("core:cliente-stats-detail", args=[self.cliente1.id]),
+            format="json",
+        )
+        self.assertEqual(response.data["total_projetos"], 3)
+        self.assertEqual(response.data["concluido"], 1)
+
+    def test_export_streams_the_project_graph(self):
+        """Test if the export nests the graph in NDJSON and flattens it in CSV"""
+        Cliente.objects.create(nome="sem projetos", email="vazio@email.com")
+        Projeto.objects.create(nome="sem atividades", cliente=self.cliente1)
+        url = reverse("core:export")
+
+        response = self.client.get(url)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        clientes = [json.loads(line) for line in lines]
+        self.assertEqual(len(clientes), 2)
+        self.assertEqual(
+            [p["nome"] for p in clientes[0]["projetos"]],
+            ["projeto1", "sem atividades"],
+        )
+        atividades = clientes[0]["projetos"][0]["atividades"]
+        self.assertEqual(atividades[0]["descricao"], "Primeira Atividade")
+        self.assertEqual(atividades[0]["prazo"], "2024-12-31")
+        self.assertEqual(clientes[0]["projetos"][1]["atividades"], [])
+        self.assertEqual(clientes[1]["projetos"], [])
+
+        response = self.client.get(url, {"format": "csv", "gzip": "1"})
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        content = gzip.decompress(b"".join(response.streaming_content)).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["atividade_descricao"], "Primeira Atividade")
+        self.assertEqual(rows[1]["projeto_nome"], "sem atividades")
+        self.assertEqual(rows[1]["atividade_id"], "")
+
+        response = self.client.get(url, {"format": "xml"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_jobs_run_off_the_request(self):
+        """Test if jobs are queued with 202 and run by the run_jobs worker"""
+        url = reverse("core:jobs-list")
+        upload = io.BytesIO(
+            f"nome,cliente,status\nimportado,{self.cliente1.id},pausado\n"
+            f"rejeitado,{self.cliente1.id},parado\n".encode()
+        )
+        upload.name = "projetos.csv"
+        with tempfile.TemporaryDirectory() as tmp, override_settings(JOBS_DIR=tmp):
+            responses = [
+                self.client.post(
+                    url,
+                    {"kind": "import", "model": "projetos", "file": upload},
+                    format="multipart",
+                ),
+                self.client.post(
+                    url, {"kind": "export", "format": "csv"}, format="json"
+                ),
+                self.client.post(
+                    url,
+                    {
+                        "kind": "delete",
+                        "model": "atividades",
+                        "ids": [self.atividade1.id],
+                    },
+                    format="json",
+                ),
+            ]
+            for response in responses:
+                self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+                self.assertEqual(response.data["status"], "pendente")
+            # nothing ran in the requests
+            self.assertFalse(Projeto.objects.filter(nome="importado").exists())
+            self.assertTrue(Atividade.objects.filter(pk=self.atividade1.id).exists())
+
+            out = io.StringIO()
+            call_command("run_jobs", processes=0, once=True, stdout=out)
+            self.assertEqual(out.getvalue().count("concluido"), 3)
+
+            jobs = [
+                self.client.get(reverse("core:jobs-detail", args=[r.data["id"]])).data
+                for r in responses
+            ]
+            self.assertEqual(jobs[0]["result"]["imported"], 1)
+            self.assertEqual(jobs[0]["result"]["rejected"], 1)
+            self.assertEqual(jobs[0]["processed"], 2)
+            self.assertTrue(Projeto.objects.filter(nome="importado").exists())
+            self.assertEqual(jobs[1]["processed"], jobs[1]["total"])
+            self.assertEqual(jobs[2]["result"]["deleted"]["core.Atividade"], 1)
+            self.assertFalse(Atividade.objects.filter(pk=self.atividade1.id).exists())
+
+            response = self.client.get(
+                reverse("core:jobs-download", args=[jobs[1]["id"]])
+            )
+            content = b"".join(response.streaming_content).decode()
+            self.assertTrue(content.startswith("cliente_id,"))
+            self.assertIn("importado", content)
+
+        response = self.client.post(url, {"kind": "delete"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("ids", response.data)
+
+    @override_settings(JOB_LEASE_TIMEOUT=60, JOB_MAX_ATTEMPTS=2)
+    def test_jobs_of_a_stopped_worker_are_claimed_again(self):
+        """Test if running jobs without a recent heartbeat are run again"""
+        job = enqueue("delete", model="atividades", ids=[self.atividade1.id])
+        self.assertEqual(claim_job(), job.pk)
+        # the lease is renewed, the job is not claimed twice
+        self.assertIsNone(claim_job())
+
+        # the worker was killed a lease ago
+        stale = timezone.now() - timedelta(seconds=61)
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=stale)
+        out = io.StringIO()
+        call_command("run_jobs", processes=0, once=True, stdout=out)
+        self.assertIn(f"Job {job.pk}: concluido", out.getvalue())
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+        self.assertFalse(Atividade.objects.filter(pk=self.atividade1.id).exists())
+
+        # and failed once it ran JOB_MAX_ATTEMPTS times
+        Job.objects.filter(pk=job.pk).update(status="executando", heartbeat_at=stale)
+        self.assertIsNone(claim_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, "falhou")
+        self.assertEqual(job.error, "The worker running the job stopped 2 times.")
+
+    def test_change_feed_follows_writes(self):
+        """Test if the change feed lists the writes after a cursor in order"""
+        url = reverse("core:changes")
+        cursor = self.client.get(url).data["cursor"]
+        projeto2 = Projeto.objects.create(nome="projeto2", cliente=self.cliente1)
+        Atividade.objects.bulk_create(
+            [Atividade(projeto=projeto2, descricao="nova", prazo=date(2025, 1, 31))]
+        )
+        Atividade.objects.filter(pk=self.atividade1.id).update(projeto=projeto2)
+        self.client.delete(self.projeto_detail)
+
+        response = self.client.get(url, {"cursor": cursor, "model": "atividade"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        changes = [
+            (row["action"], row["object_id"], row["parent_id"])
+            for row in response.data["results"]
+        ]
+        nova = Atividade.objects.get(descricao="nova").id
+        self.assertCountEqual(
+            changes,
+            [
+                ("create", nova, projeto2.id),
+                ("update", self.atividade1.id, projeto2.id),
+                # the moved atividade leaves the list of its old projeto
+                ("update", self.atividade1.id, self.projeto1.id),
+            ],
+        )
+        self.assertEqual(response.data["results"][0]["data"]["descricao"], "nova")
+
+        response = self.client.get(
+            url, {"cursor": cursor, "model": "projeto", "limit": 1}
+        )
+        self.assertTrue(response.data["has_more"])
+        response = self.client.get(
+            url, {"cursor": response.data["cursor"], "model": "projeto"}
+        )
+        self.assertEqual(response.data["results"][0]["action"], "delete")
+        self.assertIsNone(response.data["results"][0]["data"])
+        self.assertFalse(response.data["has_more"])
+
+        call_command("prune_changes", days=0, stdout=io.StringIO())
+        response = self.client.get(url, {"cursor": cursor})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+    def test_change_feed_follows_commit_order(self):
+        """Test if an entry committed late is not skipped by the cursor"""
+        cursor = get_changes().cursor
+        # the transaction 100 logs first and commits after the 99 one
+        late = Change.objects.create(
+            model="core.cliente",
+            object_id=self.cliente1.id,
+            action="update",
+            changed_at=timezone.now(),
+            txid=100,
+        )
+        early = Change.objects.create(
+            model="core.cliente",
+            object_id=self.cliente1.id,
+            action="update",
+            changed_at=timezone.now(),
+            txid=99,
+        )
+        with patch("core.changes.get_txid_horizon", return_value=Value(100)):
+            feed = get_changes(cursor)
+        self.assertEqual([change.pk for change in feed.changes], [early.pk])
+        with patch("core.changes.get_txid_horizon", return_value=Value(101)):
+            feed = get_changes(feed.cursor)
+        self.assertEqual([change.pk for change in feed.changes], [late.pk])
+
+    def test_conditional_requests(self):
+        """Test if ETags answer 304 without loading the row and guard writes"""
+        response = self.client.get(self.projeto_detail)
+        etag = response["ETag"]
+        self.assertEqual(response.data["version"], 1)
+        self.assertIn("Last-Modified", response)
+
+        # one query reading the version, no serialization
+        with self.assertNumQueries(1):
+            response = self.client.get(self.projeto_detail, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        response = self.client.get(
+            self.projeto_detail, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        data = {"nome": "renomeado", "cliente": self.cliente1.id}
+        response = self.client.put(
+            self.projeto_detail, data, format="json", HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["version"], 2)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(
+            self.client.get(self.projeto_detail, HTTP_IF_NONE_MATCH=etag).status_code,
+            status.HTTP_200_OK,
+        )
+
+        # a stale copy can neither be written nor deleted
+        response = self.client.patch(
+            self.projeto_detail, {"nome": "x"}, format="json", HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        response = self.client.delete(self.projeto_detail, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.projeto1.refresh_from_db()
+        self.assertEqual(self.projeto1.nome, "renomeado")
+
+        # bulk writes bump the version too
+        Projeto.objects.bulk_update([self.projeto1], ["status"])
+        self.assertEqual(Projeto.objects.get(pk=self.projeto1.id).version, 3)
+
+    @override_settings(PROFILING=True)
+    def test_profiling_headers_and_metrics(self):
+        """Test if profiled requests send Server-Timing and feed /metrics"""
+        metrics.clear()
+        response = self.client.get(self.cliente_detail)
+        self.assertRegex(
+            response["Server-Timing"],
+            r'total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries"',
+        )
+        body = self.client.get("/metrics").content.decode()
+        self.assertIn(
+            'core_http_requests_total{method="GET",status="200",'
+            'view="core:clientes-detail"} 1.0',
+            body,
+        )
+        self.assertIn("# TYPE core_db_queries_total counter", body)
+
+    # --- Async views ---
+    async def test_async_list_and_detail(self):
+        """Test if the async views return the same rows as the REST API"""
+        for nome in ("cliente2", "cliente3"):
+            await Cliente.objects.acreate(nome=nome, email=f"{nome}@email.com")
+        response = await self.async_client.get("/api/async/clientes/?page_size=2")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        page = response.json()
+        self.assertEqual(len(page["results"]), 2)
+        self.assertEqual(page["results"][0]["nome"], "cliente1")
+
+        response = await self.async_client.get(page["next"])
+        page = response.json()
+        self.assertEqual([row["nome"] for row in page["results"]], ["cliente3"])
+        self.assertIsNone(page["next"])
+
+        response = await self.async_client.get(
+            f"/api/async/projetos/{self.projeto1.id}/"
+        )
+        self.assertEqual(response.json(), ProjetoModelSerializer(self.projeto1).data)
+        response = await self.async_client.get("/api/async/projetos/999/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@skipUnless(connection.vendor == "postgresql", "needs concurrent transactions")
+class TestChangeFeedTransactions(TransactionTestCase):
+    """
+    Django TransactionTestCase.
+
+    Writes from two connections, one transaction committing while the
+    other is still running.
+    """
+
+    def test_feed_waits_for_running_transactions(self):
+        """Test if the entries of a running transaction are not skipped"""
+        cursor = get_changes().cursor
+        other = connections.create_connection(DEFAULT_DB_ALIAS)
+        try:
+            other.set_autocommit(False)
+            with other.cursor() as c:
+                # takes its transaction id before the next write
+                c.execute("SELECT txid_current()")
+            Cliente.objects.create(nome="primeiro", email="primeiro@email.com")
+            with other.cursor() as c:
+                c.execute(
+                    "INSERT INTO core_cliente (nome, email, version, updated_at) "
+                    "VALUES ('segundo', 'segundo@email.com', 1, now())"
+                )
+            self.assertEqual(get_changes(cursor).changes, [])
+            other.commit()
+        finally:
+            other.close()
+        feed = get_changes(cursor)
+        nomes = Cliente.objects.in_bulk([c.object_id for c in feed.changes])
+        self.assertEqual(
+            [nomes[c.object_id].nome for c in feed.changes], ["segundo", "primeiro"]
+        )
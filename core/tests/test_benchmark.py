@@ -0,0 +1,80 @@
+import io
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from core.benchmark import SCENARIOS, Scenario, run_suite, seed
+from core.models import Cliente, Projeto, Atividade, ClienteStats
+
+
+class TestBenchmark(TransactionTestCase):
+    """
+    Django TransactionTestCase.
+
+    Runs the benchmark suite on a small generated dataset, so a change
+    adding queries to a request (an N+1) fails here. Requests run in
+    autocommit, as in production.
+    """
+
+    def test_seed_generates_the_requested_scale(self):
+        """Test if seed adds clientes x projetos x atividades rows"""
+        counts = seed(3, 2, 4, batch_size=10)
+        self.assertEqual(counts, {Cliente: 3, Projeto: 6, Atividade: 24})
+        self.assertEqual(Atividade.objects.count(), 24)
+        self.assertEqual(
+            sum(ClienteStats.objects.values_list("total_projetos", flat=True)), 6
+        )
+
+    def test_query_counts_stay_within_budget(self):
+        """Test if no scenario of the suite runs more queries than its budget"""
+        seed(5, 3, 3)
+        results = run_suite(requests=3, warmup=1)
+        for result in results:
+            with self.subTest(result.scenario.name):
+                self.assertLessEqual(
+                    result.max_queries, result.scenario.max_queries, result.queries
+                )
+        # the rows created by the scenarios are removed
+        self.assertEqual(Atividade.objects.count(), 45)
+
+    def test_rows_of_other_clients_are_kept(self):
+        """Test if the suite deletes only the atividades it created"""
+        seed(2, 2, 2)
+
+        def other_client(sample):
+            # another client writes while the suite runs
+            Atividade.objects.create(
+                projeto=sample.projeto, descricao="outra", prazo=sample.prazo
+            )
+            return "get", reverse("core:projetos-list"), {}
+
+        scenarios = [*SCENARIOS, Scenario("other client", other_client, 1)]
+        run_suite(requests=2, warmup=1, scenarios=scenarios)
+        self.assertEqual(Atividade.objects.filter(descricao="outra").count(), 3)
+        self.assertEqual(Atividade.objects.count(), 11)
+
+    def test_suite_samples_the_rows_left(self):
+        """Test if the suite runs over sparse ids and fails clearly without rows"""
+        with self.assertRaisesMessage(CommandError, "run seed_benchmark first"):
+            call_command("benchmark", requests=1, warmup=0, stdout=io.StringIO())
+
+        seed(1, 1, 1)
+        # a single row, with an id far from the others
+        atividade = Atividade.objects.get()
+        Atividade.objects.create(
+            pk=10**6, projeto=atividade.projeto, prazo=atividade.prazo, descricao="x"
+        )
+        atividade.delete()
+        results = run_suite(requests=1, warmup=0)
+        self.assertEqual(len(results), len(SCENARIOS))
+
+    def test_bench_connections_runs(self):
+        """Test if bench_connections reports both connection modes"""
+        stdout = io.StringIO()
+        call_command("bench_connections", requests=4, concurrency=2, stdout=stdout)
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith("new connection per request: "))
+        self.assertTrue(lines[1].startswith("persistent connections: "))
@@ -1,8 +1,23 @@
+import asyncio
+import hashlib
+import io
 import json
+import tempfile
 from datetime import datetime, date
+from unittest.mock import patch
+from asgiref.sync import sync_to_async
+from graphql import parse
+from core.changes import get_changes
+from core.graphql.documents import document_cache
+from core.graphql.validation import estimate_rows
 from core.models import Cliente, Projeto, Atividade
 from core.graphql.schema import schema
-from django.test import TestCase
+from core.graphql.subscriptions import ChangeWatcher
+from core.graphql.websocket import GraphQLWebSocketApp
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.core.exceptions import ObjectDoesNotExist
 
 
@@ -16,6 +31,7 @@ class TestGraphql(TestCase):
 
     def setUp(self):
         """Initial data"""
+        cache.clear()
         self.url = "/api/graphql/"
         self.content_type = "application/json"
         self.cliente1 = Cliente(
@@ -32,6 +48,10 @@ class TestGraphql(TestCase):
             prazo=date(2024, 12, 31),
         )
         self.atividade1.save()
+        # row estimates of the cost rule are cached, so query counts
+        # below only cover execution
+        for model in (Cliente, Projeto, Atividade):
+            estimate_rows(model)
 
     def get_object_or_none(self, model_class, **kwargs):
         # Checks if a specific object exists or returns None
@@ -45,10 +65,14 @@ class TestGraphql(TestCase):
         query = """
             query {
                 allClientes  {
-                    id
-                    nome
-                    email
-                    telefone
+                    edges {
+                        node {
+                            id
+                            nome
+                            email
+                            telefone
+                        }
+                    }
                 }
             }
         """
@@ -59,9 +83,16 @@ class TestGraphql(TestCase):
         )
         content = json.loads(response.content)["data"]
         self.assertIsNotNone(content["allClientes"])
-        self.assertEqual(content["allClientes"][0]["nome"], self.cliente1.nome)
-        self.assertEqual(content["allClientes"][0]["email"], self.cliente1.email)
-        self.assertEqual(content["allClientes"][0]["telefone"], self.cliente1.telefone)
+        self.assertEqual(
+            content["allClientes"]["edges"][0]["node"]["nome"], self.cliente1.nome
+        )
+        self.assertEqual(
+            content["allClientes"]["edges"][0]["node"]["email"], self.cliente1.email
+        )
+        self.assertEqual(
+            content["allClientes"]["edges"][0]["node"]["telefone"],
+            self.cliente1.telefone,
+        )
 
     def test_get_cliente_by_id(self):
         # Test if is possible get cliente by id
@@ -117,7 +148,7 @@ class TestGraphql(TestCase):
         )
 
     def test_create_cliente(self):
-        # Test creating a cliente 
+        # Test creating a cliente
         query = """
             mutation {
                 createCliente(input: {
@@ -207,15 +238,19 @@ class TestGraphql(TestCase):
         query = """
             query {
                 allProjetos{
-                    id
-                    nome
-                    descricao
-                    status
-                    atividades {
-                    id
-                    }
-                    cliente{
-                    id
+                    edges {
+                        node {
+                            id
+                            nome
+                            descricao
+                            status
+                            atividades {
+                            id
+                            }
+                            cliente{
+                            id
+                            }
+                        }
                     }
                 }
             }
@@ -227,18 +262,24 @@ class TestGraphql(TestCase):
         )
         content = json.loads(response.content)["data"]
         self.assertIsNotNone(content["allProjetos"])
-        self.assertEqual(content["allProjetos"][0]["nome"], self.projeto1.nome)
         self.assertEqual(
-            content["allProjetos"][0]["descricao"], self.projeto1.descricao
+            content["allProjetos"]["edges"][0]["node"]["nome"], self.projeto1.nome
         )
         self.assertEqual(
-            str.lower(content["allProjetos"][0]["status"]), self.projeto1.status
+            content["allProjetos"]["edges"][0]["node"]["descricao"],
+            self.projeto1.descricao,
         )
         self.assertEqual(
-            content["allProjetos"][0]["cliente"]["id"], str(self.cliente1.id)
+            str.lower(content["allProjetos"]["edges"][0]["node"]["status"]),
+            self.projeto1.status,
         )
         self.assertEqual(
-            content["allProjetos"][0]["atividades"][0]["id"], str(self.atividade1.id)
+            content["allProjetos"]["edges"][0]["node"]["cliente"]["id"],
+            str(self.cliente1.id),
+        )
+        self.assertEqual(
+            content["allProjetos"]["edges"][0]["node"]["atividades"][0]["id"],
+            str(self.atividade1.id),
         )
 
     def test_get_atividades_by_projeto_id(self):
@@ -398,16 +439,20 @@ class TestGraphql(TestCase):
         query = """
             query {
                 allAtividades{
-                    id
-                    descricao
-                    dataCriacao
-                    prazo
-                    projeto {
-                        id
-                        nome
-                        descricao
-                        cliente{
-                            id  
+                    edges {
+                        node {
+                            id
+                            descricao
+                            dataCriacao
+                            prazo
+                            projeto {
+                                id
+                                nome
+                                descricao
+                                cliente{
+                                    id
+                                }
+                            }
                         }
                     }
                 }
@@ -421,14 +466,17 @@ class TestGraphql(TestCase):
         content = json.loads(response.content)["data"]
         self.assertIsNotNone(content["allAtividades"])
         self.assertEqual(
-            content["allAtividades"][0]["descricao"], self.atividade1.descricao
+            content["allAtividades"]["edges"][0]["node"]["descricao"],
+            self.atividade1.descricao,
         )
         self.assertEqual(
-            datetime.fromisoformat(content["allAtividades"][0]["dataCriacao"]),
+            datetime.fromisoformat(
+                content["allAtividades"]["edges"][0]["node"]["dataCriacao"]
+            ),
             self.atividade1.data_criacao,
         )
         self.assertEqual(
-            content["allAtividades"][0]["prazo"],
+            content["allAtividades"]["edges"][0]["node"]["prazo"],
             self.atividade1.prazo.strftime("%Y-%m-%d"),
         )
 
@@ -559,3 +607,933 @@ class TestGraphql(TestCase):
         self.assertEqual(check_deleted_atividade, None)
         self.assertIsNotNone(content["deleteAtividade"])
         self.assertEqual(content["deleteAtividade"]["success"], True)
+
+    def test_nested_relations_are_batched(self):
+        # Test nested relations cost one query per level
+        for i in range(3):
+            cliente = Cliente.objects.create(
+                nome=f"batch{i}", email=f"batch{i}@email.com"
+            )
+            for j in range(2):
+                projeto = Projeto.objects.create(nome=f"p{i}{j}", cliente=cliente)
+                Atividade.objects.create(
+                    projeto=projeto, descricao="batch", prazo=date(2024, 12, 31)
+                )
+        query = """
+            query {
+                allClientes {
+                    edges {
+                        node {
+                            id
+                            projetos {
+                                id
+                                cliente { id }
+                                atividades {
+                                    id
+                                    projeto { id }
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        """
+        with self.assertNumQueries(3):
+            response = self.client.post(
+                self.url,
+                json.dumps({"query": query}),
+                content_type=self.content_type,
+            )
+        content = json.loads(response.content)["data"]
+        clientes = [edge["node"] for edge in content["allClientes"]["edges"]]
+        self.assertEqual(len(clientes), 4)
+        for cliente in clientes:
+            for projeto in cliente["projetos"]:
+                self.assertEqual(projeto["cliente"]["id"], cliente["id"])
+                for atividade in projeto["atividades"]:
+                    self.assertEqual(atividade["projeto"]["id"], projeto["id"])
+
+    def test_aliased_relation_is_prefetched_once(self):
+        # Test if aliases of one relation share a prefetch of their fields
+        query = """
+            query {
+                getCliente(id: %d) {
+                    a: projetos { id }
+                    b: projetos { nome atividades { descricao } }
+                }
+                allClientes {
+                    edges { node { a: projetos { id } b: projetos { nome } } }
+                }
+            }
+        """ % (
+            self.cliente1.id
+        )
+        response = self.client.post(
+            self.url, json.dumps({"query": query}), content_type=self.content_type
+        )
+        content = response.json()
+        self.assertNotIn("errors", content)
+        cliente = content["data"]["getCliente"]
+        self.assertEqual(cliente["a"], [{"id": str(self.projeto1.id)}])
+        self.assertEqual(
+            cliente["b"],
+            [{"nome": "projeto1", "atividades": [{"descricao": "Primeira Atividade"}]}],
+        )
+        node = content["data"]["allClientes"]["edges"][0]["node"]
+        self.assertEqual(node["b"], [{"nome": "projeto1"}])
+
+    def test_all_atividades_selects_only_requested_columns(self):
+        # Test the selection set is turned into a single narrow JOIN
+        query = """
+            query {
+                allAtividades {
+                    edges {
+                        node {
+                            descricao
+                            projeto { nome }
+                        }
+                    }
+                }
+            }
+        """
+        with self.assertNumQueries(1) as captured:
+            response = self.client.post(
+                self.url,
+                json.dumps({"query": query}),
+                content_type=self.content_type,
+            )
+        content = json.loads(response.content)["data"]
+        self.assertEqual(
+            content["allAtividades"]["edges"][0]["node"],
+            {"descricao": "Primeira Atividade", "projeto": {"nome": "projeto1"}},
+        )
+        sql = captured.captured_queries[0]["sql"]
+        self.assertIn("JOIN", sql)
+        self.assertNotIn("prazo", sql)
+        self.assertNotIn('"core_projeto"."descricao"', sql)
+
+    def test_all_clientes_keyset_pagination(self):
+        # Test paging through clientes with first/after cursors
+        for i in range(4):
+            Cliente.objects.create(nome=f"page{i}", email=f"page{i}@email.com")
+        query = """
+            query ($after: String) {
+                allClientes(first: 2, after: $after) {
+                    edges { node { nome } }
+                    pageInfo { endCursor hasNextPage }
+                }
+            }
+        """
+        nomes, after = [], None
+        while True:
+            response = self.client.post(
+                self.url,
+                json.dumps({"query": query, "variables": {"after": after}}),
+                content_type=self.content_type,
+            )
+            page = json.loads(response.content)["data"]["allClientes"]
+            nomes += [edge["node"]["nome"] for edge in page["edges"]]
+            if not page["pageInfo"]["hasNextPage"]:
+                break
+            after = page["pageInfo"]["endCursor"]
+        self.assertEqual(nomes, ["cliente1", "page0", "page1", "page2", "page3"])
+
+    def test_all_clientes_rejects_page_above_max_limit(self):
+        # Test the server enforces the max page size
+        query = """
+            query {
+                allClientes(first: 1000) {
+                    edges { node { id } }
+                }
+            }
+        """
+        response = self.client.post(
+            self.url,
+            json.dumps({"query": query}),
+            content_type=self.content_type,
+        )
+        content = json.loads(response.content)
+        self.assertIsNone(content["data"]["allClientes"])
+        self.assertIn("exceeds the `first` limit", content["errors"][0]["message"])
+
+    def test_bulk_create_atividades(self):
+        # Test creating many atividades in one mutation
+        query = """
+            mutation ($input: [AtividadeInput!]!) {
+                bulkCreateAtividades(input: $input) {
+                    atividades { id descricao }
+                }
+            }
+        """
+        rows = [
+            {
+                "projetoId": self.projeto1.id,
+                "descricao": f"bulk{i}",
+                "prazo": "2025-01-31",
+            }
+            for i in range(5)
+        ]
+        response = self.client.post(
+            self.url,
+            json.dumps({"query": query, "variables": {"input": rows}}),
+            content_type=self.content_type,
+        )
+        content = json.loads(response.content)["data"]
+        self.assertEqual(len(content["bulkCreateAtividades"]["atividades"]), 5)
+        self.assertEqual(
+            Atividade.objects.filter(descricao__startswith="bulk").count(), 5
+        )
+
+    def test_bulk_create_atividades_with_unknown_projeto(self):
+        # Test the batch is rejected when a projeto does not exist
+        query = """
+            mutation ($input: [AtividadeInput!]!) {
+                bulkCreateAtividades(input: $input) {
+                    atividades { id }
+                }
+            }
+        """
+        rows = [
+            {"projetoId": self.projeto1.id, "descricao": "ok", "prazo": "2025-01-31"},
+            {"projetoId": 999, "descricao": "bad", "prazo": "2025-01-31"},
+        ]
+        response = self.client.post(
+            self.url,
+            json.dumps({"query": query, "variables": {"input": rows}}),
+            content_type=self.content_type,
+        )
+        content = json.loads(response.content)
+        self.assertIn("Projeto does not exist: 999", content["errors"][0]["message"])
+        self.assertFalse(Atividade.objects.filter(descricao="ok").exists())
+
+    def test_bulk_update_atividades(self):
+        # Test updating only the given fields of many atividades
+        atividade2 = Atividade.objects.create(
+            projeto=self.projeto1, descricao="Segunda", prazo=date(2024, 12, 31)
+        )
+        query = f"""
+            mutation {{
+                bulkUpdateAtividades(input: [
+                    {{id: {self.atividade1.id}, descricao: "UPDATED"}},
+                    {{id: {atividade2.id}, prazo: "2025-06-30"}}
+                ]) {{
+                    atividades {{ id descricao prazo }}
+                }}
+            }}
+        """
+        response = self.client.post(
+            self.url,
+            json.dumps({"query": query}),
+            content_type=self.content_type,
+        )
+        content = json.loads(response.content)["data"]
+        self.assertEqual(len(content["bulkUpdateAtividades"]["atividades"]), 2)
+        self.atividade1.refresh_from_db()
+        atividade2.refresh_from_db()
+        self.assertEqual(self.atividade1.descricao, "UPDATED")
+        self.assertEqual(self.atividade1.prazo, date(2024, 12, 31))
+        self.assertEqual(atividade2.descricao, "Segunda")
+        self.assertEqual(atividade2.prazo, date(2025, 6, 30))
+
+    def test_projetos_by_cliente_cache_is_evicted_by_new_projeto(self):
+        # Test cached reads are evicted when a child of the cliente is created
+        query = f"""
+            query {{
+                getProjetosByClienteId(clienteId: {self.cliente1.id}) {{
+                    nome
+                    atividades {{ descricao }}
+                }}
+            }}
+        """
+        body = json.dumps({"query": query})
+        self.client.post(self.url, body, content_type=self.content_type)
+        with self.assertNumQueries(0):
+            response = self.client.post(self.url, body, content_type=self.content_type)
+        content = json.loads(response.content)["data"]
+        self.assertEqual(len(content["getProjetosByClienteId"]), 1)
+
+        Atividade.objects.create(
+            projeto=self.projeto1, descricao="Nova", prazo=date(2025, 1, 31)
+        )
+        response = self.client.post(self.url, body, content_type=self.content_type)
+        content = json.loads(response.content)["data"]
+        self.assertEqual(len(content["getProjetosByClienteId"][0]["atividades"]), 2)
+
+        Projeto.objects.create(nome="projeto2", cliente=self.cliente1)
+        response = self.client.post(self.url, body, content_type=self.content_type)
+        content = json.loads(response.content)["data"]
+        self.assertEqual(len(content["getProjetosByClienteId"]), 2)
+
+    def test_persisted_query(self):
+        # Test a query can be sent by its sha256 once it is registered
+        query = "query { allClientes { edges { node { nome } } } }"
+        extensions = {
+            "persistedQuery": {
+                "version": 1,
+                "sha256Hash": hashlib.sha256(query.encode()).hexdigest(),
+            }
+        }
+        response = self.client.post(
+            self.url,
+            json.dumps({"extensions": extensions}),
+            content_type=self.content_type,
+        )
+        content = json.loads(response.content)
+        self.assertEqual(content["errors"][0]["message"], "PersistedQueryNotFound")
+
+        self.client.post(
+            self.url,
+            json.dumps({"query": query, "extensions": extensions}),
+            content_type=self.content_type,
+        )
+        response = self.client.post(
+            self.url,
+            json.dumps({"extensions": extensions}),
+            content_type=self.content_type,
+        )
+        content = json.loads(response.content)["data"]
+        self.assertEqual(
+            content["allClientes"]["edges"][0]["node"]["nome"], self.cliente1.nome
+        )
+
+        # and as a GET, whose response is cached
+        params = {"extensions": json.dumps(extensions)}
+        response = self.client.get(self.url, params, HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, 200)
+        content = json.loads(response.content)["data"]
+        self.assertEqual(
+            content["allClientes"]["edges"][0]["node"]["nome"], self.cliente1.nome
+        )
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, params, HTTP_ACCEPT="application/json")
+        self.assertEqual(json.loads(response.content)["data"], content)
+
+    def test_persisted_query_with_wrong_hash(self):
+        # Test a query is not registered under a hash that does not match it
+        extensions = {"persistedQuery": {"version": 1, "sha256Hash": "0" * 64}}
+        response = self.client.post(
+            self.url,
+            json.dumps(
+                {
+                    "query": "query { allClientes { edges { cursor } } }",
+                    "extensions": extensions,
+                }
+            ),
+            content_type=self.content_type,
+        )
+        content = json.loads(response.content)
+        self.assertEqual(
+            content["errors"][0]["message"], "provided sha does not match query"
+        )
+
+    def test_documents_are_parsed_once(self):
+        # Test repeated queries skip parse and validate
+        query = "query { allProjetos { edges { node { nome } } } }"
+        document_cache.clear()
+        with patch("core.graphql.documents.parse", wraps=parse) as mocked_parse:
+            for _ in range(3):
+                cache.clear()
+                response = self.client.post(
+                    self.url,
+                    json.dumps({"query": query}),
+                    content_type=self.content_type,
+                )
+                content = json.loads(response.content)["data"]
+                self.assertEqual(len(content["allProjetos"]["edges"]), 1)
+        self.assertEqual(mocked_parse.call_count, 1)
+
+    def test_query_above_max_depth_is_rejected(self):
+        # Test deeply nested queries are rejected before execution
+        query = """
+            query {
+                allClientes {
+                    edges { node {
+                        projetos { cliente { projetos { atividades {
+                            projeto { nome }
+                        } } } }
+                    } }
+                }
+            }
+        """
+        with self.assertNumQueries(0):
+            response = self.client.post(
+                self.url,
+                json.dumps({"query": query}),
+                content_type=self.content_type,
+            )
+        self.assertEqual(response.status_code, 400)
+        content = json.loads(response.content)
+        self.assertEqual(
+            content["errors"][0]["message"],
+            "Query depth of 6 exceeds the maximum depth of 5.",
+        )
+
+    @override_settings(GRAPHQL_MAX_COST=2)
+    def test_query_above_max_cost_is_rejected(self):
+        # Test the estimated rows of a query are checked against the budget
+        document_cache.clear()
+        query = """
+            query {
+                allClientes { edges { node { projetos { atividades { id } } } } }
+            }
+        """
+        response = self.client.post(
+            self.url,
+            json.dumps({"query": query}),
+            content_type=self.content_type,
+        )
+        content = json.loads(response.content)
+        self.assertEqual(
+            content["errors"][0]["message"],
+            "Query cost of 3 exceeds the maximum cost of 2.",
+        )
+
+        query = "query { allClientes { edges { node { projetos { id } } } } }"
+        response = self.client.post(
+            self.url,
+            json.dumps({"query": query}),
+            content_type=self.content_type,
+        )
+        content = json.loads(response.content)
+        self.assertNotIn("errors", content)
+
+    @override_settings(GRAPHQL_MAX_COST=2)
+    def test_query_cost_follows_row_estimates(self):
+        # Test a cached document is checked against the current estimates
+        document_cache.clear()
+        query = "query { allClientes { edges { node { projetos { id } } } } }"
+        response = self.client.post(
+            self.url,
+            json.dumps({"query": query}),
+            content_type=self.content_type,
+        )
+        self.assertNotIn("errors", json.loads(response.content))
+
+        Cliente.objects.create(nome="cliente2", email="cliente2@email.com")
+        cache.clear()
+        response = self.client.post(
+            self.url,
+            json.dumps({"query": query}),
+            content_type=self.content_type,
+        )
+        content = json.loads(response.content)
+        self.assertEqual(
+            content["errors"][0]["message"],
+            "Query cost of 4 exceeds the maximum cost of 2.",
+        )
+
+    def test_cliente_and_projeto_stats(self):
+        # Test the stats summaries of a cliente and a projeto
+        Projeto.objects.create(nome="projeto2", cliente=self.cliente1, status="pausado")
+        query = f"""
+            query {{
+                clienteStats(clienteId: {self.cliente1.id}) {{
+                    cliente {{ nome }} totalProjetos emAndamento pausado
+                }}
+                projetoStats(projetoId: {self.projeto1.id}) {{
+                    totalAtividades atividadesAtrasadas
+                }}
+            }}
+        """
+        response = self.client.post(
+            self.url,
+            json.dumps({"query": query}),
+            content_type=self.content_type,
+        )
+        content = json.loads(response.content)["data"]
+        self.assertEqual(
+            content["clienteStats"],
+            {
+                "cliente": {"nome": "cliente1"},
+                "totalProjetos": 2,
+                "emAndamento": 1,
+                "pausado": 1,
+            },
+        )
+        self.assertEqual(
+            content["projetoStats"], {"totalAtividades": 1, "atividadesAtrasadas": 1}
+        )
+
+    def test_search_ranks_projetos_and_atividades(self):
+        # Test the search field returns ranked matches of both models
+        Projeto.objects.create(
+            nome="Loja virtual", descricao="Loja da marca", cliente=self.cliente1
+        )
+        Atividade.objects.create(
+            projeto=self.projeto1, descricao="Configurar loja", prazo=date(2025, 1, 1)
+        )
+        query = """
+            query {
+                search(text: "loja") {
+                    rank
+                    projeto { nome cliente { nome } }
+                    atividade { descricao }
+                }
+            }
+        """
+        with self.assertNumQueries(5):
+            # one search and one load per model, the projeto clientes
+            response = self.client.post(
+                self.url,
+                json.dumps({"query": query}),
+                content_type=self.content_type,
+            )
+        results = json.loads(response.content)["data"]["search"]
+        self.assertEqual(len(results), 2)
+        self.assertEqual(
+            results[0]["projeto"],
+            {"nome": "Loja virtual", "cliente": {"nome": "cliente1"}},
+        )
+        self.assertIsNone(results[0]["atividade"])
+        self.assertEqual(results[1]["atividade"], {"descricao": "Configurar loja"})
+        self.assertGreater(results[0]["rank"], results[1]["rank"])
+
+    def test_update_writes_only_the_given_fields(self):
+        # Test if an update is a single UPDATE of the given fields
+        self.projeto1.status = "pausado"
+        self.projeto1.save()
+        query = f"""
+            mutation {{
+                updateProjeto(id: {self.projeto1.id}, input: {{
+                    nome: "Renamed", clienteId: {self.cliente1.id}
+                }}) {{
+                    projeto {{ id nome }}
+                }}
+            }}
+        """
+        # the cliente check, as tests run in a transaction where the
+        # constraint is deferred, the stored counted fields and the UPDATE
+        with self.assertNumQueries(3) as captured:
+            response = self.client.post(
+                self.url,
+                json.dumps({"query": query}),
+                content_type=self.content_type,
+            )
+        update = captured.captured_queries[-1]["sql"]
+        self.assertTrue(update.startswith("UPDATE"))
+        self.assertNotIn('"descricao"', update)
+        self.assertEqual(
+            response.json()["data"]["updateProjeto"]["projeto"]["nome"], "Renamed"
+        )
+        self.projeto1.refresh_from_db()
+        self.assertEqual(self.projeto1.status, "pausado")
+        self.assertEqual(self.projeto1.descricao, "Primeiro Projeto")
+
+    @override_settings(PROFILING=True, PROFILING_DUPLICATE_THRESHOLD=2)
+    def test_profiling_times_resolvers_and_logs_repeated_queries(self):
+        # Test if resolvers are timed and a repeated query is logged as N+1
+        query = f"""
+            query {{
+                first: getCliente(id: {self.cliente1.id}) {{ nome }}
+                second: getCliente(id: {self.cliente1.id}) {{ nome }}
+            }}
+        """
+        with self.assertLogs("core.profiling", "WARNING") as logs:
+            response = self.client.post(
+                self.url,
+                json.dumps({"query": query}),
+                content_type=self.content_type,
+            )
+        self.assertIn("Possible N+1: query run 2 times", logs.output[0])
+        self.assertIn("gql-Query.getCliente;dur=", response["Server-Timing"])
+        self.assertIn('desc="2 calls"', response["Server-Timing"])
+
+    async def test_async_view_resolves_nested_relations(self):
+        # Test if the async view returns the same data as the sync one
+        query = """
+            query {
+                allProjetos {
+                    edges { node { nome cliente { nome } atividades { descricao } } }
+                }
+            }
+        """
+        response = await self.async_client.post(
+            "/api/async/graphql/",
+            data=json.dumps({"query": query}),
+            content_type=self.content_type,
+        )
+        self.assertEqual(response.status_code, 200)
+        node = response.json()["data"]["allProjetos"]["edges"][0]["node"]
+        self.assertEqual(
+            node,
+            {
+                "nome": "projeto1",
+                "cliente": {"nome": "cliente1"},
+                "atividades": [{"descricao": "Primeira Atividade"}],
+            },
+        )
+
+    def test_changes_since_cursor(self):
+        # Test if changesSince pages through the changes of one projeto
+        query = """
+            query ($cursor: String) {
+                changesSince(cursor: $cursor, model: "atividade", parentId: %d) {
+                    cursor
+                    changes { action objectId atividade { descricao } }
+                }
+            }
+        """ % (
+            self.projeto1.id
+        )
+
+        def execute(cursor):
+            response = self.client.post(
+                self.url,
+                json.dumps({"query": query, "variables": {"cursor": cursor}}),
+                content_type=self.content_type,
+            )
+            return response.json()["data"]["changesSince"]
+
+        cursor = execute(None)["cursor"]
+        self.assertEqual(execute(cursor)["changes"], [])
+        self.atividade1.descricao = "Alterada"
+        self.atividade1.save()
+        Atividade.objects.filter(pk=self.atividade1.id).delete()
+
+        feed = execute(cursor)
+        self.assertEqual(
+            feed["changes"],
+            [
+                {
+                    "action": "UPDATE",
+                    "objectId": self.atividade1.id,
+                    "atividade": None,
+                },
+                {
+                    "action": "DELETE",
+                    "objectId": self.atividade1.id,
+                    "atividade": None,
+                },
+            ],
+        )
+        self.assertEqual(execute(feed["cursor"])["changes"], [])
+
+
+class TestMutationRoundTrips(TransactionTestCase):
+    """
+    Django TransactionTestCase.
+
+    Mutations run in autocommit here, as in production, where foreign keys
+    are checked by the database constraint instead of a lookup.
+    """
+
+    def setUp(self):
+        """Initial data"""
+        cache.clear()
+        self.url = "/api/graphql/"
+        self.cliente1 = Cliente.objects.create(nome="cliente1", email="c1@email.com")
+        self.projeto1 = Projeto.objects.create(nome="projeto1", cliente=self.cliente1)
+
+    def execute(self, query):
+        response = self.client.post(
+            self.url, json.dumps({"query": query}), content_type="application/json"
+        )
+        return response.json()
+
+    def test_create_does_not_load_the_parent(self):
+        # Test if a create is the INSERT and the stats update only
+        query = f"""
+            mutation {{
+                createAtividade(input: {{
+                    projetoId: {self.projeto1.id}, descricao: "nova", prazo: "2025-01-31"
+                }}) {{
+                    atividade {{ id descricao }}
+                }}
+            }}
+        """
+        with self.assertNumQueries(2):
+            content = self.execute(query)
+        self.assertEqual(
+            content["data"]["createAtividade"]["atividade"]["descricao"], "nova"
+        )
+
+    def test_delete_many_deletes_each_table_once(self):
+        # Test if deleting clientes is one DELETE per table, counted by model
+        cliente2 = Cliente.objects.create(nome="cliente2", email="c2@email.com")
+        projeto2 = Projeto.objects.create(nome="projeto2", cliente=cliente2)
+        for projeto in (self.projeto1, projeto2):
+            Atividade.objects.create(projeto=projeto, descricao="a", prazo="2025-01-31")
+        query = f"""
+            mutation {{
+                deleteManyClientes(ids: [{self.cliente1.id}, {cliente2.id}, 999]) {{
+                    total
+                    deleted {{ model count }}
+                }}
+            }}
+        """
+        # BEGIN, a DELETE for each of the five tables and COMMIT
+        with self.assertNumQueries(7):
+            content = self.execute(query)
+        payload = content["data"]["deleteManyClientes"]
+        deleted = {row["model"]: row["count"] for row in payload["deleted"]}
+        self.assertEqual(payload["total"], 10)
+        self.assertEqual(deleted["core.Cliente"], 2)
+        self.assertEqual(deleted["core.Projeto"], 2)
+        self.assertEqual(deleted["core.Atividade"], 2)
+        self.assertEqual(deleted["core.ProjetoStats"], 2)
+        self.assertFalse(Atividade.objects.exists())
+
+    def test_background_delete_returns_a_job(self):
+        # Test if a background delete is queued and its status can be read
+        query = f"""
+            mutation {{
+                deleteManyClientes(ids: [{self.cliente1.id}], background: true) {{
+                    total
+                    job {{ id status }}
+                }}
+            }}
+        """
+        payload = self.execute(query)["data"]["deleteManyClientes"]
+        self.assertIsNone(payload["total"])
+        self.assertEqual(payload["job"]["status"], "PENDENTE")
+        self.assertTrue(Cliente.objects.filter(pk=self.cliente1.id).exists())
+
+        query = f"""
+            query {{ job(id: {payload["job"]["id"]}) {{ status processed result }} }}
+        """
+        self.assertEqual(self.execute(query)["data"]["job"]["status"], "PENDENTE")
+        call_command("run_jobs", processes=0, once=True, stdout=io.StringIO())
+        # not served from the cache, as the workers do not evict it
+        job = self.execute(query)["data"]["job"]
+        self.assertEqual(job["status"], "CONCLUIDO")
+        self.assertEqual(job["processed"], 1)
+        self.assertEqual(json.loads(job["result"])["deleted"]["core.Projeto"], 1)
+        self.assertFalse(Cliente.objects.filter(pk=self.cliente1.id).exists())
+
+    def test_import_and_export_are_queued(self):
+        # Test if imports and exports are queued as jobs run by run_jobs
+        upload = io.BytesIO(f"nome,cliente\nimportado,{self.cliente1.id}\n".encode())
+        upload.name = "projetos.csv"
+        mutation = """
+            mutation ($model: String!) {
+                importFile(model: $model, file: "rows") { job { id status } }
+            }
+        """
+        with tempfile.TemporaryDirectory() as tmp, override_settings(JOBS_DIR=tmp):
+            response = self.client.post(
+                self.url,
+                {
+                    "query": mutation,
+                    "variables": json.dumps({"model": "projetos"}),
+                    "rows": upload,
+                },
+            )
+            job = response.json()["data"]["importFile"]["job"]
+            self.assertEqual(job["status"], "PENDENTE")
+            query = """
+                mutation { exportFile(format: "csv") { job { id status } } }
+            """
+            self.assertEqual(
+                self.execute(query)["data"]["exportFile"]["job"]["status"], "PENDENTE"
+            )
+            self.assertFalse(Projeto.objects.filter(nome="importado").exists())
+
+            out = io.StringIO()
+            call_command("run_jobs", processes=0, once=True, stdout=out)
+            self.assertEqual(out.getvalue().count("concluido"), 2)
+            self.assertTrue(Projeto.objects.filter(nome="importado").exists())
+
+        errors = self.execute('mutation { exportFile(format: "xml") { job { id } } }')
+        self.assertIn("format", errors["errors"][0]["message"])
+        errors = self.execute(
+            'mutation { importFile(model: "projetos", file: "rows") { job { id } } }'
+        )
+        self.assertEqual(errors["errors"][0]["message"], "No file uploaded as rows.")
+
+    def test_unknown_parent_is_reported(self):
+        # Test if the constraint violation is reported as a missing parent
+        content = self.execute(
+            """
+            mutation {
+                createProjeto(input: {nome: "x", clienteId: 999}) {
+                    projeto { id }
+                }
+            }
+            """
+        )
+        self.assertEqual(
+            content["errors"][0]["message"], "Cliente does not exist: 999."
+        )
+        self.assertFalse(Projeto.objects.filter(nome="x").exists())
+
+        content = self.execute(
+            """
+            mutation {
+                updateCliente(id: 999, input: {nome: "x", email: "x@email.com"}) {
+                    cliente { id }
+                }
+            }
+            """
+        )
+        self.assertEqual(
+            content["errors"][0]["message"], "Cliente does not exist: 999."
+        )
+
+    def test_update_round_trips(self):
+        # Test if an update is the stats read and the UPDATE, plus the two
+        # counter UPDATEs when a counted field changes
+        atividade = Atividade.objects.create(
+            projeto=self.projeto1, descricao="a", prazo=date(2025, 1, 31)
+        )
+        query = """
+            mutation {
+                updateAtividade(id: %d, input: {
+                    projetoId: %d, descricao: "b", prazo: "%s"
+                }) {
+                    atividade { id descricao }
+                }
+            }
+        """
+        with self.assertNumQueries(2):
+            content = self.execute(
+                query % (atividade.id, self.projeto1.id, "2025-01-31")
+            )
+        self.assertEqual(
+            content["data"]["updateAtividade"]["atividade"]["descricao"], "b"
+        )
+        with self.assertNumQueries(4):
+            self.execute(query % (atividade.id, self.projeto1.id, "2025-02-28"))
+        atividade.refresh_from_db()
+        self.assertEqual(atividade.prazo, date(2025, 2, 28))
+
+    def test_missing_row_is_reported_in_a_transaction(self):
+        # Test if an update of a missing id inside atomic() names the row
+        query = """
+            mutation {
+                updateCliente(id: 999, input: {nome: "x", email: "x@email.com"}) {
+                    cliente { id }
+                }
+            }
+        """
+        with transaction.atomic():
+            content = self.execute(query)
+            self.assertEqual(
+                content["errors"][0]["message"], "Cliente does not exist: 999."
+            )
+            # the transaction is still usable
+            self.assertEqual(Cliente.objects.count(), 1)
+
+    def test_other_constraint_errors_are_not_missing_parents(self):
+        # Test if NOT NULL and UNIQUE violations are reported as they are
+        content = self.execute(
+            """
+            mutation {
+                createProjeto(input: {nome: "x", clienteId: %d, descricao: null}) {
+                    projeto { id }
+                }
+            }
+            """
+            % self.cliente1.id
+        )
+        message = content["errors"][0]["message"]
+        self.assertIn("descricao", message)
+        self.assertNotIn("does not exist", message)
+        self.assertFalse(Projeto.objects.filter(nome="x").exists())
+
+        cliente2 = Cliente.objects.create(nome="cliente2", email="c2@email.com")
+        content = self.execute(
+            """
+            mutation {
+                updateCliente(id: %d, input: {nome: "x", email: "c1@email.com"}) {
+                    cliente { id }
+                }
+            }
+            """
+            % cliente2.id
+        )
+        message = content["errors"][0]["message"]
+        self.assertIn("email", message)
+        self.assertNotIn("Invalid Cliente", message)
+        cliente2.refresh_from_db()
+        self.assertEqual(cliente2.email, "c2@email.com")
+
+
+class TestSubscriptions(TransactionTestCase):
+    """
+    Django TransactionTestCase.
+
+    Subscriptions read the database from the threads of the executor,
+    which only see the rows committed by the test.
+    """
+
+    def setUp(self):
+        """Initial data"""
+        self.cliente1 = Cliente.objects.create(nome="cliente1", email="c1@email.com")
+        self.projeto1 = Projeto.objects.create(nome="projeto1", cliente=self.cliente1)
+
+    @override_settings(CHANGE_FEED_POLL_INTERVAL=0.01)
+    async def test_subscription_over_websocket(self):
+        # Test if a subscription pushes the changes made after it started
+        app = GraphQLWebSocketApp(schema)
+        received, sent = asyncio.Queue(), asyncio.Queue()
+        scope = {
+            "type": "websocket",
+            "path": "/api/graphql/",
+            "subprotocols": ["graphql-transport-ws"],
+        }
+        connection = asyncio.ensure_future(app(scope, received.get, sent.put))
+
+        async def send(message):
+            await received.put(
+                {"type": "websocket.receive", "text": json.dumps(message)}
+            )
+
+        async def receive():
+            message = await asyncio.wait_for(sent.get(), 5)
+            return json.loads(message["text"])
+
+        await received.put({"type": "websocket.connect"})
+        self.assertEqual((await sent.get())["subprotocol"], "graphql-transport-ws")
+        await send({"type": "connection_init"})
+        self.assertEqual(await receive(), {"type": "connection_ack"})
+
+        feed = await sync_to_async(get_changes)()
+        query = """
+            subscription ($cursor: String) {
+                changes(cursor: $cursor, model: "projeto") {
+                    changes { action projeto { nome cliente { nome } } }
+                }
+            }
+        """
+        await send(
+            {
+                "type": "subscribe",
+                "id": "1",
+                "payload": {"query": query, "variables": {"cursor": feed.cursor}},
+            }
+        )
+        await Projeto.objects.filter(pk=self.projeto1.id).aupdate(nome="Renomeado")
+        message = await receive()
+        self.assertEqual(message["id"], "1")
+        self.assertEqual(
+            message["payload"]["data"]["changes"]["changes"],
+            [
+                {
+                    "action": "UPDATE",
+                    "projeto": {"nome": "Renomeado", "cliente": {"nome": "cliente1"}},
+                }
+            ],
+        )
+
+        await send({"type": "subscribe", "id": "2", "payload": {"query": "{ x }"}})
+        message = await receive()
+        self.assertEqual((message["type"], message["id"]), ("error", "2"))
+
+        await send({"type": "complete", "id": "1"})
+        await received.put({"type": "websocket.disconnect"})
+        await asyncio.wait_for(connection, 5)
+
+    @override_settings(CHANGE_FEED_POLL_INTERVAL=0.01)
+    async def test_watcher_polls_once_for_all_subscriptions(self):
+        # Test if the subscriptions waiting for the log share its queries
+        watcher = ChangeWatcher()
+        with patch(
+            "core.graphql.subscriptions.get_feed_end", side_effect=[(0, 1), (0, 2)]
+        ) as get_feed_end:
+            ends = await asyncio.gather(
+                watcher.wait((0, 1)), watcher.wait((0, 1)), watcher.wait((0, 0))
+            )
+            await asyncio.wait_for(watcher.task, 5)
+        self.assertEqual(ends, [(0, 2), (0, 2), (0, 1)])
+        self.assertEqual(get_feed_end.call_count, 2)
+        self.assertIsNone(watcher.task)
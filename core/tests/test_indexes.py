@@ -0,0 +1,78 @@
+from datetime import date, timedelta
+
+from django.db import connection
+from django.test import TestCase
+
+from core.models import Cliente, Projeto, Atividade
+
+
+class TestIndexes(TestCase):
+    """
+    Django TestCase.
+
+    Checks with EXPLAIN that the database planner uses the composite and
+    partial indexes for the hot filters at realistic row counts.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """Initial data: 200 clientes, 20k projetos and 40k atividades"""
+        statuses = ["concluido"] * 18 + ["pausado", "em_andamento"]
+        clientes = Cliente.objects.bulk_create(
+            Cliente(nome=f"cliente{i}", email=f"cliente{i}@email.com")
+            for i in range(200)
+        )
+        projetos = Projeto.objects.bulk_create(
+            (
+                Projeto(
+                    nome=f"projeto{i}",
+                    cliente=clientes[i % len(clientes)],
+                    status=statuses[i // len(clientes) % len(statuses)],
+                )
+                for i in range(20000)
+            ),
+            batch_size=2000,
+        )
+        Atividade.objects.bulk_create(
+            (
+                Atividade(
+                    projeto=projetos[i % len(projetos)],
+                    descricao=f"atividade{i}",
+                    prazo=date(2024, 1, 1) + timedelta(days=i % 365),
+                )
+                for i in range(40000)
+            ),
+            batch_size=2000,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        cls.cliente = clientes[0]
+        cls.projeto = projetos[0]
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def test_atividades_by_projeto_ordered_by_prazo(self):
+        """Test if (projeto_id, prazo) serves filter by projeto ordered by prazo"""
+        queryset = Atividade.objects.filter(projeto_id=self.projeto.id).order_by(
+            "prazo"
+        )
+        self.assertUsesIndex(queryset, "atividade_projeto_prazo_idx")
+
+    def test_projetos_by_cliente_and_status(self):
+        """Test if (cliente_id, status) serves filter by cliente and status"""
+        queryset = Projeto.objects.filter(cliente_id=self.cliente.id, status="pausado")
+        self.assertUsesIndex(queryset, "projeto_cliente_status_idx")
+
+    def test_projetos_em_andamento(self):
+        """Test if the partial index serves the projetos em andamento"""
+        queryset = Projeto.objects.filter(status="em_andamento")
+        self.assertUsesIndex(queryset, "projeto_em_andamento_idx")
+
+    def test_atividades_by_prazo_range(self):
+        """Test if the prazo index serves the prazo range filter"""
+        queryset = Atividade.objects.filter(
+            prazo__gte=date(2024, 3, 1), prazo__lte=date(2024, 3, 7)
+        )
+        self.assertUsesIndex(queryset, "atividade_prazo_idx")
@@ -0,0 +1,124 @@
+import os
+import runpy
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.cache import response_cache
+from core.graphql.schema import schema
+from core.graphql.views import CachedGraphQLView
+from core.middleware import ReplicaRoutingMiddleware
+from core.models import Cliente
+from core.routers import pin_to_primary, primary_exempt, routing_context
+from project_management import settings as project_settings
+
+
+def read_alias(request):
+    return HttpResponse(router.db_for_read(Cliente))
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"])
+class TestReplicaRouter(SimpleTestCase):
+    """
+    Django SimpleTestCase.
+
+    Checks where ReplicaRouter sends the reads of a request, without
+    running queries, as the test databases have no replica.
+    """
+
+    def route(self, method, view):
+        """Return the database the view reads from for a request method"""
+        middleware = ReplicaRoutingMiddleware(
+            lambda request: middleware.process_view(request, view, (), {})
+            or view(request)
+        )
+        request = getattr(RequestFactory(), method)("/")
+        return middleware(request).content.decode()
+
+    def test_safe_methods_read_from_replicas(self):
+        """Test if GET reads from a replica and POST from the primary"""
+        self.assertEqual(self.route("get", read_alias), "replica1")
+        self.assertEqual(self.route("post", read_alias), "default")
+        self.assertEqual(self.route("post", primary_exempt(read_alias)), "replica1")
+
+    def test_reads_after_a_write_use_the_primary(self):
+        """Test if a write pins the rest of the request to the primary"""
+
+        def write_then_read(request):
+            router.db_for_write(Cliente)
+            return read_alias(request)
+
+        self.assertEqual(self.route("get", write_then_read), "default")
+        # the next request starts over
+        self.assertEqual(self.route("get", read_alias), "replica1")
+
+    def test_graphql_mutations_use_the_primary(self):
+        """Test if GraphQL queries read from a replica and mutations do not"""
+        view = CachedGraphQLView(schema=schema)
+        request = RequestFactory().post("/")
+        documents = {
+            "{ __typename }": "replica1",
+            "mutation { deleteCliente(id: 1) { success } }": "default",
+        }
+        for query, alias in documents.items():
+            with routing_context():
+                view.prepare(request, {}, query, None, None, False)
+                self.assertEqual(router.db_for_read(Cliente), alias)
+
+    @override_settings(DATABASE_REPLICA_LAG=60)
+    def test_replica_reads_right_after_a_write_are_not_cached(self):
+        """Test if a response read from a lagging replica is left uncached"""
+        cache.clear()
+        response_cache.invalidate(["core.cliente:1"])
+        with routing_context():
+            started_at = response_cache.now()
+            response_cache.set("replica", "stale?", ["core.cliente:1"], started_at)
+            self.assertIsNone(response_cache.get("replica"))
+            # an untouched row, or one read from the primary, is cached
+            response_cache.set("other", "fresh", ["core.cliente:2"], started_at)
+            self.assertEqual(response_cache.get("other"), "fresh")
+            pin_to_primary()
+            response_cache.set("primary", "fresh", ["core.cliente:1"], started_at)
+            self.assertEqual(response_cache.get("primary"), "fresh")
+
+
+class TestDatabaseSettings(SimpleTestCase):
+    """
+    Django SimpleTestCase.
+
+    Loads the settings module with a given environment and checks the
+    connection settings of the primary and the replicas.
+    """
+
+    def load(self, **environ):
+        """Return the DATABASES of the settings for the environment"""
+        with patch.dict(os.environ, environ):
+            for name in ("ASGI", "DB_CONN_MAX_AGE", "DB_CONN_HEALTH_CHECKS"):
+                if name not in environ:
+                    os.environ.pop(name, None)
+            return runpy.run_path(project_settings.__file__)["DATABASES"]
+
+    def test_persistent_connections(self):
+        """Test if connections persist under WSGI and not under ASGI"""
+        databases = self.load()
+        self.assertEqual(databases["default"]["CONN_MAX_AGE"], 60)
+        self.assertIs(databases["default"]["CONN_HEALTH_CHECKS"], True)
+        self.assertEqual(self.load(ASGI="True")["default"]["CONN_MAX_AGE"], 0)
+        databases = self.load(ASGI="True", DB_CONN_MAX_AGE="30")
+        self.assertEqual(databases["default"]["CONN_MAX_AGE"], 30)
+
+    def test_replicas_share_the_connection_settings(self):
+        """Test if each replica reuses and times out connections as the primary"""
+        databases = self.load(
+            DB_CONN_MAX_AGE="30",
+            DB_CONNECT_TIMEOUT="2",
+            DB_REPLICA_URLS="postgres://u:p@replica:5432/db",
+        )
+        replica = databases["replica1"]
+        self.assertEqual(replica["HOST"], "replica")
+        self.assertEqual(replica["CONN_MAX_AGE"], 30)
+        self.assertIs(replica["CONN_HEALTH_CHECKS"], True)
+        self.assertEqual(replica["OPTIONS"], {"connect_timeout": 2})
@@ -1,13 +1,24 @@
 from django.urls import path, include
 from rest_framework import routers
 
-from graphene_django.views import GraphQLView
+from core.graphql.views import AsyncGraphQLView, CachedGraphQLView
 from core.graphql.schema import schema
 from django.views.decorators.csrf import csrf_exempt
 
 from core.api.viewsets import ClienteModelViewSet
 from core.api.viewsets import ProjetoModelViewSet
 from core.api.viewsets import AtividadeModelViewSet
+from core.api.viewsets import ClienteStatsViewSet, ProjetoStatsViewSet
+from core.api.viewsets import JobViewSet
+from core.api.async_views import AsyncReadView
+from core.api.export_views import ExportView
+from core.api.change_views import ChangeFeedView
+from core.routers import primary_exempt
+from core.api.serializers import (
+    ClienteModelSerializer,
+    ProjetoModelSerializer,
+    AtividadeModelSerializer,
+)
 
 app_name = "core"
 
@@ -15,8 +26,39 @@ router = routers.DefaultRouter()
 router.register(r"clientes", ClienteModelViewSet, basename="clientes")
 router.register(r"projetos", ProjetoModelViewSet, basename="projetos")
 router.register(r"atividades", AtividadeModelViewSet, basename="atividades")
+router.register(r"cliente-stats", ClienteStatsViewSet, basename="cliente-stats")
+router.register(r"projeto-stats", ProjetoStatsViewSet, basename="projeto-stats")
+router.register(r"jobs", JobViewSet, basename="jobs")
 
 urlpatterns = [
     path("", include(router.urls)),
-    path("graphql/", csrf_exempt(GraphQLView.as_view(graphiql=True, schema=schema))),
+    path("export/", ExportView.as_view(), name="export"),
+    path("changes/", ChangeFeedView.as_view(), name="changes"),
+    path(
+        "graphql/",
+        csrf_exempt(
+            primary_exempt(CachedGraphQLView.as_view(graphiql=True, schema=schema))
+        ),
+    ),
+]
+
+# async views, for ASGI deployments
+async_serializers = {
+    "clientes": ClienteModelSerializer,
+    "projetos": ProjetoModelSerializer,
+    "atividades": AtividadeModelSerializer,
+}
+for prefix, serializer_class in async_serializers.items():
+    view = AsyncReadView.as_view(serializer_class=serializer_class)
+    urlpatterns += [
+        path(f"async/{prefix}/", view, name=f"async-{prefix}-list"),
+        path(f"async/{prefix}/<int:pk>/", view, name=f"async-{prefix}-detail"),
+    ]
+urlpatterns += [
+    path(
+        "async/graphql/",
+        csrf_exempt(
+            primary_exempt(AsyncGraphQLView.as_view(graphiql=False, schema=schema))
+        ),
+    ),
 ]
@@ -2,6 +2,7 @@
 ASGI config for project_management project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Websocket connections to ``/api/graphql/`` carry the GraphQL subscriptions.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -12,5 +13,22 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project_management.settings")
+# selects the ASGI defaults of the settings, e.g. DB_CONN_MAX_AGE
+os.environ.setdefault("ASGI", "True")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from core.graphql.schema import schema  # noqa: E402
+from core.graphql.websocket import GraphQLWebSocketApp  # noqa: E402
+
+graphql_websocket = GraphQLWebSocketApp(schema)
+
+
+async def application(scope, receive, send):
+    """Serve the GraphQL subscriptions' websocket next to the Django app"""
+    if scope["type"] != "websocket":
+        return await django_application(scope, receive, send)
+    if scope["path"] == "/api/graphql/":
+        return await graphql_websocket(scope, receive, send)
+    await receive()
+    await send({"type": "websocket.close"})
@@ -21,6 +21,8 @@ from django.urls import path, re_path, include
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from core.profiling import metrics_view
+
 schema_view = get_schema_view(
     openapi.Info(
         title="Elias Challenge API",
@@ -35,6 +37,7 @@ schema_view = get_schema_view(
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("core.urls")),
+    path("metrics", metrics_view, name="metrics"),
 ]
 
 # swagger